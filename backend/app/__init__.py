@@ -18,6 +18,7 @@ def create_app(config_class=None):
         app,
         resources={r"/api/*": {"origins": app.config["ALLOWED_ORIGINS"]}},
         supports_credentials=False,
+        expose_headers=["ETag"],  # multipart part uploads to the local storage route
     )
     limiter.init_app(app)
 
@@ -34,6 +35,9 @@ def create_app(config_class=None):
     # Register error handlers
     register_error_handlers(app)
 
+    # Count DB queries per request
+    register_db_query_instrumentation(app)
+
     # Root route
     @app.route("/")
     def index():
@@ -42,6 +46,41 @@ def create_app(config_class=None):
     return app
 
 
+DB_QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 25)
+
+
+def _count_db_query(*args, **kwargs):
+    """SQLAlchemy before_cursor_execute hook: count queries on flask.g"""
+    from flask import g, has_request_context
+
+    if has_request_context():
+        g.db_queries = g.get("db_queries", 0) + 1
+
+
+def register_db_query_instrumentation(app):
+    """Record DB queries per request as db_queries_<endpoint> histograms"""
+    from flask import g, request
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    from .services.metrics import metrics
+
+    if not event.contains(Engine, "before_cursor_execute", _count_db_query):
+        event.listen(Engine, "before_cursor_execute", _count_db_query)
+
+    @app.before_request
+    def reset_db_queries():
+        g.db_queries = 0
+
+    @app.after_request
+    def record_db_queries(response):
+        count = g.get("db_queries", 0)
+        if request.endpoint:
+            metrics.observe(f"db_queries_{request.endpoint}", count, buckets=DB_QUERY_BUCKETS)
+        if app.debug or app.testing:
+            response.headers["X-DB-Queries"] = str(count)
+        return response
+
+
 def register_error_handlers(app):
     """Register error handlers"""
 
@@ -27,6 +27,12 @@ class Config:
     # Redis
     REDIS_URL = os.getenv("REDIS_URL")
 
+    # Storage: "r2" (any S3-compatible store) or "local" (files under LOCAL_STORAGE_PATH)
+    STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "r2")
+    LOCAL_STORAGE_PATH = os.getenv("LOCAL_STORAGE_PATH", "storage")
+    # Connections kept per process (shared by all request threads/greenlets)
+    STORAGE_MAX_POOL_CONNECTIONS = int(os.getenv("STORAGE_MAX_POOL_CONNECTIONS", "50"))
+
     # Cloudflare R2
     R2_ACCOUNT_ID = os.getenv("R2_ACCOUNT_ID")
     R2_ACCESS_KEY_ID = os.getenv("R2_ACCESS_KEY_ID")
@@ -37,8 +43,55 @@ class Config:
     # App settings
     MAX_FILE_SIZE_MB = int(os.getenv("MAX_FILE_SIZE_MB", "10"))
     MAX_CONTENT_LENGTH = MAX_FILE_SIZE_MB * 1024 * 1024
+    # Cap on the chat text inside a .zip/.gz upload (guards against zip bombs)
+    MAX_CHAT_TEXT_MB = int(os.getenv("MAX_CHAT_TEXT_MB", "100"))
+    # Default part size for multipart uploads (R2/S3 need at least 5MB per part but the last)
+    UPLOAD_PART_SIZE_MB = int(os.getenv("UPLOAD_PART_SIZE_MB", "5"))
     RESULT_TTL_SECONDS = int(os.getenv("RESULT_TTL_SECONDS", "3600"))
     UPLOAD_TTL_SECONDS = int(os.getenv("UPLOAD_TTL_SECONDS", "7200"))
+    # Expired jobs deleted per cleanup page
+    CLEANUP_BATCH_SIZE = int(os.getenv("CLEANUP_BATCH_SIZE", "500"))
+    # Job state transitions are queued in Redis and written to Postgres by the
+    # flush_job_states beat task (false: commit each transition)
+    JOB_STATE_WRITE_BEHIND = os.getenv("JOB_STATE_WRITE_BEHIND", "true").lower() == "true"
+    JOB_STATE_FLUSH_SECONDS = float(os.getenv("JOB_STATE_FLUSH_SECONDS", "5"))
+    JOB_STATE_FLUSH_BATCH_SIZE = int(os.getenv("JOB_STATE_FLUSH_BATCH_SIZE", "500"))
+    # How often beat retrains the zstd dictionary for cached results (0: never)
+    RESULT_DICT_TRAIN_SECONDS = float(os.getenv("RESULT_DICT_TRAIN_SECONDS", "21600"))
+
+    # Server-Sent Events progress stream
+    SSE_HEARTBEAT_SECONDS = int(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+    SSE_MAX_STREAM_SECONDS = int(os.getenv("SSE_MAX_STREAM_SECONDS", "300"))
+
+    # Run a tiny synthetic chat in each new worker process before taking jobs
+    WORKER_WARMUP = os.getenv("WORKER_WARMUP", "true").lower() == "true"
+
+    # Queue routing: jobs at or above either threshold go to the "large" queue
+    LARGE_JOB_MIN_BYTES = int(os.getenv("LARGE_JOB_MIN_BYTES", str(2 * 1024 * 1024)))
+    LARGE_JOB_MIN_PARTICIPANTS = int(os.getenv("LARGE_JOB_MIN_PARTICIPANTS", "30"))
+    # Per-lane processing: "canvas" spreads a job's stages across workers (each
+    # stage reloads the parsed chat, which only pays off for big chats),
+    # "single" runs one task. PROCESSING_PIPELINE sets both lanes.
+    QUEUE_PIPELINES = {
+        "small": os.getenv("SMALL_QUEUE_PIPELINE", os.getenv("PROCESSING_PIPELINE", "single")),
+        "large": os.getenv("LARGE_QUEUE_PIPELINE", os.getenv("PROCESSING_PIPELINE", "canvas")),
+    }
+    # Per-lane task time limits in seconds (soft, hard)
+    QUEUE_TIME_LIMITS = {
+        "small": (int(os.getenv("SMALL_QUEUE_SOFT_TIME_LIMIT", "90")),
+                  int(os.getenv("SMALL_QUEUE_TIME_LIMIT", "120"))),
+        "large": (int(os.getenv("LARGE_QUEUE_SOFT_TIME_LIMIT", "840")),
+                  int(os.getenv("LARGE_QUEUE_TIME_LIMIT", "900"))),
+    }
+
+    # AI roasts
+    ROAST_TIMEOUT_SECONDS = float(os.getenv("ROAST_TIMEOUT_SECONDS", "20"))
+    # Cached roasts hold member names - by default they go with the job's result
+    ROAST_CACHE_TTL_SECONDS = int(os.getenv("ROAST_CACHE_TTL_SECONDS", str(RESULT_TTL_SECONDS)))
+    ROAST_PROMPT_TOKEN_BUDGET = int(os.getenv("ROAST_PROMPT_TOKEN_BUDGET", "2500"))
+
+    # Admin/metrics endpoints (unset: only open in debug/testing, otherwise disabled)
+    ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
 
     # CORS
     ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS", "http://localhost:3000").split(",")
@@ -18,27 +18,27 @@ limiter = Limiter(
     default_limits=["200/hour"],
 )
 
-# Redis client (initialized in create_app)
+# Redis clients (initialized in create_app) - text for JSON values, binary
+# for compressed result fields
 redis_client: Redis | None = None
+redis_binary_client: Redis | None = None
 
 # Celery (initialized separately)
 celery = Celery("whatsapp-wrapped")
 
 
 def init_redis(app):
-    """Initialize Redis client"""
-    global redis_client
+    """Initialize Redis clients"""
+    global redis_client, redis_binary_client
     redis_url = app.config.get("REDIS_URL")
     if redis_url:
         # Handle SSL for Upstash (rediss://)
+        options = {}
         if redis_url.startswith("rediss://"):
-            redis_client = Redis.from_url(
-                redis_url,
-                decode_responses=True,
-                ssl_cert_reqs=ssl.CERT_NONE,  # Don't verify SSL certs (Upstash handles this)
-            )
-        else:
-            redis_client = Redis.from_url(redis_url, decode_responses=True)
+            options["ssl_cert_reqs"] = ssl.CERT_NONE  # Don't verify SSL certs (Upstash handles this)
+
+        redis_client = Redis.from_url(redis_url, decode_responses=True, **options)
+        redis_binary_client = Redis.from_url(redis_url, decode_responses=False, **options)
     return redis_client
 
 
@@ -55,6 +55,20 @@ def init_celery(app):
     if result_backend and result_backend.startswith("rediss://"):
         backend_use_ssl = {"ssl_cert_reqs": ssl.CERT_NONE}
 
+    beat_schedule = {
+        # Write-behind job state (app.services.job_state)
+        "flush-job-states": {
+            "task": "app.tasks.processing.flush_job_states",
+            "schedule": app.config.get("JOB_STATE_FLUSH_SECONDS", 5),
+        },
+    }
+    if app.config.get("RESULT_DICT_TRAIN_SECONDS"):
+        # zstd dictionary for cached results (app.services.result_codec)
+        beat_schedule["train-result-dictionary"] = {
+            "task": "app.tasks.processing.train_result_dictionary",
+            "schedule": app.config["RESULT_DICT_TRAIN_SECONDS"],
+        }
+
     celery.conf.update(
         broker_url=broker_url,
         result_backend=result_backend,
@@ -66,9 +80,12 @@ def init_celery(app):
         timezone="UTC",
         enable_utc=True,
         task_track_started=True,
-        task_time_limit=300,  # 5 minutes max per task
+        task_time_limit=300,  # 5 minutes max per task (per-lane limits set at dispatch)
+        task_default_queue="small",  # unrouted tasks (e.g. cleanup) use the fast lane
         worker_prefetch_multiplier=1,
+        worker_proc_alive_timeout=30,  # leave room for the warm-up hook
         broker_connection_retry_on_startup=True,
+        beat_schedule=beat_schedule,
     )
 
     class ContextTask(celery.Task):
@@ -1,3 +1,4 @@
+import hashlib
 import uuid
 from datetime import datetime, timezone
 from ..extensions import db
@@ -7,6 +8,10 @@ class Job(db.Model):
     """Job model for tracking chat processing"""
 
     __tablename__ = "jobs"
+    __table_args__ = (
+        # Cleanup pages through expired jobs by (status, expires_at)
+        db.Index("idx_jobs_status_expires_at", "status", "expires_at"),
+    )
 
     # Primary key
     id = db.Column(
@@ -32,6 +37,7 @@ class Job(db.Model):
     original_filename = db.Column(db.String(255))
     file_key = db.Column(db.String(255))
     file_size = db.Column(db.Integer)
+    content_hash = db.Column(db.String(64))  # sha256 of the upload, for deduplication
 
     # Processing params
     year_filter = db.Column(db.Integer)
@@ -59,6 +65,7 @@ class Job(db.Model):
     user_agent = db.Column(db.Text)
 
     # Status constants
+    STATUS_VALIDATING = "validating"
     STATUS_PENDING = "pending"
     STATUS_AWAITING_SELECTION = "awaiting_selection"
     STATUS_PROCESSING = "processing"
@@ -94,43 +101,73 @@ class Job(db.Model):
             "progress": self.progress,
             "current_step": self.current_step,
             "created_at": self.created_at.isoformat() if self.created_at else None,
+            **self._status_details(),
+        }
+
+    def _status_details(self):
+        """Status-specific fields: participants once scanned, the error once failed"""
+        if self.status == self.STATUS_AWAITING_SELECTION:
+            return {"participants": self.participants, "group_name": self.group_name}
+        if self.status == self.STATUS_FAILED:
+            return {"error": self.error_message}
+        return {}
+
+    def dedup_key(self) -> str | None:
+        """Key shared by jobs for the same chat, year and members (None until scanned)"""
+        if not self.content_hash:
+            return None
+        members = "\n".join(sorted({member.strip() for member in self.selected_members or []}))
+        return hashlib.sha256(f"{self.content_hash}:{self.year_filter}:{members}".encode("utf-8")).hexdigest()
+
+    def to_metadata_dict(self):
+        """Convert to the metadata returned with results"""
+        return {
+            "message_count": self.message_count,
+            "participant_count": self.participant_count,
+            "group_name": self.group_name,
+            "year": self.year_filter,
+            "processing_time_ms": int(
+                (self.completed_at - self.started_at).total_seconds() * 1000
+            ) if self.completed_at and self.started_at else None,
+        }
+
+    def to_cache_dict(self):
+        """Convert to status plus what read routes need to skip the DB"""
+        return {
+            **self.to_status_dict(),
+            "metadata": self.to_metadata_dict(),
+            "expires_at": self.expires_at.isoformat() if self.expires_at else None,
+        }
+
+    def to_stats_dict(self, result: dict):
+        """Convert a completed job and its result to the stats response"""
+        return self.stats_response(str(self.id), self.status, result, self.to_metadata_dict())
+
+    @staticmethod
+    def stats_response(job_id: str, status: str, result: dict, metadata: dict) -> dict:
+        """Build the stats response (also from cached job state, without a Job row)"""
+        return {
+            "job_id": job_id,
+            "status": status,
+            "stats": result,
+            "metadata": metadata,
         }
 
-    def update_progress(self, progress: int, step: str = None):
-        """Update job progress"""
-        self.progress = progress
-        if step:
-            self.current_step = step
-        db.session.commit()
-
-    def mark_processing(self):
-        """Mark job as processing"""
-        self.status = self.STATUS_PROCESSING
-        self.started_at = datetime.now(timezone.utc)
-        db.session.commit()
-
-    def mark_completed(self, result_key: str, message_count: int = None,
-                       participant_count: int = None, group_name: str = None):
-        """Mark job as completed"""
-        self.status = self.STATUS_COMPLETED
-        self.progress = 100
-        self.current_step = "Completed"
-        self.result_key = result_key
-        self.completed_at = datetime.now(timezone.utc)
-        if message_count:
-            self.message_count = message_count
-        if participant_count:
-            self.participant_count = participant_count
-        if group_name:
-            self.group_name = group_name
-        db.session.commit()
-
-    def mark_failed(self, error_message: str):
-        """Mark job as failed"""
-        self.status = self.STATUS_FAILED
-        self.error_message = error_message
-        self.completed_at = datetime.now(timezone.utc)
-        db.session.commit()
+    def ttl_seconds(self, default: int) -> int:
+        """Seconds until the job expires, capped at default"""
+        return self.seconds_until(self.expires_at, default)
+
+    @staticmethod
+    def seconds_until(expires_at: datetime | str | None, default: int) -> int:
+        """Seconds until an expiry timestamp (datetime or cached ISO string), capped at default"""
+        if expires_at is None:
+            return default
+        if isinstance(expires_at, str):
+            expires_at = datetime.fromisoformat(expires_at)
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        remaining = int((expires_at - datetime.now(timezone.utc)).total_seconds())
+        return max(0, min(default, remaining))
 
     def __repr__(self):
         return f"<Job {self.id} status={self.status}>"
@@ -3,7 +3,9 @@ def register_blueprints(app):
     from .health import health_bp
     from .upload import upload_bp
     from .stats import stats_bp
+    from .metrics import metrics_bp
 
     app.register_blueprint(health_bp, url_prefix="/api")
     app.register_blueprint(upload_bp, url_prefix="/api")
     app.register_blueprint(stats_bp, url_prefix="/api")
+    app.register_blueprint(metrics_bp, url_prefix="/api")
@@ -0,0 +1,101 @@
+"""
+Operational metrics routes
+"""
+
+import uuid
+from flask import Blueprint, request
+from ..services.cache import cache
+from ..services.job_state import job_state, db_pool_status
+from ..services.metrics import metrics
+from ..utils.security import validate_admin_token, validate_uuid
+
+metrics_bp = Blueprint("metrics", __name__)
+
+
+@metrics_bp.route("/metrics", methods=["GET"])
+def get_metrics():
+    """
+    Get aggregated counters and histograms, plus this process's DB pool usage
+    and the jobs waiting for the job state flusher
+
+    ---
+    Response:
+        {
+            "counters": {"roast_cache_hits": 12, "analyze_duplicates": 1, ...},
+            "histograms": {"name": {"count": 3, "sum": 42.0, "mean": 14.0, "buckets": {...}}},
+            "db_pool": {"class": "QueuePool", "size": 5, "checkedout": 1, "checkedin": 4, "overflow": -4},
+            "job_state_pending": 3
+        }
+    """
+    is_valid, error_msg = validate_admin_token(request.headers.get("Authorization"))
+    if not is_valid:
+        return {"error": error_msg}, 401
+
+    return {
+        **metrics.snapshot(),
+        "db_pool": db_pool_status(),
+        "job_state_pending": job_state.pending_count(),
+    }, 200
+
+
+@metrics_bp.route("/jobs/<job_id>/metrics", methods=["GET"])
+def get_job_metrics(job_id: str):
+    """
+    Get metrics recorded for a single job
+
+    ---
+    Response:
+        {
+            "job_id": "uuid",
+            "metrics": {"roast_prompt_tokens": 1830, "roast_ms": 4210, ...}
+        }
+    """
+    is_valid, error_msg = validate_admin_token(request.headers.get("Authorization"))
+    if not is_valid:
+        return {"error": error_msg}, 401
+
+    is_valid, error_msg = validate_uuid(job_id)
+    if not is_valid:
+        return {"error": error_msg}, 400
+
+    return {"job_id": job_id, "metrics": cache.get_job_metrics(job_id)}, 200
+
+
+@metrics_bp.route("/admin/jobs", methods=["GET"])
+def get_job_statuses():
+    """
+    Get status for many jobs at once (one Redis round trip, one DB query for misses)
+
+    ---
+    Query:
+        ids: Comma-separated job UUIDs (max 100)
+
+    Response:
+        {
+            "jobs": {"uuid": {"status": "processing", "progress": 40, ...}, "uuid2": null}
+        }
+    """
+    is_valid, error_msg = validate_admin_token(request.headers.get("Authorization"))
+    if not is_valid:
+        return {"error": error_msg}, 401
+
+    job_ids = [job_id.strip() for job_id in request.args.get("ids", "").split(",") if job_id.strip()]
+    if not job_ids:
+        return {"error": "ids is required"}, 400
+    if len(job_ids) > 100:
+        return {"error": "At most 100 ids per request"}, 400
+
+    for job_id in job_ids:
+        is_valid, error_msg = validate_uuid(job_id)
+        if not is_valid:
+            return {"error": f"{job_id}: {error_msg}"}, 400
+    job_ids = [str(uuid.UUID(job_id)) for job_id in job_ids]
+
+    statuses = cache.get_job_statuses(job_ids)
+
+    missing = [job_id for job_id, status in statuses.items() if status is None]
+    if missing:
+        for job in job_state.load_many(missing):
+            statuses[str(job.id)] = job.to_status_dict()
+
+    return {"jobs": statuses}, 200
@@ -2,12 +2,17 @@
 Stats retrieval routes
 """
 
-from datetime import datetime, timezone
-from flask import Blueprint, current_app
+import gzip
+import json
+import time
+from flask import Blueprint, Response, current_app, request
+from core.constants import SLIDE_MANIFEST
 from ..extensions import limiter
 from ..models import Job
 from ..services.storage import storage
 from ..services.cache import cache
+from ..services.checkpoints import JobCheckpoints
+from ..services.job_state import job_state
 from ..utils.security import validate_uuid
 
 stats_bp = Blueprint("stats", __name__)
@@ -15,9 +20,20 @@ stats_bp = Blueprint("stats", __name__)
 
 def is_job_expired(job: Job) -> bool:
     """Check if job has expired"""
-    if job.expires_at is None:
-        return False
-    return job.expires_at < datetime.now(timezone.utc)
+    return job.expires_at is not None and job.ttl_seconds(1) <= 0
+
+
+def is_state_expired(state: dict) -> bool:
+    """Check if a cached job state has expired (no DB access)"""
+    return bool(state.get("expires_at")) and Job.seconds_until(state["expires_at"], 1) <= 0
+
+
+def cached_completed_state(job_id: str) -> dict | None:
+    """Cached state of a completed job, with the metadata read routes need"""
+    state = cache.get_job_status(job_id)
+    if state and state.get("status") == Job.STATUS_COMPLETED and "metadata" in state:
+        return state
+    return None
 
 
 @stats_bp.route("/jobs/<job_id>", methods=["GET"])
@@ -33,7 +49,8 @@ def get_job_status(job_id: str):
             "status": "pending|processing|completed|failed",
             "progress": 0-100,
             "current_step": "Analyzing emojis...",
-            "created_at": "2024-01-15T10:30:00Z"
+            "created_at": "2024-01-15T10:30:00Z",
+            "checkpoints": {"parse": "2024-01-15T10:30:02Z", ...}  // if any
         }
     """
     # Validate UUID
@@ -41,34 +58,144 @@ def get_job_status(job_id: str):
     if not is_valid:
         return {"error": error_msg}, 400
 
-    # Try cache first
+    # Try cache first (status and real-time progress share one hash)
     cached_status = cache.get_job_status(job_id)
     if cached_status:
-        # Also check for real-time progress
-        progress = cache.get_job_progress(job_id)
-        if progress:
-            cached_status.update(progress)
+        if is_state_expired(cached_status):
+            return {"error": "Job not found"}, 404
+        # Checkpoints only exist while a job is running or retrying
+        if cached_status.get("status") in (Job.STATUS_PROCESSING, Job.STATUS_FAILED):
+            checkpoint_state = JobCheckpoints(job_id).state()
+            if checkpoint_state:
+                cached_status["checkpoints"] = checkpoint_state
         return cached_status, 200
 
-    # Fall back to database
-    job = Job.query.get(job_id)
+    # Fall back to database (plus transitions not yet written to it)
+    job = job_state.load(job_id)
     if not job or is_job_expired(job):
         return {"error": "Job not found"}, 404
 
     status = job.to_status_dict()
 
-    # Cache it for next time
-    cache.set_job_status(job_id, status)
+    # Cache it for next time (the DB row may lag the worker's progress)
+    cache.set_job_status(job_id, status, overwrite_progress=False)
+    status.update(cache.get_job_progress(job_id) or {})
+
+    checkpoint_state = JobCheckpoints(job_id).state()
+    if checkpoint_state:
+        status["checkpoints"] = checkpoint_state
 
     return status, 200
 
 
+TERMINAL_STATUSES = {Job.STATUS_COMPLETED, Job.STATUS_FAILED}
+
+
+def sse_event(event: str, data: dict) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@stats_bp.route("/jobs/<job_id>/events", methods=["GET"])
+@limiter.limit(lambda: current_app.config.get("RATE_LIMIT_STATUS", "100/minute"))
+def stream_job_events(job_id: str):
+    """
+    Stream job status and progress as Server-Sent Events
+
+    Replaces polling GET /jobs/<id>: one request per job instead of one per
+    second. Starts with the current status, then relays events published by
+    the worker. Ends after a completed/failed status, or after
+    SSE_MAX_STREAM_SECONDS (EventSource reconnects automatically).
+
+    ---
+    Events:
+        event: status
+        data: {"job_id": "uuid", "status": "processing", "progress": 40, ...}
+
+        event: progress
+        data: {"progress": 50, "current_step": "Analyzing emojis..."}
+    """
+    # Validate UUID
+    is_valid, error_msg = validate_uuid(job_id)
+    if not is_valid:
+        return {"error": error_msg}, 400
+
+    # Subscribe before reading the snapshot so no event is lost in between
+    pubsub = cache.subscribe_job_events(job_id)
+    if pubsub is None:
+        return {"error": "Event stream unavailable"}, 503
+
+    status = cache.get_job_status(job_id)
+    if status is None:
+        job = job_state.load(job_id)
+        if not job or is_job_expired(job):
+            pubsub.close()
+            return {"error": "Job not found"}, 404
+        status = job.to_status_dict()
+
+    heartbeat = current_app.config.get("SSE_HEARTBEAT_SECONDS", 15)
+    max_seconds = current_app.config.get("SSE_MAX_STREAM_SECONDS", 300)
+
+    def generate():
+        try:
+            yield sse_event("status", status)
+            if status.get("status") in TERMINAL_STATUSES:
+                return
+
+            deadline = time.monotonic() + max_seconds
+            while time.monotonic() < deadline:
+                message = pubsub.get_message(timeout=heartbeat)
+                if message is None:
+                    # Comment line keeps proxies from closing an idle stream
+                    yield ": keep-alive\n\n"
+                    continue
+
+                data = json.loads(message["data"])
+                event = data.pop("event", "progress")
+                yield sse_event(event, data)
+                if event == "status" and data.get("status") in TERMINAL_STATUSES:
+                    return
+        finally:
+            pubsub.close()
+
+    return Response(
+        generate(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def precompressed_response(etag: str, body: bytes) -> Response:
+    """
+    Serve a stored gzipped response body, or 304 if the client has it
+
+    Completed results never change, so the body is cached as immutable.
+    """
+    max_age = current_app.config.get("RESULT_TTL_SECONDS", 3600)
+
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    elif "gzip" in request.accept_encodings:
+        response = Response(body, mimetype="application/json")
+        response.headers["Content-Encoding"] = "gzip"
+    else:
+        response = Response(gzip.decompress(body), mimetype="application/json")
+
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = f"private, max-age={max_age}, immutable"
+    response.headers["Vary"] = "Accept-Encoding"
+    return response
+
+
 @stats_bp.route("/jobs/<job_id>/stats", methods=["GET"])
 @limiter.limit(lambda: current_app.config.get("RATE_LIMIT_STATUS", "100/minute"))
 def get_job_stats(job_id: str):
     """
     Get full stats for a completed job
 
+    While the job is processing, returns the slides finished so far and
+    the ones still pending, so the presentation can start early.
+
     ---
     Response:
         {
@@ -77,14 +204,47 @@ def get_job_stats(job_id: str):
             "stats": { ... all stats ... },
             "metadata": { ... }
         }
+
+    Response (processing, 202):
+        {
+            "job_id": "uuid",
+            "status": "processing",
+            "slides": [{"id": 1, "type": "overview", ...}, ...],
+            "pending": [{"id": 10, "title": "ai roasts", "type": "ai_roasts"}, ...]
+        }
+
+    Completed responses are gzipped with a strong ETag; send it back in
+    If-None-Match to get a 304.
     """
     # Validate UUID
     is_valid, error_msg = validate_uuid(job_id)
     if not is_valid:
         return {"error": error_msg}, 400
 
+    # Completed jobs: serve the stored response without touching the DB
+    # (conditional requests only need the ETag)
+    if request.if_none_match:
+        etag = cache.get_job_response_etag(job_id)
+        if etag and request.if_none_match.contains(etag):
+            return precompressed_response(etag, b"")
+
+    stored = cache.get_job_response(job_id)
+    if stored:
+        return precompressed_response(*stored)
+
+    # Completed job with a cached result: build the response from cached state
+    state = cached_completed_state(job_id)
+    if state:
+        if is_state_expired(state):
+            return {"error": "Job not found"}, 404
+        result = cache.get_job_result(job_id)
+        if result is not None:
+            response = Job.stats_response(job_id, state["status"], result, state["metadata"])
+            ttl = Job.seconds_until(state.get("expires_at"), current_app.config.get("RESULT_TTL_SECONDS", 3600))
+            return precompressed_response(*cache.set_job_response(job_id, response, ttl=ttl))
+
     # Get job
-    job = Job.query.get(job_id)
+    job = job_state.load(job_id)
     if not job or is_job_expired(job):
         return {"error": "Job not found"}, 404
 
@@ -97,12 +257,20 @@ def get_job_stats(job_id: str):
 
     if job.status == Job.STATUS_PROCESSING:
         progress = cache.get_job_progress(job_id) or {}
+        slides = cache.get_partial_slides(job_id)
+        done = {slide["id"] for slide in slides}
         return {
             "job_id": job_id,
             "status": job.status,
             "progress": progress.get("progress", job.progress),
             "current_step": progress.get("current_step", job.current_step),
             "message": "Job is still processing",
+            "slides": slides,
+            "pending": [
+                {"id": slide_id, "title": title, "type": slide_type}
+                for slide_id, title, slide_type in SLIDE_MANIFEST
+                if slide_id not in done
+            ],
         }, 202
 
     if job.status == Job.STATUS_FAILED:
@@ -114,48 +282,26 @@ def get_job_stats(job_id: str):
 
     # Job completed - get results
     # Try cache first
-    cached_result = cache.get_job_result(job_id)
-    if cached_result:
-        return {
-            "job_id": job_id,
-            "status": job.status,
-            "stats": cached_result,
-            "metadata": {
-                "message_count": job.message_count,
-                "participant_count": job.participant_count,
-                "group_name": job.group_name,
-                "year": job.year_filter,
-                "processing_time_ms": int(
-                    (job.completed_at - job.started_at).total_seconds() * 1000
-                ) if job.completed_at and job.started_at else None,
-            },
-        }, 200
+    result = cache.get_job_result(job_id)
 
-    # Fall back to R2
-    if not job.result_key:
-        return {"error": "Results not available"}, 500
+    if result is None:
+        # Fall back to R2
+        if not job.result_key:
+            return {"error": "Results not available"}, 500
 
-    try:
-        result = storage.download_json(job.result_key)
+        try:
+            result = storage.download_json(job.result_key)
+        except Exception as e:
+            current_app.logger.error(f"Error fetching results: {e}")
+            return {"error": "Failed to retrieve results"}, 500
 
         # Cache for next time
         cache.set_job_result(job_id, result)
 
-        return {
-            "job_id": job_id,
-            "status": job.status,
-            "stats": result,
-            "metadata": {
-                "message_count": job.message_count,
-                "participant_count": job.participant_count,
-                "group_name": job.group_name,
-                "year": job.year_filter,
-            },
-        }, 200
-
-    except Exception as e:
-        current_app.logger.error(f"Error fetching results: {e}")
-        return {"error": "Failed to retrieve results"}, 500
+    # Store the job state and serialized response so later polls skip all of the above
+    ttl = job.ttl_seconds(current_app.config.get("RESULT_TTL_SECONDS", 3600))
+    cache.set_job_status(job_id, job.to_cache_dict(), ttl=ttl)
+    return precompressed_response(*cache.set_job_response(job_id, job.to_stats_dict(result), ttl=ttl))
 
 
 @stats_bp.route("/jobs/<job_id>/stats/<section>", methods=["GET"])
@@ -173,7 +319,6 @@ def get_job_stats_section(job_id: str, section: str):
         - media_stats
         - word_stats
         - personality_tags
-        - group_vibe
         - ... (any top-level key in stats)
     """
     # Validate UUID
@@ -181,25 +326,33 @@ def get_job_stats_section(job_id: str, section: str):
     if not is_valid:
         return {"error": error_msg}, 400
 
+    # Completed job with a cached result: no DB access
+    state = cached_completed_state(job_id)
+    if state:
+        if is_state_expired(state):
+            return {"error": "Job not found"}, 404
+
+        # Reads only this section's fields
+        try:
+            cached_section = cache.get_job_result_section(job_id, section)
+        except KeyError:
+            return {"error": f"Unknown section: {section}"}, 400
+
+        if cached_section is not None:
+            return {
+                "job_id": job_id,
+                "section": section,
+                "data": cached_section,
+            }, 200
+
     # Get job
-    job = Job.query.get(job_id)
+    job = job_state.load(job_id)
     if not job or is_job_expired(job):
         return {"error": "Job not found"}, 404
 
     if job.status != Job.STATUS_COMPLETED:
         return {"error": f"Job status is {job.status}"}, 400
 
-    # Try cache first
-    cached_result = cache.get_job_result(job_id)
-    if cached_result:
-        if section not in cached_result:
-            return {"error": f"Unknown section: {section}"}, 400
-        return {
-            "job_id": job_id,
-            "section": section,
-            "data": cached_result[section],
-        }, 200
-
     # Fall back to R2
     if not job.result_key:
         return {"error": "Results not available"}, 500
@@ -228,17 +381,25 @@ def get_job_stats_section(job_id: str, section: str):
 def delete_job(job_id: str):
     """
     Delete a job and its associated data
+
+    A job still being scanned or processed is cancelled: its task stops at
+    the next stage (or aborts the roast request) and exits without saving
+    anything.
     """
     # Validate UUID
     is_valid, error_msg = validate_uuid(job_id)
     if not is_valid:
         return {"error": error_msg}, 400
 
-    job = Job.query.get(job_id)
+    job = job_state.load(job_id)
     if not job:
         return {"error": "Job not found"}, 404
 
     try:
+        # Flag in-flight jobs first (failed jobs may still have a retry queued)
+        if job.status in (Job.STATUS_VALIDATING, Job.STATUS_PENDING, Job.STATUS_PROCESSING, Job.STATUS_FAILED):
+            cache.set_job_cancelled(job_id)
+
         # Delete files from R2
         keys_to_delete = []
         if job.file_key:
@@ -249,8 +410,11 @@ def delete_job(job_id: str):
         if keys_to_delete:
             storage.delete_files(keys_to_delete)
 
-        # Delete from cache
+        # Delete checkpoints and cache (including the dedup entry pointing here)
+        JobCheckpoints(job_id).clear()
         cache.delete_job_cache(job_id)
+        cache.delete_dedup_source(job.dedup_key(), job_id)
+        job_state.delete_pending([job_id])
 
         # Delete from database
         from ..extensions import db
@@ -2,14 +2,18 @@
 Upload route for WhatsApp chat files
 """
 
-from flask import Blueprint, request, current_app
+import time
+from flask import Blueprint, abort, request, current_app
 from ..extensions import db, limiter
 from ..models import Job
-from ..services.storage import storage
+from ..services.storage import storage, LocalBackend, UploadTooLarge
 from ..services.cache import cache
-from ..services.processor import quick_parse_participants
-from ..utils.security import validate_file_content, validate_year
-from ..tasks.processing import process_chat_task
+from ..services.job_state import job_state
+from ..services.metrics import metrics
+from ..utils.security import validate_upload_key, validate_upload_filename, validate_year, ALLOWED_UPLOAD_TYPES
+from ..tasks.dispatch import (
+    start_processing, start_upload_scan, choose_queue, find_duplicate_job, clone_job_result,
+)
 
 upload_bp = Blueprint("upload", __name__)
 
@@ -20,28 +24,42 @@ def get_presigned_url():
     """
     Get a presigned URL for direct upload to R2
 
+    PUT the file with the returned content_type as its Content-Type.
+
     ---
+    Query params:
+        filename: Name of the file to upload (.txt, .zip or .gz; default .txt)
+
     Response:
         {
             "upload_url": "https://...",
-            "file_key": "uploads/uuid.txt",
+            "file_key": "uploads/uuid.zip",
+            "content_type": "application/zip",
             "max_size_mb": 20,
             "expires_in": 3600
         }
     """
     current_app.logger.info(f"Presign request from {request.remote_addr}")
 
+    is_valid, extension, error_msg = validate_upload_filename(request.args.get("filename"))
+    if not is_valid:
+        return {"error": error_msg}, 400
+    content_type = ALLOWED_UPLOAD_TYPES[extension]
+
     try:
         max_size = current_app.config.get("MAX_FILE_SIZE_MB", 20)
         upload_url, file_key, max_size_mb = storage.generate_presigned_upload_url(
             prefix="uploads",
             expires_in=3600,
             max_size_mb=max_size,
+            extension=extension,
+            content_type=content_type,
         )
 
         return {
             "upload_url": upload_url,
             "file_key": file_key,
+            "content_type": content_type,
             "max_size_mb": max_size_mb,
             "expires_in": 3600,
         }, 200
@@ -51,11 +69,51 @@ def get_presigned_url():
         return {"error": "Failed to generate upload URL"}, 500
 
 
+@upload_bp.route("/upload/local/<token>", methods=["PUT"])
+@limiter.limit(lambda: current_app.config.get("RATE_LIMIT_STATUS", "100/minute"))
+def local_upload(token: str):
+    """
+    Receive a presigned upload when STORAGE_BACKEND=local
+
+    Stands in for the R2 presigned PUT: the token from /upload/presign names
+    the key and expires like the R2 URL would. The body is streamed to disk
+    and dropped (413) once it passes MAX_CONTENT_LENGTH, whatever the
+    Content-Length header says. Parts share the status limit since one
+    multipart upload sends many of them.
+    """
+    backend = storage.backend
+    if not isinstance(backend, LocalBackend):
+        return {"error": "Not found"}, 404
+
+    grant = backend.verify_upload_token(token)
+    if grant is None:
+        return {"error": "Upload URL is invalid or has expired"}, 403
+
+    max_bytes = current_app.config["MAX_CONTENT_LENGTH"]
+    try:
+        if "upload_id" not in grant:
+            backend.put_stream(grant["key"], request.stream, max_bytes=max_bytes)
+            return "", 200
+        etag = backend.put_part(
+            grant["key"], grant["upload_id"], grant["part_number"], request.stream, max_bytes=max_bytes
+        )
+    except UploadTooLarge:
+        abort(413)
+    except (FileNotFoundError, ValueError):
+        return {"error": "Upload not found"}, 404
+    return "", 200, {"ETag": etag}
+
+
 @upload_bp.route("/upload/confirm", methods=["POST"])
 @limiter.limit(lambda: current_app.config.get("RATE_LIMIT_UPLOADS", "10/hour"))
 def confirm_upload():
     """
-    Confirm upload and validate file after direct R2 upload
+    Confirm a direct R2 upload and queue its scan
+
+    The file is checked, validated and parsed for participants by a worker.
+    Poll GET /jobs/<id> (or stream /jobs/<id>/events) until the status is
+    awaiting_selection, which includes participants, or failed, which
+    includes the error.
 
     ---
     Request (JSON):
@@ -65,12 +123,10 @@ def confirm_upload():
             "year": "2025"
         }
 
-    Response:
+    Response (202):
         {
             "job_id": "uuid",
-            "status": "awaiting_selection",
-            "participants": ["Alice", "Bob", ...],
-            "group_name": "Group Name"
+            "status": "validating"
         }
     """
     data = request.get_json()
@@ -81,8 +137,9 @@ def confirm_upload():
     file_key = data.get("file_key")
     filename = data.get("filename", "chat.txt")
 
-    if not file_key:
-        return {"error": "file_key is required"}, 400
+    is_valid, error_msg = validate_upload_key(file_key)
+    if not is_valid:
+        return {"error": error_msg}, 400
 
     # Validate year
     year_param = data.get("year")
@@ -91,82 +148,296 @@ def confirm_upload():
         return {"error": error_msg}, 400
 
     current_app.logger.info(f"Confirm upload for {file_key} from {request.remote_addr}")
+    return queue_upload_scan(file_key, filename, year)
+
 
+def queue_upload_scan(file_key: str, filename: str, year: int):
+    """Create a validating job for an uploaded file and queue its scan (202 response)"""
     try:
-        # Check file exists in R2
-        if not storage.file_exists(file_key):
-            return {"error": "File not found. Upload may have failed."}, 404
-
-        # Get file size
-        file_size = storage.get_file_size(file_key)
-        max_size = current_app.config.get("MAX_FILE_SIZE_MB", 20) * 1024 * 1024
-
-        if file_size > max_size:
-            storage.delete_file(file_key)
-            return {"error": f"File too large. Maximum size is {max_size // (1024*1024)}MB"}, 400
-
-        # Download and validate content
-        file_content_bytes = storage.download_file(file_key)
-
-        try:
-            file_content = file_content_bytes.decode("utf-8")
-        except UnicodeDecodeError:
-            storage.delete_file(file_key)
-            return {"error": "Invalid file encoding. Please export chat as text file."}, 400
-
-        # Validate file content
-        is_valid, error_msg = validate_file_content(file_content)
-        if not is_valid:
-            storage.delete_file(file_key)
-            current_app.logger.warning(f"Upload rejected - Validation failed: {error_msg}")
-            return {"error": error_msg}, 400
-
-        # Quick parse to get participants
-        participants, group_name = quick_parse_participants(file_content)
-        current_app.logger.info(f"Parsed {len(participants)} participants, group: {group_name}")
-
-        if not participants:
-            storage.delete_file(file_key)
-            current_app.logger.warning("Upload rejected - No participants found after parsing")
-            return {"error": "No participants found in chat. Please ensure this is a WhatsApp chat export."}, 400
-
-        # Create job record with participants
         job = Job(
-            status=Job.STATUS_AWAITING_SELECTION,
+            status=Job.STATUS_VALIDATING,
+            current_step="Validating file...",
             original_filename=filename,
             file_key=file_key,
-            file_size=file_size,
             year_filter=year,
-            participants=participants,
-            group_name=group_name,
             client_ip=request.remote_addr,
             user_agent=request.headers.get("User-Agent", "")[:500],
         )
         db.session.add(job)
         db.session.commit()
 
-        # Cache initial status
+        # Cache initial status, then scan off the request thread
         cache.set_job_status(str(job.id), job.to_status_dict())
-
-        current_app.logger.info(f"Upload confirmed - Job {job.id} created with {len(participants)} participants")
+        start_upload_scan(str(job.id))
 
         return {
             "job_id": str(job.id),
             "status": job.status,
-            "participants": participants,
-            "group_name": group_name,
-        }, 200
+        }, 202
 
     except Exception as e:
         current_app.logger.error(f"Confirm upload error: {e}", exc_info=True)
-        # Try to clean up the file
-        try:
-            storage.delete_file(file_key)
-        except Exception:
-            pass
         return {"error": "Failed to process upload"}, 500
 
 
+# Multipart uploads: large exports go up in parts that can be sent in
+# parallel and retried (or resumed) one at a time
+MULTIPART_URL_EXPIRES_IN = 3600
+MULTIPART_BUCKETS = (1000, 2500, 5000, 10000, 20000, 30000, 60000, 120000, 300000)
+
+
+def parse_multipart_request(data: dict | None) -> tuple[str | None, str | None, str]:
+    """Get (file_key, upload_id, error) from a multipart request body"""
+    if not data:
+        return None, None, "JSON body required"
+
+    file_key = data.get("file_key")
+    is_valid, error_msg = validate_upload_key(file_key)
+    if not is_valid:
+        return None, None, error_msg
+
+    upload_id = data.get("upload_id")
+    if not upload_id or not isinstance(upload_id, str):
+        return None, None, "upload_id is required"
+
+    return file_key, upload_id, ""
+
+
+def parse_part_numbers(values, part_count: int | None = None) -> list[int] | None:
+    """Validate a list of 1-based part numbers (None if invalid)"""
+    if not isinstance(values, list) or not values:
+        return None
+    if not all(isinstance(value, int) and 1 <= value <= (part_count or 10000) for value in values):
+        return None
+    return sorted(set(values))
+
+
+@upload_bp.route("/upload/multipart", methods=["POST"])
+@limiter.limit(lambda: current_app.config.get("RATE_LIMIT_UPLOADS", "10/hour"))
+def create_multipart_upload():
+    """
+    Start a multipart upload and get presigned URLs for every part
+
+    PUT each slice of the file (bytes (n-1)*part_size .. n*part_size) to its
+    part's URL, in parallel if you like, and keep each response's ETag header.
+
+    ---
+    Request (JSON):
+        {
+            "size": 12345678,
+            "filename": "WhatsApp Chat.zip",  // optional, .txt/.zip/.gz
+            "part_size_mb": 5  // optional, at least 5
+        }
+
+    Response:
+        {
+            "file_key": "uploads/uuid.zip",
+            "upload_id": "...",
+            "part_size": 5242880,
+            "parts": [{"part_number": 1, "url": "https://..."}, ...],
+            "expires_in": 3600
+        }
+    """
+    data = request.get_json()
+
+    if not data:
+        return {"error": "JSON body required"}, 400
+
+    size = data.get("size")
+    max_size = current_app.config.get("MAX_FILE_SIZE_MB", 20) * 1024 * 1024
+    if not isinstance(size, int) or size <= 0:
+        return {"error": "size must be a positive number of bytes"}, 400
+    if size > max_size:
+        return {"error": f"File too large. Maximum size is {max_size // (1024*1024)}MB"}, 400
+
+    is_valid, extension, error_msg = validate_upload_filename(data.get("filename"))
+    if not is_valid:
+        return {"error": error_msg}, 400
+
+    part_size_mb = data.get("part_size_mb", current_app.config.get("UPLOAD_PART_SIZE_MB", 5))
+    if not isinstance(part_size_mb, int) or part_size_mb < 5:
+        return {"error": "part_size_mb must be a whole number, at least 5"}, 400
+
+    part_size = part_size_mb * 1024 * 1024
+    part_count = -(-size // part_size)
+
+    try:
+        file_key, upload_id = storage.create_multipart_upload(
+            prefix="uploads", extension=extension, content_type=ALLOWED_UPLOAD_TYPES[extension],
+        )
+        parts = storage.generate_presigned_part_urls(
+            file_key, upload_id, list(range(1, part_count + 1)), expires_in=MULTIPART_URL_EXPIRES_IN,
+        )
+    except Exception as e:
+        current_app.logger.error(f"Multipart create error: {e}", exc_info=True)
+        return {"error": "Failed to start upload"}, 500
+
+    # Remembered for completion timing by part size
+    cache.set_multipart_upload(
+        upload_id,
+        {"started_at": time.time(), "size": size, "part_size_mb": part_size_mb, "part_count": part_count},
+        ttl=MULTIPART_URL_EXPIRES_IN * 2,
+    )
+
+    return {
+        "file_key": file_key,
+        "upload_id": upload_id,
+        "part_size": part_size,
+        "parts": parts,
+        "expires_in": MULTIPART_URL_EXPIRES_IN,
+    }, 200
+
+
+@upload_bp.route("/upload/multipart/urls", methods=["POST"])
+@limiter.limit(lambda: current_app.config.get("RATE_LIMIT_STATUS", "100/minute"))
+def refresh_multipart_urls():
+    """
+    Get fresh presigned URLs for some parts (e.g. after they expired)
+
+    ---
+    Request (JSON):
+        {"file_key": "uploads/uuid.txt", "upload_id": "...", "part_numbers": [3, 4]}
+
+    Response:
+        {"parts": [{"part_number": 3, "url": "https://..."}, ...], "expires_in": 3600}
+    """
+    data = request.get_json()
+    file_key, upload_id, error_msg = parse_multipart_request(data)
+    if error_msg:
+        return {"error": error_msg}, 400
+
+    part_numbers = parse_part_numbers(data.get("part_numbers"))
+    if part_numbers is None:
+        return {"error": "part_numbers must be a non-empty list of part numbers"}, 400
+
+    parts = storage.generate_presigned_part_urls(
+        file_key, upload_id, part_numbers, expires_in=MULTIPART_URL_EXPIRES_IN,
+    )
+    return {"parts": parts, "expires_in": MULTIPART_URL_EXPIRES_IN}, 200
+
+
+@upload_bp.route("/upload/multipart/parts", methods=["GET"])
+@limiter.limit(lambda: current_app.config.get("RATE_LIMIT_STATUS", "100/minute"))
+def list_multipart_parts():
+    """
+    List parts already uploaded, to resume an interrupted upload
+
+    ---
+    Query: ?file_key=uploads/uuid.txt&upload_id=...
+
+    Response:
+        {"parts": [{"part_number": 1, "etag": "\"...\"", "size": 5242880}, ...]}
+    """
+    file_key, upload_id, error_msg = parse_multipart_request(request.args)
+    if error_msg:
+        return {"error": error_msg}, 400
+
+    try:
+        parts = storage.list_uploaded_parts(file_key, upload_id)
+    except Exception as e:
+        current_app.logger.warning(f"Multipart list error for {file_key}: {e}")
+        return {"error": "Upload not found"}, 404
+
+    return {"parts": parts}, 200
+
+
+@upload_bp.route("/upload/multipart/complete", methods=["POST"])
+@limiter.limit(lambda: current_app.config.get("RATE_LIMIT_UPLOADS", "10/hour"))
+def complete_multipart_upload():
+    """
+    Assemble the uploaded parts and queue the file scan (like /upload/confirm)
+
+    ---
+    Request (JSON):
+        {
+            "file_key": "uploads/uuid.txt",
+            "upload_id": "...",
+            "parts": [{"part_number": 1, "etag": "\"...\""}, ...],
+            "filename": "chat.txt",
+            "year": "2025"
+        }
+
+    Response (202):
+        {
+            "job_id": "uuid",
+            "status": "validating"
+        }
+    """
+    data = request.get_json()
+    file_key, upload_id, error_msg = parse_multipart_request(data)
+    if error_msg:
+        return {"error": error_msg}, 400
+
+    parts = data.get("parts")
+    if (
+        not isinstance(parts, list)
+        or not all(isinstance(part, dict) and isinstance(part.get("etag"), str) for part in parts)
+        or parse_part_numbers([part.get("part_number") for part in parts]) is None
+    ):
+        return {"error": "parts must list each part's part_number and etag"}, 400
+
+    is_valid, year, error_msg = validate_year(data.get("year"))
+    if not is_valid:
+        return {"error": error_msg}, 400
+
+    try:
+        storage.complete_multipart_upload(
+            file_key, upload_id,
+            [{"part_number": part["part_number"], "etag": part["etag"]} for part in parts],
+        )
+    except Exception as e:
+        current_app.logger.warning(f"Multipart complete error for {file_key}: {e}")
+        return {"error": "Failed to complete upload. Missing or mismatched parts?"}, 400
+
+    upload_info = cache.pop_multipart_upload(upload_id)
+    if upload_info:
+        elapsed_ms = (time.time() - upload_info["started_at"]) * 1000
+        metrics.observe(f"multipart_upload_ms_part_{upload_info['part_size_mb']}mb", elapsed_ms,
+                        buckets=MULTIPART_BUCKETS)
+
+    current_app.logger.info(f"Multipart upload {file_key} completed from {request.remote_addr}")
+    return queue_upload_scan(file_key, data.get("filename", "chat.txt"), year)
+
+
+@upload_bp.route("/upload/multipart/abort", methods=["POST"])
+@limiter.limit(lambda: current_app.config.get("RATE_LIMIT_STATUS", "100/minute"))
+def abort_multipart_upload():
+    """
+    Abort a multipart upload and delete its parts
+
+    ---
+    Request (JSON):
+        {"file_key": "uploads/uuid.txt", "upload_id": "..."}
+    """
+    data = request.get_json()
+    file_key, upload_id, error_msg = parse_multipart_request(data)
+    if error_msg:
+        return {"error": error_msg}, 400
+
+    try:
+        storage.abort_multipart_upload(file_key, upload_id)
+    except Exception as e:
+        current_app.logger.warning(f"Multipart abort error for {file_key}: {e}")
+        return {"error": "Upload not found"}, 404
+
+    cache.pop_multipart_upload(upload_id)
+    return {"message": "Upload aborted"}, 200
+
+
+# Statuses of a job whose analysis has started
+RUN_STATUSES = (Job.STATUS_PENDING, Job.STATUS_PROCESSING, Job.STATUS_COMPLETED)
+
+
+def _attach_to_run(job_id, status: str):
+    """Response for a duplicate analyze request: the run already started"""
+    metrics.incr("analyze_duplicates")
+    metrics.flush()
+    current_app.logger.info(f"Duplicate analyze request for job {job_id} attached to its run")
+    if status == Job.STATUS_COMPLETED:
+        return {"job_id": str(job_id), "status": status, "message": "Analysis complete"}, 200
+    return {"job_id": str(job_id), "status": status, "message": "Analysis already started"}, 202
+
+
 @upload_bp.route("/analyze", methods=["POST"])
 @limiter.limit(lambda: current_app.config.get("RATE_LIMIT_UPLOADS", "10/hour"))
 def analyze_chat():
@@ -177,15 +448,21 @@ def analyze_chat():
     Request (JSON):
         {
             "job_id": "uuid",
-            "selected_members": ["Alice", "Bob"]
+            "selected_members": ["Alice", "Bob"],
+            "fresh_roast": false  // optional, skip the roast cache
         }
 
-    Response:
+    Response (202, or 200 with status "completed" when an identical upload
+    was already analyzed and its result is reused):
         {
             "job_id": "uuid",
-            "status": "processing",
+            "status": "pending",
             "message": "Analysis started"
         }
+
+    Idempotent: a repeated request for a job that's already queued,
+    processing or completed gets that run back ("Analysis already started"
+    or "Analysis complete") instead of starting another one.
     """
     data = request.get_json()
 
@@ -194,6 +471,7 @@ def analyze_chat():
 
     job_id = data.get("job_id")
     selected_members = data.get("selected_members")
+    fresh_roast = bool(data.get("fresh_roast", False))
 
     if not job_id:
         return {"error": "job_id is required"}, 400
@@ -202,10 +480,14 @@ def analyze_chat():
         return {"error": "selected_members must be a non-empty list"}, 400
 
     # Get job
-    job = Job.query.get(job_id)
+    job = job_state.load(job_id)
     if not job:
         return {"error": "Job not found"}, 404
 
+    # Double-click or client retry: attach to the run that's already there
+    if job.status in RUN_STATUSES:
+        return _attach_to_run(job.id, job.status)
+
     if job.status != Job.STATUS_AWAITING_SELECTION:
         return {"error": f"Job is not awaiting selection (status: {job.status})"}, 400
 
@@ -214,17 +496,28 @@ def analyze_chat():
     if invalid_members:
         return {"error": f"Invalid members: {list(invalid_members)}"}, 400
 
+    # Only one of concurrent requests gets to start the run
+    if not job_state.claim_run(job, selected_members=selected_members):
+        return _attach_to_run(job.id, Job.STATUS_PENDING)
+
     try:
-        # Update job with selected members
-        job.selected_members = selected_members
-        job.status = Job.STATUS_PENDING
-        db.session.commit()
+        # Someone already analyzed this exact chat for the same members and year
+        if not fresh_roast:
+            source = find_duplicate_job(job)
+            if source and clone_job_result(job, source):
+                current_app.logger.info(f"Job {job.id} reused the result of job {source.id}")
+                return {
+                    "job_id": str(job.id),
+                    "status": job.status,
+                    "message": "Analysis complete",
+                }, 200
 
         # Cache updated status
         cache.set_job_status(str(job.id), job.to_status_dict())
 
-        # Queue processing task
-        process_chat_task.delay(str(job.id))
+        # Queue processing on the lane matching the job's estimated cost
+        queue = choose_queue(job)
+        start_processing(str(job.id), fresh_roast=fresh_roast, queue=queue)
 
         return {
             "job_id": str(job.id),
@@ -234,4 +527,7 @@ def analyze_chat():
 
     except Exception as e:
         current_app.logger.error(f"Analyze error: {e}")
+        # Nothing was queued - let the client try again
+        job_state.release_run(job)
+        cache.set_job_status(str(job.id), job.to_status_dict())
         return {"error": "Failed to start analysis"}, 500
@@ -1,5 +1,4 @@
 from .storage import StorageService
 from .cache import CacheService
-from core.ai import generate_roasts
 
-__all__ = ["StorageService", "CacheService", "generate_roasts"]
+__all__ = ["StorageService", "CacheService"]
@@ -1,17 +1,44 @@
-import json
 import gzip
-import base64
+import hashlib
+import json
 from flask import current_app
-from ..extensions import redis_client
+from core.roast_cache import RedisRoastCache
+from ..extensions import redis_client, redis_binary_client
+from .metrics import call_timer
+from .result_codec import result_codec
+
+
+# Latency buckets for single Redis calls (milliseconds)
+CALL_BUCKETS = (0.5, 1, 2, 5, 10, 25, 50, 100, 250, 1000)
+
+
+# Record CacheService call latencies as cache_<name>_ms
+timed = call_timer("cache", buckets=CALL_BUCKETS)
 
 
 class CacheService:
     """Redis cache service for job status and results"""
 
     # Key prefixes
-    PREFIX_STATUS = "job:status:"
+    PREFIX_STATE = "job:state:"
     PREFIX_RESULT = "job:result:"
-    PREFIX_PROGRESS = "job:progress:"
+    PREFIX_METRICS = "job:metrics:"
+    PREFIX_SLIDES = "job:slides:"
+    PREFIX_RESPONSE = "job:response:"
+    PREFIX_DEDUP = "upload:dedup:"
+    PREFIX_MULTIPART = "upload:multipart:"
+    PREFIX_CANCEL = "job:cancel:"
+    PREFIX_ROASTS = "job:roasts:"
+    CHANNEL_EVENTS = "job:events:"
+
+    # Result hash fields: one compressed field per section and per slide,
+    # plus an uncompressed layout field
+    FIELD_LAYOUT = "_layout"
+    FIELD_SECTION = "section:"
+    FIELD_SLIDE = "slide:"
+
+    # Job state hash fields written by progress updates
+    PROGRESS_FIELDS = ("progress", "current_step")
 
     def __init__(self):
         pass
@@ -20,114 +47,434 @@ class CacheService:
     def client(self):
         return redis_client
 
+    @property
+    def binary_client(self):
+        return redis_binary_client
+
     @property
     def result_ttl(self):
         return current_app.config.get("RESULT_TTL_SECONDS", 3600)
 
-    # Job status caching
-    def set_job_status(self, job_id: str, status: dict, ttl: int = None):
-        """Cache job status"""
+    # Job state: status, progress and step in one hash (one round trip to
+    # read, one MULTI to write). Values are JSON encoded to keep their types.
+    @staticmethod
+    def _decode_state(fields: dict) -> dict | None:
+        if not fields or "status" not in fields:
+            return None
+        return {name: json.loads(value) for name, value in fields.items()}
+
+    @timed("set_job_status")
+    def set_job_status(self, job_id: str, status: dict, ttl: int = None, overwrite_progress: bool = True):
+        """
+        Cache job status and publish it to the job's event channel
+
+        Args:
+            overwrite_progress: False keeps progress written by the worker
+                (for refilling the cache from a possibly stale DB row)
+        """
         if not self.client:
             return
 
-        key = f"{self.PREFIX_STATUS}{job_id}"
+        key = f"{self.PREFIX_STATE}{job_id}"
         ttl = ttl or self.result_ttl
-        self.client.setex(key, ttl, json.dumps(status))
+        fields = {name: json.dumps(value, default=str) for name, value in status.items()}
 
+        pipe = self.client.pipeline()
+        if overwrite_progress:
+            pipe.hset(key, mapping=fields)
+        else:
+            for name, value in fields.items():
+                if name in self.PROGRESS_FIELDS:
+                    pipe.hsetnx(key, name, value)
+                else:
+                    pipe.hset(key, name, value)
+        pipe.expire(key, ttl)
+        pipe.publish(f"{self.CHANNEL_EVENTS}{job_id}", json.dumps({"event": "status", **status}, default=str))
+        pipe.execute()
+
+    @timed("get_job_status")
     def get_job_status(self, job_id: str) -> dict | None:
-        """Get cached job status"""
+        """Get cached job status, including the latest progress"""
         if not self.client:
             return None
 
-        key = f"{self.PREFIX_STATUS}{job_id}"
-        data = self.client.get(key)
-        return json.loads(data) if data else None
+        return self._decode_state(self.client.hgetall(f"{self.PREFIX_STATE}{job_id}"))
+
+    @timed("get_job_statuses")
+    def get_job_statuses(self, job_ids: list[str]) -> dict[str, dict | None]:
+        """Get cached status for many jobs in one round trip (admin views)"""
+        if not self.client or not job_ids:
+            return {job_id: None for job_id in job_ids}
+
+        pipe = self.client.pipeline(transaction=False)
+        for job_id in job_ids:
+            pipe.hgetall(f"{self.PREFIX_STATE}{job_id}")
+        return {
+            job_id: self._decode_state(fields)
+            for job_id, fields in zip(job_ids, pipe.execute())
+        }
 
     def delete_job_status(self, job_id: str):
         """Delete cached job status"""
         if not self.client:
             return
 
-        key = f"{self.PREFIX_STATUS}{job_id}"
-        self.client.delete(key)
+        self.client.delete(f"{self.PREFIX_STATE}{job_id}")
 
     # Job progress (for real-time updates)
+    @timed("set_job_progress")
     def set_job_progress(self, job_id: str, progress: int, step: str = None):
-        """Update job progress in cache"""
+        """Update job progress in cache and publish it to the job's event channel"""
         if not self.client:
             return
 
-        key = f"{self.PREFIX_PROGRESS}{job_id}"
+        key = f"{self.PREFIX_STATE}{job_id}"
         data = {"progress": progress}
         if step:
             data["current_step"] = step
 
-        # Short TTL for progress updates
-        self.client.setex(key, 300, json.dumps(data))
+        pipe = self.client.pipeline()
+        pipe.hset(key, mapping={name: json.dumps(value) for name, value in data.items()})
+        pipe.expire(key, self.result_ttl)
+        pipe.publish(f"{self.CHANNEL_EVENTS}{job_id}", json.dumps({"event": "progress", **data}))
+        pipe.execute()
 
+    @timed("get_job_progress")
     def get_job_progress(self, job_id: str) -> dict | None:
         """Get job progress from cache"""
         if not self.client:
             return None
 
-        key = f"{self.PREFIX_PROGRESS}{job_id}"
-        data = self.client.get(key)
+        values = self.client.hmget(f"{self.PREFIX_STATE}{job_id}", list(self.PROGRESS_FIELDS))
+        progress = {
+            name: json.loads(value)
+            for name, value in zip(self.PROGRESS_FIELDS, values)
+            if value is not None
+        }
+        return progress or None
+
+    # Partial results (slides published while the job is processing)
+    @timed("add_partial_slide")
+    def add_partial_slide(self, job_id: str, slide: dict, ttl: int = None):
+        """Publish a finished slide for a job that is still processing"""
+        if not self.client:
+            return
+
+        key = f"{self.PREFIX_SLIDES}{job_id}"
+        ttl = ttl or self.result_ttl
+        pipe = self.client.pipeline()
+        pipe.hset(key, str(slide["id"]), json.dumps(slide, default=str))
+        pipe.expire(key, ttl)
+        pipe.execute()
+
+    @timed("get_partial_slides")
+    def get_partial_slides(self, job_id: str) -> list[dict]:
+        """Get slides published so far, in slide order"""
+        if not self.client:
+            return []
+
+        key = f"{self.PREFIX_SLIDES}{job_id}"
+        slides = self.client.hgetall(key)
+        return [json.loads(slides[slide_id]) for slide_id in sorted(slides, key=int)]
+
+    def delete_partial_slides(self, job_id: str):
+        """Delete partial slides (once the full result is cached)"""
+        if not self.client:
+            return
+
+        key = f"{self.PREFIX_SLIDES}{job_id}"
+        self.client.delete(key)
+
+    # Upload deduplication (same chat, year and members -> completed job)
+    def set_dedup_source(self, dedup_key: str, job_id: str, ttl: int):
+        """Point a dedup key at a completed job; ttl must not outlive the job"""
+        if not self.client or not dedup_key or ttl <= 0:
+            return
+        self.client.setex(f"{self.PREFIX_DEDUP}{dedup_key}", ttl, job_id)
+
+    def get_dedup_source(self, dedup_key: str) -> str | None:
+        """Get the completed job for a dedup key"""
+        if not self.client or not dedup_key:
+            return None
+        return self.client.get(f"{self.PREFIX_DEDUP}{dedup_key}")
+
+    def delete_dedup_source(self, dedup_key: str, job_id: str):
+        """Drop a dedup key if it still points at the job"""
+        if not self.client or not dedup_key:
+            return
+        key = f"{self.PREFIX_DEDUP}{dedup_key}"
+        if self.client.get(key) == job_id:
+            self.client.delete(key)
+
+    # Cancellation of in-flight jobs (outlives the job's other keys, so
+    # tasks still queued for it see the flag)
+    def set_job_cancelled(self, job_id: str, ttl: int = None):
+        """Flag a job as cancelled; its tasks stop at their next check"""
+        if not self.client:
+            return
+        self.client.setex(f"{self.PREFIX_CANCEL}{job_id}", ttl or self.result_ttl, 1)
+
+    @timed("is_job_cancelled")
+    def is_job_cancelled(self, job_id: str) -> bool:
+        """Check whether a job was cancelled"""
+        if not self.client:
+            return False
+        return bool(self.client.exists(f"{self.PREFIX_CANCEL}{job_id}"))
+
+    # Multipart uploads in flight (for completion timing)
+    def set_multipart_upload(self, upload_id: str, info: dict, ttl: int):
+        """Remember an initiated multipart upload"""
+        if not self.client:
+            return
+        self.client.setex(f"{self.PREFIX_MULTIPART}{upload_id}", ttl, json.dumps(info))
+
+    def pop_multipart_upload(self, upload_id: str) -> dict | None:
+        """Get and forget an initiated multipart upload"""
+        if not self.client:
+            return None
+        data = self.client.getdel(f"{self.PREFIX_MULTIPART}{upload_id}")
         return json.loads(data) if data else None
 
-    # Result caching (compressed + base64 encoded for Redis string mode)
-    def set_job_result(self, job_id: str, result: dict, ttl: int = None):
-        """Cache job result (compressed and base64 encoded)"""
+    # Per-job metrics (prompt size, latencies)
+    def set_job_metrics(self, job_id: str, job_metrics: dict, ttl: int = None):
+        """Store per-job metrics"""
+        if not self.client or not job_metrics:
+            return
+
+        key = f"{self.PREFIX_METRICS}{job_id}"
+        ttl = ttl or self.result_ttl
+        pipe = self.client.pipeline()
+        pipe.hset(key, mapping={k: json.dumps(v) for k, v in job_metrics.items()})
+        pipe.expire(key, ttl)
+        pipe.execute()
+
+    def get_job_metrics(self, job_id: str) -> dict:
+        """Get per-job metrics"""
         if not self.client:
+            return {}
+
+        key = f"{self.PREFIX_METRICS}{job_id}"
+        return {k: json.loads(v) for k, v in self.client.hgetall(key).items()}
+
+    # Result caching (hash of compressed fields on the binary client)
+    @timed("set_job_result")
+    def set_job_result(self, job_id: str, result: dict, ttl: int = None):
+        """Cache job result - each section and slide compressed into its own hash field"""
+        if not self.binary_client:
             return
 
         key = f"{self.PREFIX_RESULT}{job_id}"
         ttl = ttl or self.result_ttl
 
-        # Compress and base64 encode for Redis string storage
-        compressed = gzip.compress(json.dumps(result, default=str).encode("utf-8"))
-        encoded = base64.b64encode(compressed).decode("ascii")
-        self.client.setex(key, ttl, encoded)
+        fields = {}
+        for section, value in result.items():
+            if section == "slides":
+                for slide in value:
+                    fields[f"{self.FIELD_SLIDE}{slide['id']}"] = json.dumps(slide, default=str).encode("utf-8")
+            else:
+                fields[f"{self.FIELD_SECTION}{section}"] = json.dumps(value, default=str).encode("utf-8")
+
+        codec, encoded = result_codec.encode(self.binary_client, fields)
+        layout = {
+            "codec": codec,
+            "sections": list(result),
+            "slides": [slide["id"] for slide in result.get("slides", [])],
+        }
+        encoded[self.FIELD_LAYOUT] = json.dumps(layout).encode("utf-8")
+
+        pipe = self.binary_client.pipeline()
+        pipe.delete(key)
+        pipe.hset(key, mapping=encoded)
+        pipe.expire(key, ttl)
+        pipe.execute()
 
+    def _get_layout(self, key: str) -> dict | None:
+        data = self.binary_client.hget(key, self.FIELD_LAYOUT)
+        return json.loads(data) if data else None
+
+    @timed("get_job_result")
     def get_job_result(self, job_id: str) -> dict | None:
         """Get cached job result"""
-        if not self.client:
+        if not self.binary_client:
             return None
 
         key = f"{self.PREFIX_RESULT}{job_id}"
-        data = self.client.get(key)
+        try:
+            fields = {name.decode("utf-8"): value for name, value in self.binary_client.hgetall(key).items()}
+            if self.FIELD_LAYOUT not in fields:
+                return None
+
+            layout = json.loads(fields[self.FIELD_LAYOUT])
+            decompress = result_codec.decoder(self.binary_client, layout["codec"])
+
+            def load(field: str):
+                return json.loads(decompress(fields[field]))
+
+            result = {}
+            for section in layout["sections"]:
+                if section == "slides":
+                    result[section] = [load(f"{self.FIELD_SLIDE}{slide_id}") for slide_id in layout["slides"]]
+                else:
+                    result[section] = load(f"{self.FIELD_SECTION}{section}")
+            return result
+        except Exception as e:
+            # Unreadable entry (old format, expired dictionary) - treat as a miss
+            current_app.logger.warning(f"Cached result for job {job_id} unreadable: {e}")
+            return None
+
+    @timed("get_job_result_section")
+    def get_job_result_section(self, job_id: str, section: str):
+        """
+        Get one section of a cached result without loading the rest
 
-        if not data:
+        Returns:
+            The section's data, or None on a cache miss
+
+        Raises:
+            KeyError: If the result is cached but has no such section
+        """
+        if not self.binary_client:
             return None
 
+        key = f"{self.PREFIX_RESULT}{job_id}"
         try:
-            # Decode base64 then decompress
-            compressed = base64.b64decode(data)
-            decompressed = gzip.decompress(compressed)
-            return json.loads(decompressed.decode("utf-8"))
-        except Exception:
-            # Fall back to plain JSON
-            return json.loads(data)
+            layout = self._get_layout(key)
+            if layout is None:
+                return None
+            if section not in layout["sections"]:
+                raise KeyError(section)
+
+            if section == "slides":
+                names = [f"{self.FIELD_SLIDE}{slide_id}" for slide_id in layout["slides"]]
+            else:
+                names = [f"{self.FIELD_SECTION}{section}"]
+
+            values = self.binary_client.hmget(key, names)
+            if any(value is None for value in values):
+                return None
+
+            decompress = result_codec.decoder(self.binary_client, layout["codec"])
+            data = [json.loads(decompress(value)) for value in values]
+            return data if section == "slides" else data[0]
+        except KeyError:
+            raise
+        except Exception as e:
+            current_app.logger.warning(f"Cached result for job {job_id} unreadable: {e}")
+            return None
+
+    def sample_result_fields(self, limit: int = 200) -> list[bytes]:
+        """Raw (decompressed) fields of cached results, for dictionary training"""
+        if not self.binary_client:
+            return []
+
+        samples = []
+        for key in self.binary_client.scan_iter(match=f"{self.PREFIX_RESULT}*", count=100):
+            if len(samples) >= limit:
+                break
+            try:
+                fields = {name.decode("utf-8"): value for name, value in self.binary_client.hgetall(key).items()}
+                layout = json.loads(fields.pop(self.FIELD_LAYOUT))
+                decompress = result_codec.decoder(self.binary_client, layout["codec"])
+                samples.extend(decompress(value) for value in fields.values())
+            except Exception:
+                continue
+        return samples[:limit]
 
     def delete_job_result(self, job_id: str):
         """Delete cached job result"""
-        if not self.client:
+        if not self.binary_client:
             return
 
         key = f"{self.PREFIX_RESULT}{job_id}"
-        self.client.delete(key)
+        self.binary_client.delete(key)
+
+    # Job events (pub/sub for the SSE stream)
+    def subscribe_job_events(self, job_id: str):
+        """Subscribe to a job's status/progress events (caller closes it)"""
+        if not self.client:
+            return None
+
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(f"{self.CHANNEL_EVENTS}{job_id}")
+        return pubsub
+
+    # Precompressed stats responses (completed jobs are immutable)
+    def set_job_response(self, job_id: str, response: dict, ttl: int = None) -> tuple[str, bytes]:
+        """
+        Serialize and gzip a completed job's stats response, and store it
+
+        Returns:
+            Tuple of (strong ETag, gzipped body)
+        """
+        body = json.dumps(response, default=str, separators=(",", ":")).encode("utf-8")
+        etag = hashlib.sha256(body).hexdigest()[:32]
+        # mtime=0 keeps the gzip bytes deterministic for identical bodies
+        compressed = gzip.compress(body, compresslevel=9, mtime=0)
+
+        if self.binary_client:
+            key = f"{self.PREFIX_RESPONSE}{job_id}"
+            pipe = self.binary_client.pipeline()
+            pipe.hset(key, mapping={"etag": etag, "body": compressed})
+            pipe.expire(key, ttl or self.result_ttl)
+            pipe.execute()
+
+        return etag, compressed
+
+    @timed("get_job_response_etag")
+    def get_job_response_etag(self, job_id: str) -> str | None:
+        """Get the ETag of a stored response (no body transfer)"""
+        if not self.binary_client:
+            return None
+
+        etag = self.binary_client.hget(f"{self.PREFIX_RESPONSE}{job_id}", "etag")
+        return etag.decode("ascii") if etag else None
+
+    @timed("get_job_response")
+    def get_job_response(self, job_id: str) -> tuple[str, bytes] | None:
+        """Get a stored response as (etag, gzipped body)"""
+        if not self.binary_client:
+            return None
+
+        etag, body = self.binary_client.hmget(f"{self.PREFIX_RESPONSE}{job_id}", ["etag", "body"])
+        if not etag or not body:
+            return None
+        return etag.decode("ascii"), body
 
     # Cleanup
+    @timed("delete_job_cache")
     def delete_job_cache(self, job_id: str):
         """Delete all cached data for a job"""
-        if not self.client:
+        self.delete_jobs_cache([job_id])
+
+    def delete_jobs_cache(self, job_ids: list[str]):
+        """Delete all cached data for many jobs in one pipelined round trip"""
+        if not self.client or not job_ids:
             return
 
-        keys = [
-            f"{self.PREFIX_STATUS}{job_id}",
-            f"{self.PREFIX_RESULT}{job_id}",
-            f"{self.PREFIX_PROGRESS}{job_id}",
-        ]
-        self.client.delete(*keys)
+        # Cached roasts the jobs used hold member names too
+        pipe = self.client.pipeline(transaction=False)
+        for job_id in job_ids:
+            pipe.smembers(self.roast_index_key(job_id))
+        roast_keys = {f"{RedisRoastCache.PREFIX}{key}" for keys in pipe.execute() for key in keys}
+
+        prefixes = (
+            self.PREFIX_STATE,
+            self.PREFIX_RESULT,
+            self.PREFIX_METRICS,
+            self.PREFIX_SLIDES,
+            self.PREFIX_RESPONSE,
+            self.PREFIX_ROASTS,
+        )
+        pipe = self.client.pipeline(transaction=False)
+        for job_id in job_ids:
+            pipe.delete(*(f"{prefix}{job_id}" for prefix in prefixes))
+        if roast_keys:
+            pipe.delete(*roast_keys)
+        pipe.execute()
+
+    def roast_index_key(self, job_id: str) -> str:
+        """Set of roast cache entries a job read or wrote (see RedisRoastCache)"""
+        return f"{self.PREFIX_ROASTS}{job_id}"
 
     # Utility
     def ping(self) -> bool:
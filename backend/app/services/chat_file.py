@@ -0,0 +1,193 @@
+"""
+Reading uploaded chat exports
+
+Uploads are a plain .txt, WhatsApp's .zip ("_chat.txt" next to any media) or
+a .gz. ChatFile streams the chat text out of any of them over ranged storage
+reads: zip media is never downloaded, and the chat is decompressed and
+decoded chunk by chunk instead of in full.
+"""
+
+import codecs
+import gzip
+import hashlib
+import io
+import posixpath
+import zipfile
+import zlib
+
+FORMAT_TEXT = "text"
+FORMAT_ZIP = "zip"
+FORMAT_GZIP = "gzip"
+
+ZIP_MAGIC = b"PK\x03\x04"
+GZIP_MAGIC = b"\x1f\x8b"
+
+# Chunk size for storage reads and decompression
+READ_SIZE = 64 * 1024
+
+# Errors from a corrupt or truncated archive
+ARCHIVE_ERRORS = (zipfile.BadZipFile, gzip.BadGzipFile, zlib.error, EOFError)
+
+
+class ChatFileError(ValueError):
+    """Upload can't be read as a chat export (the message is shown to the user)"""
+
+
+def detect_format(head: bytes) -> str:
+    """Detect the upload format from its first bytes"""
+    if head.startswith(ZIP_MAGIC):
+        return FORMAT_ZIP
+    if head.startswith(GZIP_MAGIC):
+        return FORMAT_GZIP
+    return FORMAT_TEXT
+
+
+def find_chat_member(archive: zipfile.ZipFile) -> zipfile.ZipInfo | None:
+    """The chat text in a WhatsApp zip: _chat.txt (iOS) or the only .txt (Android)"""
+    texts = [
+        info for info in archive.infolist()
+        if not info.is_dir() and info.filename.lower().endswith(".txt")
+    ]
+    for info in texts:
+        if posixpath.basename(info.filename) == "_chat.txt":
+            return info
+    return texts[0] if texts else None
+
+
+class RangedReader(io.RawIOBase):
+    """
+    Seekable, read-only file over a stored object
+
+    Sequential reads share one streaming GET from the current position; a
+    seek elsewhere (zip directory lookups) starts a new one.
+    """
+
+    def __init__(self, storage, key: str, size: int):
+        self.storage = storage
+        self.key = key
+        self.size = size
+        self.bytes_read = 0
+        self._pos = 0
+        self._body = None
+        self._body_pos = None
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self.size
+        self._pos = max(0, offset)
+        return self._pos
+
+    def readinto(self, buffer) -> int:
+        if self._pos >= self.size:
+            return 0
+
+        if self._body is None or self._body_pos != self._pos:
+            self._close_body()
+            self._body = self.storage.open_stream(self.key, self._pos)
+            self._body_pos = self._pos
+
+        data = self._body.read(len(buffer))
+        count = len(data)
+        buffer[:count] = data
+        self._pos += count
+        self._body_pos += count
+        self.bytes_read += count
+        return count
+
+    def _close_body(self):
+        if self._body is not None:
+            self._body.close()
+            self._body = None
+
+    def close(self):
+        self._close_body()
+        super().close()
+
+
+class ChatFile:
+    """
+    Chat text of an upload, read as a stream
+
+    Usage:
+        with ChatFile(storage, key, size, max_text_bytes) as chat:
+            sample = chat.read_text(65536)
+            df = parse_whatsapp_stream(chat.lines(sample))
+    """
+
+    def __init__(self, storage, key: str, size: int, max_text_bytes: int):
+        self.max_text_bytes = max_text_bytes
+        self.text_bytes = 0
+        self.sha256 = hashlib.sha256()
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+
+        self._raw = RangedReader(storage, key, size)
+        buffered = io.BufferedReader(self._raw, buffer_size=READ_SIZE)
+        self.format = detect_format(buffered.peek(len(ZIP_MAGIC))[:len(ZIP_MAGIC)])
+
+        try:
+            if self.format == FORMAT_ZIP:
+                archive = zipfile.ZipFile(buffered)
+                member = find_chat_member(archive)
+                if member is None:
+                    raise ChatFileError("No chat found in the zip. Please upload the zip from WhatsApp's Export chat.")
+                if member.file_size > max_text_bytes:
+                    raise ChatFileError(self._too_large_message())
+                self._stream = archive.open(member)
+            elif self.format == FORMAT_GZIP:
+                self._stream = gzip.GzipFile(fileobj=buffered, mode="rb")
+            else:
+                self._stream = buffered
+        except Exception:
+            self._raw.close()
+            raise
+
+    @property
+    def bytes_read(self) -> int:
+        """Bytes downloaded from storage so far"""
+        return self._raw.bytes_read
+
+    def _too_large_message(self) -> str:
+        return f"Chat is too large. Maximum size is {self.max_text_bytes // (1024*1024)}MB uncompressed"
+
+    def read_text(self, size: int = READ_SIZE) -> str:
+        """Read and decode up to size bytes of chat text ("" at the end)"""
+        data = self._stream.read(size)
+        self.text_bytes += len(data)
+        if self.text_bytes > self.max_text_bytes:
+            raise ChatFileError(self._too_large_message())
+        self.sha256.update(data)
+        return self._decoder.decode(data, final=not data)
+
+    def lines(self, first_text: str = ""):
+        """Yield the chat's lines, starting with text already read by read_text"""
+        pending = first_text
+        while True:
+            *complete, pending = pending.split("\n")
+            yield from complete
+            chunk = self.read_text()
+            if not chunk:
+                break
+            pending += chunk
+        if pending:
+            yield pending
+
+    def close(self):
+        self._stream.close()
+        self._raw.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,160 @@
+"""
+Stage checkpoints for resumable chat processing
+
+Each processing stage (parse, stat groups, roast) saves its output keyed by job
+ID, so a Celery retry resumes from the first incomplete stage instead of
+re-downloading and re-parsing the chat.
+"""
+
+import gzip
+import hashlib
+import hmac
+import json
+import pickle
+from datetime import datetime, timezone
+from flask import current_app
+from ..extensions import redis_client
+from .storage import storage
+
+
+class JobCheckpoints:
+    """Checkpoint store for one job - index in Redis, large artifacts in storage"""
+
+    # Key prefixes
+    PREFIX = "job:checkpoints:"
+    STORAGE_PREFIX = "checkpoints"
+
+    # Small JSON stages kept inline in Redis; everything else is pickled to
+    # storage (DataFrames, numpy scalars and tuple keys don't survive JSON).
+    # Pickled blobs are signed with SECRET_KEY and only unpickled if the
+    # signature matches, so anyone who can write to the bucket can't run
+    # code on the workers. Workers must share SECRET_KEY to resume each
+    # other's jobs; a blob that fails the check (or can't be read at all) is
+    # dropped from the index, so the stage is recomputed.
+    INLINE_STAGES = {"roast", "roast:fallback"}
+    SIGNATURE_SIZE = hashlib.sha256().digest_size
+
+    def __init__(self, job_id: str):
+        self.job_id = str(job_id)
+
+    @property
+    def client(self):
+        return redis_client
+
+    @property
+    def key(self):
+        return f"{self.PREFIX}{self.job_id}"
+
+    @property
+    def ttl(self):
+        return current_app.config.get("RESULT_TTL_SECONDS", 3600)
+
+    def _storage_key(self, stage: str) -> str:
+        return f"{self.STORAGE_PREFIX}/{self.job_id}/{stage}.pkl.gz"
+
+    def _signature(self, stage: str, data: bytes) -> bytes:
+        # the job and stage are signed too, so a blob can't be replayed elsewhere
+        key = current_app.config["SECRET_KEY"].encode()
+        message = f"{self.job_id}/{stage}\n".encode() + data
+        return hmac.new(key, message, hashlib.sha256).digest()
+
+    def _sign(self, stage: str, data: bytes) -> bytes:
+        return self._signature(stage, data) + data
+
+    def _verify(self, stage: str, blob: bytes) -> bytes:
+        signature, data = blob[:self.SIGNATURE_SIZE], blob[self.SIGNATURE_SIZE:]
+        if not hmac.compare_digest(signature, self._signature(stage, data)):
+            raise ValueError("bad signature")
+        return data
+
+    def save(self, stage: str, value):
+        """Save a stage output"""
+        if not self.client:
+            return
+
+        entry = {"saved_at": datetime.now(timezone.utc).isoformat()}
+        if stage in self.INLINE_STAGES:
+            entry["value"] = value
+        else:
+            entry["key"] = self._storage_key(stage)
+            data = gzip.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), compresslevel=1)
+            storage.upload_bytes(self._sign(stage, data), entry["key"])
+
+        pipe = self.client.pipeline()
+        pipe.hset(self.key, stage, json.dumps(entry, default=str))
+        pipe.expire(self.key, self.ttl)
+        pipe.execute()
+
+    def load(self, stage: str):
+        """
+        Load a stage output, or None if the stage hasn't completed
+
+        An unreadable checkpoint is forgotten (has() turns False), so callers
+        recompute the stage instead of trusting it exists.
+        """
+        if not self.client:
+            return None
+
+        data = self.client.hget(self.key, stage)
+        if not data:
+            return None
+
+        entry = json.loads(data)
+        if "value" in entry:
+            return entry["value"]
+
+        try:
+            data = self._verify(stage, storage.download_file(entry["key"]))
+            return pickle.loads(gzip.decompress(data))
+        except Exception as e:
+            current_app.logger.warning(f"Checkpoint {stage} for job {self.job_id} unreadable: {e}")
+            self.client.hdel(self.key, stage)
+            return None
+
+    def has(self, stage: str) -> bool:
+        """Check if a stage has a checkpoint"""
+        if not self.client:
+            return False
+        return bool(self.client.hexists(self.key, stage))
+
+    def state(self) -> dict:
+        """Get completed stages and when they were saved (for job status)"""
+        if not self.client:
+            return {}
+
+        return {
+            stage: json.loads(entry)["saved_at"]
+            for stage, entry in self.client.hgetall(self.key).items()
+        }
+
+    def clear(self):
+        """Delete all checkpoints for the job (stored artifacts contain chat content)"""
+        if not self.client:
+            return
+
+        entries = [json.loads(entry) for entry in self.client.hgetall(self.key).values()]
+        keys = [entry["key"] for entry in entries if "key" in entry]
+        if keys:
+            storage.delete_files(keys)
+        self.client.delete(self.key)
+
+    @classmethod
+    def clear_many(cls, job_ids: list[str]):
+        """Delete checkpoints for many jobs (one Redis round trip per step)"""
+        if not redis_client or not job_ids:
+            return
+
+        keys = [f"{cls.PREFIX}{job_id}" for job_id in job_ids]
+        pipe = redis_client.pipeline(transaction=False)
+        for key in keys:
+            pipe.hvals(key)
+        stored = [
+            entry["key"]
+            for values in pipe.execute()
+            for entry in map(json.loads, values)
+            if "key" in entry
+        ]
+
+        if stored:
+            storage.delete_files(stored)
+        redis_client.delete(*keys)
@@ -0,0 +1,255 @@
+"""
+Write-behind job state
+
+Redis is authoritative for in-flight jobs: a state transition updates the
+Job in memory and queues its changed columns in Redis (the cached status is
+written by the caller as before). The flush_job_states task, run by celery
+beat, persists queued changes to Postgres in batches, so all transitions of
+a job between two flushes cost a single UPDATE.
+
+Starting a run is a compare-and-set (claim_run), and each task execution
+holds a per-stage lock, so duplicate analyze requests and overlapping task
+deliveries attach to the existing run instead of repeating it.
+"""
+
+import json
+import secrets
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import bindparam
+from sqlalchemy.orm.attributes import set_committed_value
+from ..extensions import db, redis_client
+from ..models import Job
+
+
+# Timestamp columns travel through Redis as ISO strings
+DATETIME_COLUMNS = {
+    column.name for column in Job.__table__.columns if isinstance(column.type, db.DateTime)
+}
+
+
+class JobStateService:
+    """Job state transitions, queued in Redis and flushed to Postgres"""
+
+    # Key prefixes
+    PREFIX_PENDING = "job:pending:"
+    PREFIX_RUN = "job:run:"
+    PREFIX_LOCK = "job:lock:"
+    KEY_DIRTY = "jobs:dirty"
+
+    @property
+    def client(self):
+        return redis_client
+
+    @property
+    def write_behind(self) -> bool:
+        return bool(self.client) and current_app.config.get("JOB_STATE_WRITE_BEHIND", True)
+
+    @staticmethod
+    def _encode(value) -> str:
+        return json.dumps(value.isoformat() if isinstance(value, datetime) else value)
+
+    @staticmethod
+    def _decode(name: str, value: str):
+        value = json.loads(value)
+        if name in DATETIME_COLUMNS and value is not None:
+            return datetime.fromisoformat(value)
+        return value
+
+    def update(self, job: Job, **changes):
+        """
+        Apply a state transition to a job
+
+        With write-behind the changes are queued for the flusher instead of
+        committed (they don't mark the row dirty, so a later commit won't
+        write them either); without it they're committed right away.
+        """
+        if not self.write_behind:
+            for name, value in changes.items():
+                setattr(job, name, value)
+            db.session.commit()
+            return
+
+        for name, value in changes.items():
+            set_committed_value(job, name, value)
+
+        job_id = str(job.id)
+        key = f"{self.PREFIX_PENDING}{job_id}"
+        pipe = self.client.pipeline()
+        # No expiry: the queue must outlive a stalled flusher, and flush or
+        # delete_pending always removes it
+        pipe.hset(key, mapping={name: self._encode(value) for name, value in changes.items()})
+        pipe.sadd(self.KEY_DIRTY, job_id)
+        pipe.execute()
+
+    def _apply_pending(self, job: Job, fields: dict):
+        for name, value in fields.items():
+            set_committed_value(job, name, self._decode(name, value))
+
+    def load(self, job_id: str) -> Job | None:
+        """Get a job with its queued changes applied (its current state)"""
+        job = db.session.get(Job, uuid.UUID(str(job_id)))
+        if job is None or not self.client:
+            return job
+
+        self._apply_pending(job, self.client.hgetall(f"{self.PREFIX_PENDING}{job.id}"))
+        return job
+
+    def load_many(self, job_ids: list[str]) -> list[Job]:
+        """Like load for many jobs (one query, one Redis round trip); missing ones are left out"""
+        jobs = Job.query.filter(Job.id.in_([uuid.UUID(str(job_id)) for job_id in job_ids])).all()
+        if not jobs or not self.client:
+            return jobs
+
+        pipe = self.client.pipeline(transaction=False)
+        for job in jobs:
+            pipe.hgetall(f"{self.PREFIX_PENDING}{job.id}")
+        for job, fields in zip(jobs, pipe.execute()):
+            self._apply_pending(job, fields)
+        return jobs
+
+    def flush(self, limit: int = 500) -> int:
+        """
+        Persist queued changes for up to limit jobs
+
+        Returns:
+            Number of jobs written
+        """
+        if not self.client:
+            return 0
+
+        job_ids = self.client.spop(self.KEY_DIRTY, limit)
+        if not job_ids:
+            return 0
+
+        # Read and clear each queue in one MULTI - changes queued meanwhile
+        # re-mark the job dirty and go out with the next flush
+        pipe = self.client.pipeline()
+        for job_id in job_ids:
+            pipe.hgetall(f"{self.PREFIX_PENDING}{job_id}")
+            pipe.delete(f"{self.PREFIX_PENDING}{job_id}")
+        queued = dict(zip(job_ids, pipe.execute()[::2]))
+
+        # One executemany per set of changed columns
+        batches = defaultdict(list)
+        for job_id, fields in queued.items():
+            if fields:
+                values = {name: self._decode(name, value) for name, value in fields.items()}
+                batches[tuple(sorted(values))].append({"_job_id": uuid.UUID(job_id), **values})
+
+        table = Job.__table__
+        try:
+            for rows in batches.values():
+                db.session.execute(table.update().where(table.c.id == bindparam("_job_id")), rows)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            self._requeue(queued)
+            raise
+
+        return sum(len(rows) for rows in batches.values())
+
+    def _requeue(self, queued: dict[str, dict]):
+        """Queue changes again after a failed flush (changes queued since win)"""
+        pipe = self.client.pipeline()
+        for job_id, fields in queued.items():
+            if not fields:
+                continue
+            key = f"{self.PREFIX_PENDING}{job_id}"
+            for name, value in fields.items():
+                pipe.hsetnx(key, name, value)
+            pipe.sadd(self.KEY_DIRTY, job_id)
+        pipe.execute()
+
+    def claim_run(self, job: Job, **changes) -> bool:
+        """
+        Move a job from awaiting_selection to pending, exactly once
+
+        Of concurrent callers only one gets True (and applies changes with the
+        transition); the others should attach to that run. Uses SET NX in
+        Redis, or a conditional UPDATE without it.
+        """
+        changes["status"] = Job.STATUS_PENDING
+
+        if not self.client:
+            table = Job.__table__
+            claimed = db.session.execute(
+                table.update()
+                .where(table.c.id == job.id, table.c.status == Job.STATUS_AWAITING_SELECTION)
+                .values(**changes)
+            ).rowcount == 1
+            db.session.commit()
+            if claimed:
+                for name, value in changes.items():
+                    set_committed_value(job, name, value)
+            return claimed
+
+        ttl = current_app.config.get("UPLOAD_TTL_SECONDS", 7200)
+        if not self.client.set(f"{self.PREFIX_RUN}{job.id}", 1, nx=True, ex=ttl):
+            return False
+        self.update(job, **changes)
+        return True
+
+    def release_run(self, job: Job):
+        """Undo claim_run when the run couldn't be queued (the client may retry)"""
+        self.update(job, status=Job.STATUS_AWAITING_SELECTION)
+        if self.client:
+            self.client.delete(f"{self.PREFIX_RUN}{job.id}")
+
+    def acquire_lock(self, job_id: str, name: str, ttl: int) -> str | None:
+        """
+        Lock one stage of a job for a task execution
+
+        Returns:
+            Token for release_lock, or None if another execution holds it
+            (always a token without Redis)
+        """
+        token = secrets.token_hex(8)
+        if not self.client:
+            return token
+        if not self.client.set(f"{self.PREFIX_LOCK}{job_id}:{name}", token, nx=True, ex=ttl):
+            return None
+        return token
+
+    def release_lock(self, job_id: str, name: str, token: str):
+        """Release a stage lock if it's still ours (it may have expired and moved on)"""
+        if not self.client:
+            return
+        key = f"{self.PREFIX_LOCK}{job_id}:{name}"
+
+        def delete_if_owner(pipe):
+            if pipe.get(key) == token:
+                pipe.multi()
+                pipe.delete(key)
+
+        self.client.transaction(delete_if_owner, key)
+
+    def pending_count(self) -> int:
+        """Jobs with changes waiting for the flusher"""
+        return self.client.scard(self.KEY_DIRTY) if self.client else 0
+
+    def delete_pending(self, job_ids: list[str]):
+        """Drop queued changes and run claims of deleted jobs"""
+        if not self.client or not job_ids:
+            return
+
+        pipe = self.client.pipeline(transaction=False)
+        pipe.delete(*(f"{prefix}{job_id}" for job_id in job_ids for prefix in (self.PREFIX_PENDING, self.PREFIX_RUN)))
+        pipe.srem(self.KEY_DIRTY, *job_ids)
+        pipe.execute()
+
+
+def db_pool_status() -> dict:
+    """Connection pool usage of this process (QueuePool; other pools report less)"""
+    pool = db.engine.pool
+    status = {"class": type(pool).__name__}
+    for name in ("size", "checkedout", "checkedin", "overflow"):
+        if hasattr(pool, name):
+            status[name] = getattr(pool, name)()
+    return status
+
+
+# Singleton instance
+job_state = JobStateService()
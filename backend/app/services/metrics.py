@@ -0,0 +1,160 @@
+"""
+Lightweight counters and histograms for the API and workers
+
+Served by GET /api/metrics; see MetricsService for how writes are batched.
+"""
+
+import functools
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from ..extensions import redis_client
+
+
+class MetricsService:
+    """
+    Counters and histograms aggregated in Redis
+
+    Writes are buffered in-process and flushed in one pipeline at most every
+    FLUSH_INTERVAL seconds, so recording a metric never adds a round trip.
+    """
+
+    # Key prefixes
+    PREFIX_COUNTER = "metrics:counter:"
+    PREFIX_HISTOGRAM = "metrics:hist:"
+    KEY_NAMES = "metrics:names"
+
+    # Default histogram buckets (milliseconds)
+    DEFAULT_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+    FLUSH_INTERVAL = 5
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(int)
+        self._histograms = defaultdict(lambda: defaultdict(float))
+        self._last_flush = time.monotonic()
+
+    @property
+    def client(self):
+        return redis_client
+
+    # Recording
+    def incr(self, name: str, amount: int = 1):
+        """Increment a counter"""
+        with self._lock:
+            self._counters[name] += amount
+        self._maybe_flush()
+
+    def observe(self, name: str, value: float, buckets: tuple = None):
+        """Record a value into a histogram"""
+        buckets = buckets or self.DEFAULT_BUCKETS
+        bucket = next((f"le_{b}" for b in buckets if value <= b), "le_inf")
+
+        with self._lock:
+            hist = self._histograms[name]
+            hist["count"] += 1
+            hist["sum"] += value
+            hist[bucket] += 1
+        self._maybe_flush()
+
+    @contextmanager
+    def timer(self, name: str, buckets: tuple = None):
+        """Time a block and record it in milliseconds"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, (time.perf_counter() - start) * 1000, buckets=buckets)
+
+    # Flushing
+    def _maybe_flush(self):
+        if time.monotonic() - self._last_flush >= self.FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        """Push buffered metrics to Redis in a single round trip"""
+        with self._lock:
+            counters, self._counters = self._counters, defaultdict(int)
+            histograms, self._histograms = self._histograms, defaultdict(lambda: defaultdict(float))
+            self._last_flush = time.monotonic()
+
+        if not self.client or not (counters or histograms):
+            return
+
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for name, amount in counters.items():
+                pipe.sadd(self.KEY_NAMES, f"counter:{name}")
+                pipe.incrby(f"{self.PREFIX_COUNTER}{name}", amount)
+            for name, fields in histograms.items():
+                pipe.sadd(self.KEY_NAMES, f"hist:{name}")
+                key = f"{self.PREFIX_HISTOGRAM}{name}"
+                for field, amount in fields.items():
+                    pipe.hincrbyfloat(key, field, amount)
+            pipe.execute()
+        except Exception:
+            # Metrics are best-effort
+            pass
+
+    # Reading
+    def snapshot(self) -> dict:
+        """Get all flushed counters and histograms"""
+        self.flush()
+        if not self.client:
+            return {"counters": {}, "histograms": {}}
+
+        names = sorted(self.client.smembers(self.KEY_NAMES))
+        counter_names = [n.split(":", 1)[1] for n in names if n.startswith("counter:")]
+        hist_names = [n.split(":", 1)[1] for n in names if n.startswith("hist:")]
+
+        pipe = self.client.pipeline(transaction=False)
+        for name in counter_names:
+            pipe.get(f"{self.PREFIX_COUNTER}{name}")
+        for name in hist_names:
+            pipe.hgetall(f"{self.PREFIX_HISTOGRAM}{name}")
+        values = pipe.execute()
+
+        counters = {
+            name: int(value or 0)
+            for name, value in zip(counter_names, values[:len(counter_names)])
+        }
+
+        histograms = {}
+        for name, fields in zip(hist_names, values[len(counter_names):]):
+            count = float(fields.pop("count", 0))
+            total = float(fields.pop("sum", 0))
+            histograms[name] = {
+                "count": int(count),
+                "sum": round(total, 2),
+                "mean": round(total / count, 2) if count else None,
+                "buckets": {k: int(float(v)) for k, v in fields.items()},
+            }
+
+        return {"counters": counters, "histograms": histograms}
+
+
+# Singleton instance
+metrics = MetricsService()
+
+
+def call_timer(prefix: str, buckets: tuple = None):
+    """
+    Build a decorator that records a service's call latencies as
+    <prefix>_<name>_ms histograms, e.g.
+
+        timed = call_timer("cache", buckets=CALL_BUCKETS)
+
+        @timed("get_job_status")
+        def get_job_status(self, job_id): ...
+    """
+    def timed(name: str):
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with metrics.timer(f"{prefix}_{name}_ms", buckets=buckets):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+    return timed
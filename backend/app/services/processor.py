@@ -3,44 +3,30 @@ Processing service - wraps existing parser and stats modules
 """
 
 import random
-from core.parser import parse_whatsapp_content, detect_group_names, merge_similar_contacts
+from core.parser import parse_whatsapp_content, parse_whatsapp_stream, detect_group_names, merge_similar_contacts
 from core.stats import (
-    get_basic_stats, get_top_chatters, get_hourly_activity, get_daily_activity,
+    get_top_chatters, get_hourly_activity, get_daily_activity,
     get_emoji_stats, get_emoji_stats_by_user, get_media_stats, get_word_stats,
     get_conversation_starters, get_night_owls, get_early_birds, get_longest_messages,
     get_busiest_dates, get_response_pairs, get_double_texters, get_conversation_killers,
     get_response_times, get_streak_stats, get_caps_users, get_question_askers,
     get_link_sharers, get_one_worders, get_monologuers, get_laugh_stats,
-    get_unique_words_per_person, get_catchphrases, get_interesting_topics, get_group_vibe
+    get_unique_words_per_person, get_catchphrases, get_interesting_topics
 )
 from core.roasts import assign_personality_tags
-from core.ai import generate_roasts
+from core.ai import start_roasts, fallback_roasts
+from core.constants import SLIDE_MANIFEST, STAT_GROUP_NAMES, ROAST_INPUT_GROUPS
 
 
-def quick_parse_participants(content: str) -> tuple[list[str], str | None]:
-    """
-    Quick parse to extract participants and group name.
-    Fast operation suitable for sync execution.
-
-    Returns:
-        Tuple of (participants_list, group_name)
-    """
-    df = parse_whatsapp_content(content)
-
-    if df.empty:
-        return [], None
+class JobCancelled(Exception):
+    """The job was cancelled (deleted) while it was being processed"""
 
-    # Merge similar contacts
-    df = merge_similar_contacts(df)
-
-    # Detect group names (filters system senders)
-    df, group_names, current_group_name = detect_group_names(df)
 
-    # Get unique non-system senders
-    user_df = df[~df['is_system']]
-    participants = sorted(user_df['sender'].unique().tolist())
-
-    return participants, current_group_name
+def parse_chat(content, dialect: int | None = None):
+    """Parse chat text given as a string or an iterable of lines"""
+    if isinstance(content, str):
+        return parse_whatsapp_content(content, dialect)
+    return parse_whatsapp_stream(content, dialect)
 
 
 def validate_whatsapp_format(content: str) -> tuple[bool, str]:
@@ -72,15 +58,332 @@ def validate_whatsapp_format(content: str) -> tuple[bool, str]:
     return True, ""
 
 
-def process_chat(file_content: str, year: int = 2025, selected_members: list[str] = None, progress_callback=None) -> dict:
+def _top_n(d, n):
+    """Get top N items from dict"""
+    if not d:
+        return {}
+    return dict(list(d.items())[:n])
+
+
+def _overview_slide(stats: dict) -> dict:
+    """Slide 1 - group totals"""
+    media_by_type = stats["media"].get("by_type", {}) if stats["media"] else {}
+    return {
+        "year": stats["year"],
+        "total_participants": stats["total_participants"],
+        "streak": stats["streak_stats"],
+        "total_messages": stats["total_messages"],
+        "total_images": int(media_by_type.get("image", 0)),
+        "total_videos": int(media_by_type.get("video", 0)),
+        "total_gifs": int(media_by_type.get("gif", 0)),
+        "total_stickers": int(media_by_type.get("sticker", 0)),
+        "total_audio": int(media_by_type.get("audio", 0)),
+        "total_documents": int(media_by_type.get("document", 0)),
+    }
+
+
+def _ranking_slide(stats: dict) -> dict:
+    """Slide 2 - top chatters"""
+    return {
+        "rankings": [{"name": k, "count": int(v)} for k, v in stats["top_chatters"].items()]
+    }
+
+
+def _emojis_slide(stats: dict) -> dict:
+    """Slide 3 - emoji game"""
+    emojis, user_emojis = stats["emojis"], stats["user_emojis"]
+    return {
+        "group_top_emojis": [[e, int(c)] for e, c in list(emojis.items())[:10]] if emojis else [],
+        "per_person": {k: [[e, int(c)] for e, c in v.get("top", {}).items()] for k, v in user_emojis.items()} if user_emojis else {}
+    }
+
+
+def _activity_slide(stats: dict) -> dict:
+    """Slide 4 - peak activity"""
+    hourly, daily, busiest_dates = stats["hourly"], stats["daily"], stats["busiest_dates"]
+
+    # Convert date keys to strings
+    busiest_dates_serializable = {
+        str(k): v for k, v in busiest_dates.items()
+    } if busiest_dates else {}
+
+    # Find peak hour (single most active hour)
+    peak_hour = int(max(hourly.items(), key=lambda x: x[1])[0]) if hourly else None
+
+    # Find busiest day
+    busiest_day = list(busiest_dates_serializable.items())[0] if busiest_dates_serializable else None
+
+    return {
+        "busiest_day": {"date": busiest_day[0], "count": int(busiest_day[1])} if busiest_day else None,
+        "peak_hour": peak_hour,
+        "peak_hour_formatted": f"{peak_hour}:00" if peak_hour is not None else None,
+        "hourly_distribution": {int(k): int(v) for k, v in hourly.items()} if hourly else {},
+        "daily_distribution": {k: int(v) for k, v in daily.items()} if daily else {},
+    }
+
+
+def _words_slide(stats: dict) -> dict:
+    """Slide 5 - word cloud"""
+    words, topics = stats["words"], stats["topics"]
+    return {
+        "top_words": [[w, int(c)] for w, c in list(words.items())[:100]] if words else [],
+        "topics": topics[:4] if topics else [],
+    }
+
+
+def _signature_words_slide(stats: dict) -> dict:
+    """Slide 6 - signature words per person (top 4 each)"""
+    signature_words = {}
+    for person, words_dict in stats["unique_words"].items():
+        # words_dict is a dict like {"word": {"score": ..., "count": ...}}
+        signature_words[person] = list(words_dict.keys())[:4] if words_dict else []
+    return {"per_person": signature_words}
+
+
+def _convo_dynamics_slide(stats: dict) -> dict:
+    """Slide 7 - conversation starters and killers"""
+    starters, conv_killers = stats["starters"], stats["conv_killers"]
+
+    # For 2-person chats, show only 1 person for starters/killers
+    top_n_for_dynamics = 1 if stats["total_participants"] == 2 else 2
+    return {
+        "starters": list(starters.keys())[:top_n_for_dynamics] if starters else [],
+        "killers": list(conv_killers.keys())[:top_n_for_dynamics] if conv_killers else [],
+    }
+
+
+def _chat_graph_slide(stats: dict) -> dict:
+    """Slide 8 - chat dynamics for graph (max 7 people)"""
+    top_chatters, user_df = stats["top_chatters"], stats["user_df"]
+
+    chat_dynamics = []
+    for person in list(top_chatters.keys())[:7]:
+        person_df = user_df[user_df['sender'] == person]
+        # messages per day of week
+        daily_dist = {k: int(v) for k, v in person_df['day_of_week'].value_counts().to_dict().items()}
+        chat_dynamics.append({
+            "name": person,
+            "messages": int(top_chatters.get(person, 0)),
+            "daily_distribution": daily_dist,
+        })
+    return {"members": chat_dynamics}
+
+
+def _fun_stats_slide(stats: dict) -> dict:
+    """Slide 9 - fun stats"""
+    double_texters, caps_users = stats["double_texters"], stats["caps_users"]
+    question_askers, link_sharers = stats["question_askers"], stats["link_sharers"]
+    return {
+        "double_texter": [list(double_texters.keys())[0], int(list(double_texters.values())[0])] if double_texters else None,
+        "caps_lock_user": [list(caps_users.keys())[0], int(list(caps_users.values())[0].get("caps_messages", 0))] if caps_users else None,
+        "question_asker": [list(question_askers.keys())[0], int(list(question_askers.values())[0].get("questions", 0))] if question_askers else None,
+        "link_sharer": [list(link_sharers.keys())[0], int(list(link_sharers.values())[0])] if link_sharers else None,
+    }
+
+
+def _ai_roasts_slide(stats: dict) -> dict:
+    """Slide 10 - AI roasts"""
+    ai_roasts = stats["ai_roasts"]
+    return {
+        "brainrot_score": ai_roasts.get("brainrot_score", 50),
+        "group_roast": ai_roasts.get("group_roast", []),
+        "individual_roasts": ai_roasts.get("individual_roasts", {}),
+    }
+
+
+# Slide builders keyed by slide type, with the stats each one needs.
+# A slide is built (and published) as soon as all of its inputs exist.
+SLIDE_BUILDERS = {
+    "overview": (("total_messages", "total_participants", "media", "streak_stats"), _overview_slide),
+    "ranking": (("top_chatters",), _ranking_slide),
+    "emojis": (("emojis", "user_emojis"), _emojis_slide),
+    "activity": (("hourly", "daily", "busiest_dates"), _activity_slide),
+    "words": (("words", "topics"), _words_slide),
+    "signature_words": (("unique_words",), _signature_words_slide),
+    "convo_dynamics": (("starters", "conv_killers", "total_participants"), _convo_dynamics_slide),
+    "chat_graph": (("top_chatters", "user_df"), _chat_graph_slide),
+    "fun_stats": (("double_texters", "caps_users", "question_askers", "link_sharers"), _fun_stats_slide),
+    "ai_roasts": (("ai_roasts",), _ai_roasts_slide),
+}
+
+
+def build_ready_slides(stats: dict, built: dict, slide_callback=None) -> list[dict]:
+    """
+    Build every slide whose inputs are available and that isn't built yet
+
+    Args:
+        stats: Computed stats so far (name -> value)
+        built: Slides built so far (id -> slide), updated in place
+        slide_callback: Optional callback(slide) for each newly built slide
+
+    Returns:
+        List of newly built slides
+    """
+    new_slides = []
+    for slide_id, title, slide_type in SLIDE_MANIFEST:
+        if slide_id in built:
+            continue
+
+        requires, build = SLIDE_BUILDERS[slide_type]
+        if not all(name in stats for name in requires):
+            continue
+
+        slide = {"id": slide_id, "title": title, "type": slide_type, "data": build(stats)}
+        built[slide_id] = slide
+        new_slides.append(slide)
+        if slide_callback:
+            slide_callback(slide)
+
+    return new_slides
+
+
+def _overview_stats(df, user_df) -> dict:
+    """Stat group: overview, top chatters and chat graph inputs"""
+    return {
+        "top_chatters": get_top_chatters(df, user_df),
+        "hourly": get_hourly_activity(df, user_df),
+        "media": get_media_stats(df, user_df),
+        "streak_stats": get_streak_stats(df, user_df),
+    }
+
+
+def _conversation_stats(df, user_df) -> dict:
+    """Stat group: conversation patterns"""
+    return {
+        "starters": get_conversation_starters(df, user_df),
+        "conv_killers": get_conversation_killers(df, user_df),
+        "night_owls": get_night_owls(df, user_df),
+        "early_birds": get_early_birds(df, user_df),
+        "longest_msgs": get_longest_messages(df, user_df),
+    }
+
+
+def _emoji_word_stats(df, user_df) -> dict:
+    """Stat group: emojis and words"""
+    return {
+        "emojis": get_emoji_stats(df, user_df),
+        "user_emojis": get_emoji_stats_by_user(df, user_df),
+        "words": get_word_stats(df, user_df, top_n=100),
+    }
+
+
+def _behavior_stats(df, user_df) -> dict:
+    """Stat group: behavioral patterns"""
+    return {
+        "double_texters": get_double_texters(df, user_df),
+        "response_times": get_response_times(df, user_df),
+        "caps_users": get_caps_users(df, user_df),
+        "question_askers": get_question_askers(df, user_df),
+        "link_sharers": get_link_sharers(df, user_df),
+        "one_worders": get_one_worders(df, user_df),
+        "monologuers": get_monologuers(df, user_df),
+        "laugh_stats": get_laugh_stats(df, user_df),
+    }
+
+
+def _signature_stats(df, user_df) -> dict:
+    """Stat group: signature words and topics"""
+    return {
+        "unique_words": get_unique_words_per_person(df, user_df, top_n=10),
+        "topics": get_interesting_topics(df, user_df),
+    }
+
+
+def _activity_stats(df, user_df) -> dict:
+    """Stat group: activity and remaining stats (not needed by the roast prompt)"""
+    return {
+        "daily": get_daily_activity(df, user_df),
+        "busiest_dates": get_busiest_dates(df, user_df),
+        "response_pairs": get_response_pairs(df, user_df),
+        "catchphrases": get_catchphrases(df, user_df),
+    }
+
+
+# Independent stat groups: (name, progress, step, compute(df, user_df) -> dict).
+# Groups only read the parsed chat, so they can run in any order or in
+# parallel (see the Celery pipeline in tasks.processing).
+STAT_GROUPS = [
+    ("overview", 30, "Calculating basic stats...", _overview_stats),
+    ("conversation", 40, "Analyzing conversation patterns...", _conversation_stats),
+    ("emoji_words", 50, "Analyzing emojis and media...", _emoji_word_stats),
+    ("behavior", 60, "Analyzing behavioral patterns...", _behavior_stats),
+    ("signature", 70, "Extracting signature words...", _signature_stats),
+    ("activity", 85, "Analyzing activity patterns...", _activity_stats),
+]
+
+if [name for name, *_ in STAT_GROUPS] != list(STAT_GROUP_NAMES):
+    raise RuntimeError("STAT_GROUPS and core.constants.STAT_GROUP_NAMES are out of sync")
+
+
+def compute_stat_group(name: str, df, user_df) -> dict:
+    """Compute one stat group by name"""
+    for group_name, _, _, compute in STAT_GROUPS:
+        if group_name == name:
+            return compute(df, user_df)
+    raise ValueError(f"Unknown stat group: {name}")
+
+
+def base_stats(df, user_df, year: int) -> dict:
+    """Stats every slide builder can rely on (cheap, computed up front)"""
+    return {
+        "year": year,
+        "user_df": user_df,
+        "total_messages": len(user_df),
+        "total_participants": int(user_df['sender'].nunique()),
+    }
+
+
+def compute_personality_tags(df, stats: dict) -> dict:
+    """Assign personality tags from already computed stats"""
+    stats_cache = {
+        'double_texters': stats["double_texters"],
+        'conv_killers': stats["conv_killers"],
+        'response_times': stats["response_times"],
+        'caps_users': stats["caps_users"],
+        'question_askers': stats["question_askers"],
+        'link_sharers': stats["link_sharers"],
+        'one_worders': stats["one_worders"],
+        'night_owls': stats["night_owls"],
+        'early_birds': stats["early_birds"],
+        'monologuers': stats["monologuers"],
+        'laugh_stats': stats["laugh_stats"],
+        'top_chatters': stats["top_chatters"],
+        'longest_msgs': stats["longest_msgs"],
+        'conv_starters': stats["starters"],
+        'media_stats': stats["media"],
+        'emoji_stats': stats["user_emojis"],
+    }
+    return assign_personality_tags(df, stats_cache)
+
+
+def process_chat(file_content: str, year: int = 2025, selected_members: list[str] = None, progress_callback=None,
+                 roast_timeout: float = None, roast_cache=None, fresh_roast: bool = False,
+                 roast_token_budget: int = None, job_metrics: dict = None, slide_callback=None,
+                 checkpoints=None, ai_roasts_enabled: bool = True, cancelled=None) -> dict:
     """
     Process WhatsApp chat and return all stats
 
     Args:
-        file_content: Raw text content of WhatsApp export
+        file_content: Raw text content of WhatsApp export, an iterable of its
+            lines, or a callable returning either (only called when there's no
+            usable parse checkpoint); None when resuming from a checkpoint
         year: Year to filter messages
         selected_members: List of members to include in analysis (None = all)
         progress_callback: Optional callback(progress: int, step: str)
+        roast_timeout: Deadline in seconds for the AI roast request (None = default)
+        roast_cache: Optional core.roast_cache.RoastCache for identical prompts
+        fresh_roast: Skip the roast cache lookup and always call OpenAI
+        roast_token_budget: Token budget for the roast prompt (None = default)
+        job_metrics: Optional dict that receives roast prompt size and latency
+        slide_callback: Optional callback(slide: dict), called as soon as each
+            slide is ready (in dependency order, not slide order)
+        checkpoints: Optional store with load(stage)/save(stage, value); the
+            parse, stat group and roast stages are saved there and skipped
+            when a checkpoint already exists
+        ai_roasts_enabled: Call OpenAI for roasts (False uses canned roasts)
+        cancelled: Optional callable returning True once the job is cancelled;
+            checked before each stat group and around the roast (whose
+            request it aborts), raising JobCancelled
 
     Returns:
         Dictionary with all computed statistics
@@ -92,6 +395,10 @@ def process_chat(file_content: str, year: int = 2025, selected_members: list[str
     start_time = time.time()
     last_time = start_time
 
+    def check_cancelled():
+        if cancelled and cancelled():
+            raise JobCancelled("Job was cancelled")
+
     def update_progress(progress: int, step: str):
         nonlocal last_time
         now = time.time()
@@ -102,9 +409,92 @@ def process_chat(file_content: str, year: int = 2025, selected_members: list[str
         if progress_callback:
             progress_callback(progress, step)
 
+    df, current_group_name, total_before = load_or_parse_chat(
+        file_content, year, selected_members, update_progress, checkpoints
+    )
+    user_df = get_user_messages(df)
+
+    # Computed stats, consumed by the slide builders
+    stats = base_stats(df, user_df, year)
+    slides = {}
+
+    def publish_ready_slides():
+        build_ready_slides(stats, slides, slide_callback)
+
+    def fire_roasts():
+        return start_roasts(
+            timeout=roast_timeout,
+            cache=roast_cache,
+            fresh=fresh_roast,
+            token_budget=roast_token_budget,
+            metrics=job_metrics,
+            cancelled=cancelled,
+            **build_roast_inputs(stats, user_df, current_group_name, year),
+        )
+
+    ai_roasts = checkpoints.load("roast") if checkpoints else None
+    roasts_future = None
+    done_groups = set()
+
+    # Steps 5-10: Stat groups. Slides are published as their inputs complete;
+    # the AI roast fires as soon as its inputs are ready and runs in the
+    # background while the remaining groups are computed.
+    for name, progress, step, compute in STAT_GROUPS:
+        check_cancelled()
+        group_stats = checkpoints.load(f"stats:{name}") if checkpoints else None
+        if group_stats is None:
+            update_progress(progress, step)
+            group_stats = compute(df, user_df)
+            if checkpoints:
+                checkpoints.save(f"stats:{name}", group_stats)
+
+        stats.update(group_stats)
+        done_groups.add(name)
+        publish_ready_slides()
+
+        if "personality_tags" not in stats and ROAST_INPUT_GROUPS <= done_groups:
+            update_progress(progress, "Building personality profiles...")
+            stats["personality_tags"] = compute_personality_tags(df, stats)
+            if ai_roasts is None and ai_roasts_enabled:
+                update_progress(progress, "Judging your year...")
+                roasts_future = fire_roasts()
+
+    # Step 13: Collect AI roasts (bounded by the roast deadline)
+    update_progress(95, "Judging your year...")
+    check_cancelled()
+    if ai_roasts is None:
+        if roasts_future:
+            ai_roasts = roasts_future.result()
+            # A cancelled request comes back as fallback roasts
+            check_cancelled()
+        else:
+            ai_roasts = fallback_roasts(stats["top_chatters"])
+        # Fallback roasts aren't worth keeping - a retry should try again
+        if not ai_roasts.pop("fallback", False) and checkpoints:
+            checkpoints.save("roast", ai_roasts)
+    stats["ai_roasts"] = ai_roasts
+    publish_ready_slides()
+
+    result = compile_result(stats, slides, current_group_name, total_before, len(df))
+
+    update_progress(100, "Complete")
+
+    return result
+
+
+def _parse_stage(file_content, year: int, selected_members: list[str] | None, update_progress):
+    """
+    Parse, clean and filter the chat
+
+    Returns:
+        Tuple of (df, group_name, total_messages_in_file)
+    """
+    if file_content is None:
+        raise ValueError("No file content to parse")
+
     # Step 1: Parse
     update_progress(10, "Parsing messages...")
-    df = parse_whatsapp_content(file_content)
+    df = parse_chat(file_content)
 
     if df.empty:
         raise ValueError("No messages found in file")
@@ -130,92 +520,69 @@ def process_chat(file_content: str, year: int = 2025, selected_members: list[str
         update_progress(27, "Filtering to selected members...")
         df = df[df['sender'].isin(selected_members) | df['is_system']].copy()
 
-    # Pre-filter user messages
+    return df, current_group_name, total_before
+
+
+def load_or_parse_chat(file_content, year: int, selected_members: list[str] | None,
+                       update_progress, checkpoints=None):
+    """
+    Parse the chat, or resume from the parse checkpoint
+
+    file_content may be a callable that opens the chat; it's only called when
+    the checkpoint is missing or unreadable, so resuming skips the download.
+
+    Returns:
+        Tuple of (df, group_name, total_messages_in_file)
+    """
+    parsed = checkpoints.load("parse") if checkpoints else None
+    if parsed:
+        update_progress(25, "Resuming from parsed chat...")
+        return parsed["df"], parsed["group_name"], parsed["total_before"]
+
+    if callable(file_content):
+        file_content = file_content()
+    df, group_name, total_before = _parse_stage(file_content, year, selected_members, update_progress)
+    if checkpoints:
+        checkpoints.save("parse", {
+            "df": df,
+            "group_name": group_name,
+            "total_before": total_before,
+        })
+    return df, group_name, total_before
+
+
+def get_user_messages(df):
+    """Pre-filter user messages (drops system messages)"""
     user_df = df[~df['is_system']].copy()
 
     if user_df.empty:
         raise ValueError("No user messages found after filtering")
 
-    # Step 5: Basic stats
-    update_progress(30, "Calculating basic stats...")
-    basic_stats = get_basic_stats(df, user_df)
-    top_chatters = get_top_chatters(df, user_df)
-
-    # Step 6: Activity patterns
-    update_progress(40, "Analyzing activity patterns...")
-    hourly = get_hourly_activity(df, user_df)
-    daily = get_daily_activity(df, user_df)
-    streak_stats = get_streak_stats(df, user_df)
-
-    # Step 7: Emoji and media
-    update_progress(50, "Analyzing emojis and media...")
-    emojis = get_emoji_stats(df, user_df)
-    user_emojis = get_emoji_stats_by_user(df, user_df)
-    media = get_media_stats(df, user_df)
-    words = get_word_stats(df, user_df, top_n=100)
-
-    # Step 8: Conversation patterns
-    update_progress(60, "Analyzing conversation patterns...")
-    starters = get_conversation_starters(df, user_df)
-    night_owls = get_night_owls(df, user_df)
-    early_birds = get_early_birds(df, user_df)
-    longest_msgs = get_longest_messages(df, user_df)
-    busiest_dates = get_busiest_dates(df, user_df)
-    response_pairs = get_response_pairs(df, user_df)
-
-    # Step 9: Behavioral stats
-    update_progress(70, "Analyzing behavioral patterns...")
-    double_texters = get_double_texters(df, user_df)
-    conv_killers = get_conversation_killers(df, user_df)
-    response_times = get_response_times(df, user_df)
-    caps_users = get_caps_users(df, user_df)
-    question_askers = get_question_askers(df, user_df)
-    link_sharers = get_link_sharers(df, user_df)
-    one_worders = get_one_worders(df, user_df)
-    monologuers = get_monologuers(df, user_df)
-    laugh_stats = get_laugh_stats(df, user_df)
-
-    # Step 10: Unique words and catchphrases
-    update_progress(80, "Extracting signature words...")
-    unique_words = get_unique_words_per_person(df, user_df, top_n=10)
-    catchphrases = get_catchphrases(df, user_df)
-
-    # Step 11: Personality profiles
-    update_progress(90, "Building personality profiles...")
-    stats_cache = {
-        'double_texters': double_texters,
-        'conv_killers': conv_killers,
-        'response_times': response_times,
-        'caps_users': caps_users,
-        'question_askers': question_askers,
-        'link_sharers': link_sharers,
-        'one_worders': one_worders,
-        'night_owls': night_owls,
-        'early_birds': early_birds,
-        'monologuers': monologuers,
-        'laugh_stats': laugh_stats,
-        'top_chatters': top_chatters,
-        'longest_msgs': longest_msgs,
-        'conv_starters': starters,
-        'media_stats': media,
-        'emoji_stats': user_emojis,
-    }
+    return user_df
 
-    personality_tags = assign_personality_tags(df, stats_cache)
-    group_vibe = get_group_vibe(df, emojis, hourly, user_df)
-    topics = get_interesting_topics(df, user_df)
 
-    # Step 12: Generate AI roasts
-    update_progress(92, "Judging your year...")
+def load_stat_groups(stats: dict, checkpoints, groups) -> dict:
+    """Merge checkpointed stat groups into stats (raises if any is missing)"""
+    for name in groups:
+        group_stats = checkpoints.load(f"stats:{name}")
+        if group_stats is None:
+            raise RuntimeError(f"Stat group '{name}' has not been computed")
+        stats.update(group_stats)
+    return stats
+
+
+def build_roast_inputs(stats: dict, user_df, group_name: str | None, year: int) -> dict:
+    """Build generate_roasts keyword arguments from computed stats"""
+    hourly, words, top_chatters = stats["hourly"], stats["words"], stats["top_chatters"]
     peak_hour_for_ai = max(hourly.items(), key=lambda x: x[1])[0] if hourly else None
     top_words_for_ai = list(words.items())[:30] if words else []
 
     # Limit to top 10 active members for AI roasts
-    top_10_chatters = dict(list(top_chatters.items())[:10])
+    top_10_chatters = _top_n(top_chatters, 10)
 
     # Extract sample messages for each person (interesting/longer messages)
     sample_messages = {}
-    text_only_df = user_df[user_df['media_type'].isna()].copy()
+    text_only_df = user_df[user_df['media_type'].isna()]
     for person in top_10_chatters.keys():
         person_msgs = text_only_df[text_only_df['sender'] == person]['message'].tolist()
         # Filter for interesting messages (longer than 5 words, not too long)
@@ -223,214 +590,59 @@ def process_chat(file_content: str, year: int = 2025, selected_members: list[str
             msg for msg in person_msgs
             if isinstance(msg, str) and 5 < len(msg.split()) < 30 and not msg.startswith('http')
         ]
-        # Get a random sample of messages
+        # Get a random sample of messages (seeded so identical chats build
+        # identical prompts and can hit the roast cache)
         if len(interesting) > 10:
-            sample_messages[person] = random.sample(interesting, 10)
+            sample_messages[person] = random.Random(f"{year}:{person}").sample(interesting, 10)
         else:
             sample_messages[person] = interesting[:10]
 
-    ai_roasts = generate_roasts(
-        group_name=current_group_name,
+    return dict(
+        group_name=group_name,
         year=year,
         total_messages=len(user_df),
         total_participants=user_df['sender'].nunique(),
         peak_hour=peak_hour_for_ai,
-        topics=topics,
+        topics=stats["topics"],
         top_words=top_words_for_ai,
         top_chatters=top_10_chatters,
-        signature_words=unique_words,
-        personality_tags=personality_tags,
-        user_emojis=user_emojis,
-        night_owls=night_owls,
-        early_birds=early_birds,
-        double_texters=double_texters,
-        response_times=response_times,
-        caps_users=caps_users,
-        question_askers=question_askers,
-        one_worders=one_worders,
+        signature_words=stats["unique_words"],
+        personality_tags=stats["personality_tags"],
+        user_emojis=stats["user_emojis"],
+        night_owls=stats["night_owls"],
+        early_birds=stats["early_birds"],
+        double_texters=stats["double_texters"],
+        response_times=stats["response_times"],
+        caps_users=stats["caps_users"],
+        question_askers=stats["question_askers"],
+        one_worders=stats["one_worders"],
         sample_messages=sample_messages,
     )
 
-    # Step 13: Compile results into slides
-    update_progress(95, "Compiling results...")
-
-    # Helper: get top N from dict
-    def top_n(d, n):
-        if not d:
-            return {}
-        return dict(list(d.items())[:n])
-
-    # Convert date keys to strings
-    busiest_dates_serializable = {
-        str(k): v for k, v in busiest_dates.items()
-    } if busiest_dates else {}
-
-    # Build group totals for slide 1
-    media_by_type = media.get("by_type", {}) if media else {}
-    total_messages = int(basic_stats.get("total_messages", 0)) if basic_stats else 0
-    total_participants = int(basic_stats.get("total_participants", 0)) if basic_stats else 0
-
-    group_totals = {
-        "total_messages": total_messages,
-        "total_images": int(media_by_type.get("image", 0)),
-        "total_videos": int(media_by_type.get("video", 0)),
-        "total_gifs": int(media_by_type.get("gif", 0)),
-        "total_stickers": int(media_by_type.get("sticker", 0)),
-        "total_audio": int(media_by_type.get("audio", 0)),
-        "total_documents": int(media_by_type.get("document", 0)),
-    }
 
-    # Find peak hour (single most active hour)
-    peak_hour = int(max(hourly.items(), key=lambda x: x[1])[0]) if hourly else None
-
-    # Find busiest day
-    busiest_day = list(busiest_dates_serializable.items())[0] if busiest_dates_serializable else None
-
-    # For 2-person chats, show only 1 person for starters/killers
-    top_n_for_dynamics = 1 if total_participants == 2 else 2
-    starters_top = list(starters.keys())[:top_n_for_dynamics] if starters else []
-    killers_top = list(conv_killers.keys())[:top_n_for_dynamics] if conv_killers else []
+def compile_result(stats: dict, slides: dict, group_name: str | None,
+                   total_before: int, messages_in_year: int) -> dict:
+    """Assemble the final result from computed stats and built slides"""
+    top_chatters = stats["top_chatters"]
 
     # For 2-person chats, set group name to "chat between X and Y"
     participants_list = list(top_chatters.keys())
-    if total_participants == 2 and len(participants_list) >= 2:
+    if stats["total_participants"] == 2 and len(participants_list) >= 2:
         display_group_name = f"chat between {participants_list[0]} and {participants_list[1]}"
     else:
-        display_group_name = current_group_name
-
-    # Build chat dynamics for graph (max 7 people)
-    chat_dynamics = []
-    top_7_people = list(top_chatters.keys())[:7]
-    for person in top_7_people:
-        person_df = user_df[user_df['sender'] == person]
-        # messages per day of week
-        daily_dist = {k: int(v) for k, v in person_df['day_of_week'].value_counts().to_dict().items()}
-        chat_dynamics.append({
-            "name": person,
-            "messages": int(top_chatters.get(person, 0)),
-            "daily_distribution": daily_dist,
-        })
-
-    # Signature words per person (top 4 each)
-    signature_words = {}
-    for person, words_dict in unique_words.items():
-        # words_dict is a dict like {"word": {"score": ..., "count": ...}}
-        signature_words[person] = list(words_dict.keys())[:4] if words_dict else []
+        display_group_name = group_name
 
-    # Build slides
-    slides = [
-        {
-            "id": 1,
-            "title": "your year in messages",
-            "type": "overview",
-            "data": {
-                "year": year,
-                "total_participants": total_participants,
-                "streak": streak_stats,
-                **group_totals,
-            }
-        },
-        {
-            "id": 2,
-            "title": "top chatters",
-            "type": "ranking",
-            "data": {
-                "rankings": [{"name": k, "count": int(v)} for k, v in top_chatters.items()]
-            }
-        },
-        {
-            "id": 3,
-            "title": "emoji game",
-            "type": "emojis",
-            "data": {
-                "group_top_emojis": [[e, int(c)] for e, c in list(emojis.items())[:10]] if emojis else [],
-                "per_person": {k: [[e, int(c)] for e, c in v.get("top", {}).items()] for k, v in user_emojis.items()} if user_emojis else {}
-            }
-        },
-        {
-            "id": 4,
-            "title": "peak activity",
-            "type": "activity",
-            "data": {
-                "busiest_day": {"date": busiest_day[0], "count": int(busiest_day[1])} if busiest_day else None,
-                "peak_hour": peak_hour,
-                "peak_hour_formatted": f"{peak_hour}:00" if peak_hour is not None else None,
-                "hourly_distribution": {int(k): int(v) for k, v in hourly.items()} if hourly else {},
-                "daily_distribution": {k: int(v) for k, v in daily.items()} if daily else {},
-            }
-        },
-        {
-            "id": 5,
-            "title": "word cloud",
-            "type": "words",
-            "data": {
-                "top_words": [[w, int(c)] for w, c in list(words.items())[:100]] if words else [],
-                "topics": topics[:4] if topics else [],
-            }
-        },
-        {
-            "id": 6,
-            "title": "signature words",
-            "type": "signature_words",
-            "data": {
-                "per_person": signature_words
-            }
-        },
-        {
-            "id": 7,
-            "title": "conversation dynamics",
-            "type": "convo_dynamics",
-            "data": {
-                "starters": starters_top,
-                "killers": killers_top,
-            }
-        },
-        {
-            "id": 8,
-            "title": "chat patterns",
-            "type": "chat_graph",
-            "data": {
-                "members": chat_dynamics,
-            }
-        },
-        {
-            "id": 9,
-            "title": "fun stats",
-            "type": "fun_stats",
-            "data": {
-                "double_texter": [list(double_texters.keys())[0], int(list(double_texters.values())[0])] if double_texters else None,
-                "caps_lock_user": [list(caps_users.keys())[0], int(list(caps_users.values())[0].get("caps_messages", 0))] if caps_users else None,
-                "question_asker": [list(question_askers.keys())[0], int(list(question_askers.values())[0].get("questions", 0))] if question_askers else None,
-                "link_sharer": [list(link_sharers.keys())[0], int(list(link_sharers.values())[0])] if link_sharers else None,
-            }
-        },
-        {
-            "id": 10,
-            "title": "ai roasts",
-            "type": "ai_roasts",
-            "data": {
-                "brainrot_score": ai_roasts.get("brainrot_score", 50),
-                "group_roast": ai_roasts.get("group_roast", []),
-                "individual_roasts": ai_roasts.get("individual_roasts", {}),
-            }
-        },
-    ]
-
-    result = {
+    return {
         "metadata": {
-            "year": year,
+            "year": stats["year"],
             "total_messages_in_file": total_before,
-            "messages_in_year": len(df),
+            "messages_in_year": messages_in_year,
             "group_name": display_group_name,
-            "participants": list(top_chatters.keys()),
+            "participants": participants_list,
         },
         "basic_stats": {
-            "total_messages": total_messages,
-            "total_participants": total_participants,
+            "total_messages": stats["total_messages"],
+            "total_participants": stats["total_participants"],
         },
-        "slides": slides,
+        "slides": [slides[slide_id] for slide_id in sorted(slides)],
     }
-
-    update_progress(100, "Complete")
-
-    return result
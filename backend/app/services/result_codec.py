@@ -0,0 +1,126 @@
+"""
+Compression for cached job results
+
+Results are cached one field per slide/section, so fields are small and
+similar across jobs - exactly where a zstd dictionary trained on past
+results beats plain gzip. Falls back to gzip without zstandard.
+"""
+
+import gzip
+import time
+
+# Optional: zstandard for smaller, faster result fields
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+
+class ResultCodec:
+    """Encode/decode result fields; dictionaries are shared through Redis"""
+
+    # Key prefixes (binary Redis client)
+    PREFIX_DICT = "cache:result:zdict:"
+    KEY_DICT_CURRENT = "cache:result:zdict:current"
+
+    LEVEL = 6
+    DICT_SIZE = 16 * 1024
+    DICT_TTL_SECONDS = 30 * 24 * 3600
+    # How often to check Redis for a newly trained dictionary
+    DICT_REFRESH_SECONDS = 300
+
+    def __init__(self):
+        self._dicts = {}
+        self._current_id = None
+        self._checked_at = 0.0
+
+    # Dictionaries
+    def _load_dictionary(self, client, dict_id: int):
+        if dict_id not in self._dicts:
+            data = client.get(f"{self.PREFIX_DICT}{dict_id}")
+            if not data:
+                return None
+            self._dicts[dict_id] = zstandard.ZstdCompressionDict(data)
+        return self._dicts[dict_id]
+
+    def _current_dictionary(self, client):
+        """Current trained dictionary (re-checked every DICT_REFRESH_SECONDS)"""
+        now = time.monotonic()
+        if now - self._checked_at >= self.DICT_REFRESH_SECONDS:
+            self._checked_at = now
+            current = client.get(self.KEY_DICT_CURRENT)
+            self._current_id = int(current) if current else None
+
+        if self._current_id is None:
+            return None, None
+        return self._current_id, self._load_dictionary(client, self._current_id)
+
+    def train(self, client, samples: list[bytes]) -> int | None:
+        """
+        Train a dictionary from raw result fields and make it current
+
+        Returns:
+            Dictionary ID, or None if zstandard is missing or training failed
+        """
+        if not HAS_ZSTD or not samples:
+            return None
+
+        try:
+            dictionary = zstandard.train_dictionary(self.DICT_SIZE, samples, level=self.LEVEL)
+        except zstandard.ZstdError:
+            # Too few or too small samples
+            return None
+
+        dict_id = dictionary.dict_id()
+        pipe = client.pipeline()
+        pipe.setex(f"{self.PREFIX_DICT}{dict_id}", self.DICT_TTL_SECONDS, dictionary.as_bytes())
+        pipe.set(self.KEY_DICT_CURRENT, str(dict_id))
+        pipe.execute()
+
+        self._dicts[dict_id] = dictionary
+        self._current_id = dict_id
+        self._checked_at = time.monotonic()
+        return dict_id
+
+    # Encoding
+    def encode(self, client, fields: dict[str, bytes]) -> tuple[str, dict[str, bytes]]:
+        """
+        Compress fields with the best available codec
+
+        Returns:
+            Tuple of (codec name, compressed fields)
+        """
+        if not HAS_ZSTD:
+            return "gzip", {name: gzip.compress(data) for name, data in fields.items()}
+
+        dict_id, dictionary = self._current_dictionary(client)
+        if dictionary is not None:
+            compressor = zstandard.ZstdCompressor(level=self.LEVEL, dict_data=dictionary)
+            codec = f"zstd:{dict_id}"
+        else:
+            compressor = zstandard.ZstdCompressor(level=self.LEVEL)
+            codec = "zstd"
+
+        return codec, {name: compressor.compress(data) for name, data in fields.items()}
+
+    def decoder(self, client, codec: str):
+        """Get a decompress(bytes) -> bytes function for a codec name"""
+        if codec == "gzip":
+            return gzip.decompress
+
+        if not HAS_ZSTD:
+            raise ValueError(f"Cached result uses {codec} but zstandard is not installed")
+
+        dictionary = None
+        if codec.startswith("zstd:"):
+            dictionary = self._load_dictionary(client, int(codec.split(":", 1)[1]))
+            if dictionary is None:
+                raise ValueError(f"Compression dictionary for {codec} has expired")
+
+        decompressor = zstandard.ZstdDecompressor(dict_data=dictionary)
+        return decompressor.decompress
+
+
+# Singleton instance
+result_codec = ResultCodec()
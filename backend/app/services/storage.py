@@ -1,104 +1,496 @@
+"""
+Object storage for uploads, results and checkpoints
+
+StorageService keeps the app-facing API (keys, JSON, gzip, metrics) and
+delegates raw object operations to a backend picked by STORAGE_BACKEND:
+"r2" (any S3-compatible store) or "local" (a directory, for self-hosting
+and tests).
+"""
+
+import abc
 import boto3
 import gzip
+import hashlib
 import json
+import mimetypes
+import mmap
+import os
+import shutil
+import tempfile
+import threading
 import uuid
 from io import BytesIO
-from flask import current_app
+from flask import current_app, url_for
 from botocore.config import Config as BotoConfig
+from botocore.exceptions import ClientError
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from .metrics import call_timer
 
 
-class StorageService:
-    """Cloudflare R2 storage service"""
+class UploadTooLarge(Exception):
+    """A streamed upload went over its size cap"""
 
-    def __init__(self):
+
+# Latency buckets for single storage calls (milliseconds)
+CALL_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+# Record StorageService call latencies as storage_<name>_ms
+timed = call_timer("storage", buckets=CALL_BUCKETS)
+
+
+class StorageBackend(abc.ABC):
+    """Raw object operations every backend implements"""
+
+    @abc.abstractmethod
+    def put(self, key: str, data: bytes, content_type: str):
+        ...
+
+    @abc.abstractmethod
+    def get(self, key: str, start: int = 0, end: int | None = None) -> bytes:
+        """Read bytes start..end (inclusive, like an HTTP Range); end=None reads to EOF"""
+
+    @abc.abstractmethod
+    def stream(self, key: str, start: int = 0):
+        """File-like object reading from start to EOF as data arrives (close it when done)"""
+
+    @abc.abstractmethod
+    def head(self, key: str) -> dict | None:
+        """{"size": int, "content_type": str}, or None if the object doesn't exist"""
+
+    @abc.abstractmethod
+    def delete(self, keys: list[str]) -> int:
+        """Delete objects (missing ones are ignored); returns requests made"""
+
+    @abc.abstractmethod
+    def presigned_put_url(self, key: str, content_type: str, expires_in: int) -> str:
+        ...
+
+    # Multipart uploads (parts are PUT directly by the client)
+    @abc.abstractmethod
+    def create_multipart(self, key: str, content_type: str) -> str:
+        """Start a multipart upload; returns its upload ID"""
+
+    @abc.abstractmethod
+    def presigned_part_url(self, key: str, upload_id: str, part_number: int, expires_in: int) -> str:
+        ...
+
+    @abc.abstractmethod
+    def list_parts(self, key: str, upload_id: str) -> list[dict]:
+        """Uploaded parts as [{"part_number", "etag", "size"}], in order"""
+
+    @abc.abstractmethod
+    def complete_multipart(self, key: str, upload_id: str, parts: list[dict]):
+        """Assemble parts [{"part_number", "etag"}] into the object"""
+
+    @abc.abstractmethod
+    def abort_multipart(self, key: str, upload_id: str):
+        ...
+
+
+class S3Backend(StorageBackend):
+    """S3-compatible object storage (Cloudflare R2)"""
+
+    # Max keys per DeleteObjects request
+    DELETE_BATCH_SIZE = 1000
+
+    def __init__(self, endpoint_url: str, access_key_id: str, secret_access_key: str,
+                 bucket: str, max_pool_connections: int = 50):
+        self.endpoint_url = endpoint_url
+        self.access_key_id = access_key_id
+        self.secret_access_key = secret_access_key
+        self.bucket = bucket
+        self.max_pool_connections = max_pool_connections
         self._client = None
+        self._lock = threading.Lock()
 
     @property
     def client(self):
-        """Lazy initialization of S3 client"""
+        """
+        Lazily created client shared by all threads of the process
+
+        Clients are thread-safe once built, but creating one isn't (boto3's
+        default session is shared), so creation is locked and uses its own
+        session. The pool is sized for the API's concurrent requests and keeps
+        idle TCP connections alive between them.
+        """
         if self._client is None:
-            self._client = boto3.client(
-                "s3",
-                endpoint_url=current_app.config["R2_ENDPOINT_URL"],
-                aws_access_key_id=current_app.config["R2_ACCESS_KEY_ID"],
-                aws_secret_access_key=current_app.config["R2_SECRET_ACCESS_KEY"],
-                region_name="auto",  # Required for Cloudflare R2
-                config=BotoConfig(
-                    signature_version="s3v4",
-                    retries={"max_attempts": 3, "mode": "adaptive"},
-                ),
-            )
+            with self._lock:
+                if self._client is None:
+                    session = boto3.session.Session()
+                    self._client = session.client(
+                        "s3",
+                        endpoint_url=self.endpoint_url,
+                        aws_access_key_id=self.access_key_id,
+                        aws_secret_access_key=self.secret_access_key,
+                        region_name="auto",  # Required for Cloudflare R2
+                        config=BotoConfig(
+                            signature_version="s3v4",
+                            retries={"max_attempts": 3, "mode": "adaptive"},
+                            max_pool_connections=self.max_pool_connections,
+                            tcp_keepalive=True,
+                        ),
+                    )
         return self._client
 
-    @property
-    def bucket(self):
-        return current_app.config["R2_BUCKET_NAME"]
+    def put(self, key: str, data: bytes, content_type: str):
+        self.client.put_object(Bucket=self.bucket, Key=key, Body=data, ContentType=content_type)
 
-    def upload_file(self, file_obj, prefix: str = "uploads") -> str:
+    def get(self, key: str, start: int = 0, end: int | None = None) -> bytes:
+        params = {"Bucket": self.bucket, "Key": key}
+        if start or end is not None:
+            params["Range"] = f"bytes={start}-{'' if end is None else end}"
+        return self.client.get_object(**params)["Body"].read()
+
+    def stream(self, key: str, start: int = 0):
+        params = {"Bucket": self.bucket, "Key": key}
+        if start:
+            params["Range"] = f"bytes={start}-"
+        return self.client.get_object(**params)["Body"]
+
+    def head(self, key: str) -> dict | None:
+        try:
+            response = self.client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError:
+            return None
+        return {
+            "size": response["ContentLength"],
+            "content_type": response.get("ContentType"),
+        }
+
+    def delete(self, keys: list[str]) -> int:
+        requests = 0
+        for start in range(0, len(keys), self.DELETE_BATCH_SIZE):
+            objects = [{"Key": key} for key in keys[start:start + self.DELETE_BATCH_SIZE]]
+            self.client.delete_objects(
+                Bucket=self.bucket,
+                Delete={"Objects": objects, "Quiet": True},
+            )
+            requests += 1
+        return requests
+
+    def presigned_put_url(self, key: str, content_type: str, expires_in: int) -> str:
+        return self.client.generate_presigned_url(
+            "put_object",
+            Params={"Bucket": self.bucket, "Key": key, "ContentType": content_type},
+            ExpiresIn=expires_in,
+        )
+
+    def create_multipart(self, key: str, content_type: str) -> str:
+        response = self.client.create_multipart_upload(Bucket=self.bucket, Key=key, ContentType=content_type)
+        return response["UploadId"]
+
+    def presigned_part_url(self, key: str, upload_id: str, part_number: int, expires_in: int) -> str:
+        return self.client.generate_presigned_url(
+            "upload_part",
+            Params={"Bucket": self.bucket, "Key": key, "UploadId": upload_id, "PartNumber": part_number},
+            ExpiresIn=expires_in,
+        )
+
+    def list_parts(self, key: str, upload_id: str) -> list[dict]:
+        parts = []
+        paginator = self.client.get_paginator("list_parts")
+        for page in paginator.paginate(Bucket=self.bucket, Key=key, UploadId=upload_id):
+            parts.extend(
+                {"part_number": part["PartNumber"], "etag": part["ETag"], "size": part["Size"]}
+                for part in page.get("Parts", [])
+            )
+        return parts
+
+    def complete_multipart(self, key: str, upload_id: str, parts: list[dict]):
+        self.client.complete_multipart_upload(
+            Bucket=self.bucket,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={
+                "Parts": [{"PartNumber": part["part_number"], "ETag": part["etag"]} for part in parts],
+            },
+        )
+
+    def abort_multipart(self, key: str, upload_id: str):
+        self.client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+
+
+class LocalBackend(StorageBackend):
+    """
+    Objects as files under a root directory
+
+    Writes go to a temp file and are renamed into place, so readers never see
+    a partial object. Reads map the file instead of buffering it through
+    read() calls; ranged reads only touch the requested pages.
+    """
+
+    TOKEN_SALT = "local-storage-upload"
+    MULTIPART_PREFIX = ".multipart"
+
+    def __init__(self, root: str, secret_key: str):
+        self.root = os.path.abspath(root)
+        self.secret_key = secret_key
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        """Filesystem path for a key (rejects keys escaping the root)"""
+        path = os.path.abspath(os.path.join(self.root, key))
+        if os.path.commonpath([self.root, path]) != self.root or path == self.root:
+            raise ValueError(f"Invalid storage key: {key}")
+        return path
+
+    def put(self, key: str, data: bytes, content_type: str):
+        self.put_stream(key, BytesIO(data))
+
+    def put_stream(self, key: str, stream, chunk_size: int = 1024 * 1024, hasher=None,
+                   max_bytes: int | None = None) -> int:
         """
-        Upload a file to R2
-        Returns the S3 key
+        Write a file-like object to a key in chunks (feeding hasher if given)
+
+        Raises UploadTooLarge (and keeps nothing) once more than max_bytes
+        arrive. Returns bytes written.
         """
-        key = f"{prefix}/{uuid.uuid4()}.txt"
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        written = 0
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                while chunk := stream.read(chunk_size):
+                    written += len(chunk)
+                    if max_bytes is not None and written > max_bytes:
+                        raise UploadTooLarge(f"{key} is over {max_bytes} bytes")
+                    f.write(chunk)
+                    if hasher is not None:
+                        hasher.update(chunk)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return written
+
+    def get(self, key: str, start: int = 0, end: int | None = None) -> bytes:
+        with open(self.path(key), "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            end = size - 1 if end is None else min(end, size - 1)
+            if size == 0 or start > end:
+                return b""
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return mapped[start:end + 1]
+
+    def stream(self, key: str, start: int = 0):
+        f = open(self.path(key), "rb")
+        f.seek(start)
+        return f
+
+    def head(self, key: str) -> dict | None:
+        try:
+            size = os.stat(self.path(key)).st_size
+        except FileNotFoundError:
+            return None
+        return {"size": size, "content_type": mimetypes.guess_type(key)[0]}
+
+    def delete(self, keys: list[str]) -> int:
+        for key in keys:
+            try:
+                os.unlink(self.path(key))
+            except FileNotFoundError:
+                pass
+        return len(keys)
 
-        self.client.upload_fileobj(
-            file_obj,
-            self.bucket,
-            key,
-            ExtraArgs={"ContentType": "text/plain"},
+    # Presigned uploads go to the API's local upload route with a signed token
+    def _serializer(self) -> URLSafeTimedSerializer:
+        return URLSafeTimedSerializer(self.secret_key, salt=self.TOKEN_SALT)
+
+    def _upload_url(self, grant: dict, expires_in: int) -> str:
+        token = self._serializer().dumps({**grant, "expires_in": expires_in})
+        return url_for("upload.local_upload", token=token, _external=True)
+
+    def presigned_put_url(self, key: str, content_type: str, expires_in: int) -> str:
+        return self._upload_url({"key": key}, expires_in)
+
+    def verify_upload_token(self, token: str) -> dict | None:
+        """
+        What a presigned upload token grants, or None if invalid or expired
+
+        Returns:
+            {"key": str} for a whole object, plus "upload_id" and
+            "part_number" for a multipart part
+        """
+        try:
+            grant = self._serializer().loads(token)
+            self._serializer().loads(token, max_age=grant.pop("expires_in"))
+        except (BadSignature, KeyError, TypeError, AttributeError):
+            return None
+        return grant
+
+    # Multipart: parts are files under .multipart/<upload_id>/ until completed
+    def _multipart_key(self, upload_id: str, name: str = "") -> str:
+        if not upload_id.isalnum():
+            raise ValueError(f"Invalid upload ID: {upload_id}")
+        return f"{self.MULTIPART_PREFIX}/{upload_id}/{name}".rstrip("/")
+
+    def _check_multipart(self, key: str, upload_id: str):
+        if self.get(self._multipart_key(upload_id, "key")).decode("utf-8") != key:
+            raise ValueError(f"Upload {upload_id} is not for {key}")
+
+    def create_multipart(self, key: str, content_type: str) -> str:
+        self.path(key)
+        upload_id = uuid.uuid4().hex
+        self.put(self._multipart_key(upload_id, "key"), key.encode("utf-8"), "text/plain")
+        return upload_id
+
+    def presigned_part_url(self, key: str, upload_id: str, part_number: int, expires_in: int) -> str:
+        grant = {"key": key, "upload_id": upload_id, "part_number": part_number}
+        return self._upload_url(grant, expires_in)
+
+    def put_part(self, key: str, upload_id: str, part_number: int, stream, max_bytes: int | None = None) -> str:
+        """Store one part; returns its ETag (quoted MD5, like S3)"""
+        self._check_multipart(key, upload_id)
+        md5 = hashlib.md5(usedforsecurity=False)
+        self.put_stream(
+            self._multipart_key(upload_id, f"{part_number:05d}"), stream, hasher=md5, max_bytes=max_bytes
         )
+        return f'"{md5.hexdigest()}"'
+
+    def list_parts(self, key: str, upload_id: str) -> list[dict]:
+        self._check_multipart(key, upload_id)
+        parts = []
+        for name in sorted(os.listdir(self.path(self._multipart_key(upload_id)))):
+            if not name.isdigit():
+                continue
+            data = self.get(self._multipart_key(upload_id, name))
+            md5 = hashlib.md5(data, usedforsecurity=False).hexdigest()
+            parts.append({"part_number": int(name), "etag": f'"{md5}"', "size": len(data)})
+        return parts
+
+    def complete_multipart(self, key: str, upload_id: str, parts: list[dict]):
+        uploaded = {part["part_number"]: part["etag"] for part in self.list_parts(key, upload_id)}
+        for part in parts:
+            if uploaded.get(part["part_number"]) != part["etag"]:
+                raise ValueError(f"Part {part['part_number']} is missing or its ETag doesn't match")
+
+        part_files = [self.path(self._multipart_key(upload_id, f"{part['part_number']:05d}")) for part in parts]
+        with ChainedReader(part_files) as stream:
+            self.put_stream(key, stream)
+        self.abort_multipart(key, upload_id)
+
+    def abort_multipart(self, key: str, upload_id: str):
+        shutil.rmtree(self.path(self._multipart_key(upload_id)), ignore_errors=True)
+
+
+class ChainedReader:
+    """Read several files back to back as one stream"""
 
+    def __init__(self, paths: list[str]):
+        self._paths = list(paths)
+        self._file = None
+
+    def read(self, size: int) -> bytes:
+        while True:
+            if self._file is None:
+                if not self._paths:
+                    return b""
+                self._file = open(self._paths.pop(0), "rb")
+            chunk = self._file.read(size)
+            if chunk:
+                return chunk
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._file is not None:
+            self._file.close()
+
+
+def create_backend(config) -> StorageBackend:
+    """Build the backend selected by STORAGE_BACKEND"""
+    backend = config.get("STORAGE_BACKEND", "r2")
+    if backend == "local":
+        return LocalBackend(config["LOCAL_STORAGE_PATH"], config["SECRET_KEY"])
+    if backend == "r2":
+        return S3Backend(
+            endpoint_url=config["R2_ENDPOINT_URL"],
+            access_key_id=config["R2_ACCESS_KEY_ID"],
+            secret_access_key=config["R2_SECRET_ACCESS_KEY"],
+            bucket=config["R2_BUCKET_NAME"],
+            max_pool_connections=config.get("STORAGE_MAX_POOL_CONNECTIONS", 50),
+        )
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+
+
+class StorageService:
+    """Object storage service (R2 or local files)"""
+
+    def __init__(self):
+        self._backend = None
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self) -> StorageBackend:
+        """Lazy initialization of the configured backend (shared across threads)"""
+        if self._backend is None:
+            with self._lock:
+                if self._backend is None:
+                    self._backend = create_backend(current_app.config)
+        return self._backend
+
+    @timed("upload")
+    def upload_file(self, file_obj, prefix: str = "uploads") -> str:
+        """
+        Upload a file to storage
+        Returns the storage key
+        """
+        key = f"{prefix}/{uuid.uuid4()}.txt"
+        self.backend.put(key, file_obj.read(), "text/plain")
         return key
 
+    @timed("upload")
     def upload_bytes(self, data: bytes, key: str, content_type: str = "application/octet-stream"):
-        """Upload raw bytes to R2"""
-        self.client.put_object(
-            Bucket=self.bucket,
-            Key=key,
-            Body=data,
-            ContentType=content_type,
-        )
+        """Upload raw bytes to storage"""
+        self.backend.put(key, data, content_type)
 
+    @timed("upload")
     def upload_json(self, data: dict, prefix: str = "results", compress: bool = True) -> str:
         """
-        Upload JSON data to R2
+        Upload JSON data to storage
         Optionally compresses with gzip
-        Returns the S3 key
+        Returns the storage key
         """
         json_str = json.dumps(data, default=str)
 
         if compress:
             key = f"{prefix}/{uuid.uuid4()}.json.gz"
-            compressed = gzip.compress(json_str.encode("utf-8"))
-            self.client.put_object(
-                Bucket=self.bucket,
-                Key=key,
-                Body=compressed,
-                ContentType="application/gzip",
-            )
+            self.backend.put(key, gzip.compress(json_str.encode("utf-8")), "application/gzip")
         else:
             key = f"{prefix}/{uuid.uuid4()}.json"
-            self.client.put_object(
-                Bucket=self.bucket,
-                Key=key,
-                Body=json_str.encode("utf-8"),
-                ContentType="application/json",
-            )
+            self.backend.put(key, json_str.encode("utf-8"), "application/json")
 
         return key
 
+    @timed("download")
     def download_file(self, key: str) -> bytes:
-        """Download file from R2"""
-        response = self.client.get_object(Bucket=self.bucket, Key=key)
-        return response["Body"].read()
+        """Download file from storage"""
+        return self.backend.get(key)
+
+    @timed("download_range")
+    def download_range(self, key: str, start: int = 0, end: int | None = None) -> bytes:
+        """Download bytes start..end (inclusive, like an HTTP Range); end=None reads to EOF"""
+        return self.backend.get(key, start, end)
+
+    @timed("open_stream")
+    def open_stream(self, key: str, start: int = 0):
+        """Open a file-like stream from start to EOF (close it when done)"""
+        return self.backend.stream(key, start)
 
     def download_to_file(self, key: str, file_path: str):
-        """Download file from R2 to local path"""
-        self.client.download_file(self.bucket, key, file_path)
+        """Download file from storage to local path"""
+        with open(file_path, "wb") as f:
+            f.write(self.download_file(key))
 
     def download_json(self, key: str) -> dict:
         """
-        Download and parse JSON from R2
+        Download and parse JSON from storage
         Handles gzipped files automatically
         """
         data = self.download_file(key)
@@ -110,57 +502,93 @@ class StorageService:
 
     def get_file_stream(self, key: str) -> BytesIO:
         """Get file as a stream"""
-        response = self.client.get_object(Bucket=self.bucket, Key=key)
-        return BytesIO(response["Body"].read())
+        return BytesIO(self.download_file(key))
 
+    @timed("delete")
     def delete_file(self, key: str):
-        """Delete file from R2"""
-        self.client.delete_object(Bucket=self.bucket, Key=key)
+        """Delete file from storage"""
+        self.backend.delete([key])
 
-    def delete_files(self, keys: list[str]):
-        """Delete multiple files from R2"""
-        if not keys:
-            return
+    @timed("delete")
+    def delete_files(self, keys: list[str]) -> int:
+        """
+        Delete multiple files from storage
 
-        objects = [{"Key": key} for key in keys]
-        self.client.delete_objects(
-            Bucket=self.bucket,
-            Delete={"Objects": objects},
-        )
+        Returns:
+            Number of delete requests made (R2 takes up to 1000 keys per request)
+        """
+        if not keys:
+            return 0
+        return self.backend.delete(keys)
 
     def file_exists(self, key: str) -> bool:
-        """Check if file exists in R2"""
-        try:
-            self.client.head_object(Bucket=self.bucket, Key=key)
-            return True
-        except self.client.exceptions.ClientError:
-            return False
+        """Check if file exists in storage"""
+        return self.get_file_metadata(key) is not None
+
+    @timed("head")
+    def get_file_metadata(self, key: str) -> dict | None:
+        """
+        Get size and content type with a single HEAD request
+
+        Returns:
+            {"size": int, "content_type": str}, or None if the file doesn't exist
+        """
+        return self.backend.head(key)
 
     def get_file_size(self, key: str) -> int:
         """Get file size in bytes"""
-        response = self.client.head_object(Bucket=self.bucket, Key=key)
-        return response["ContentLength"]
+        metadata = self.get_file_metadata(key)
+        if metadata is None:
+            raise FileNotFoundError(key)
+        return metadata["size"]
 
     def generate_presigned_upload_url(
-        self, prefix: str = "uploads", expires_in: int = 3600, max_size_mb: int = 20
+        self, prefix: str = "uploads", expires_in: int = 3600, max_size_mb: int = 20,
+        extension: str = ".txt", content_type: str = "text/plain",
     ) -> tuple[str, str]:
         """
-        Generate a presigned URL for direct upload to R2
+        Generate a presigned URL for direct upload (PUT with this content_type)
         Returns (presigned_url, file_key)
         """
-        key = f"{prefix}/{uuid.uuid4()}.txt"
+        key = f"{prefix}/{uuid.uuid4()}{extension}"
+        presigned_url = self.backend.presigned_put_url(key, content_type, expires_in)
+        return presigned_url, key, max_size_mb
 
-        presigned_url = self.client.generate_presigned_url(
-            "put_object",
-            Params={
-                "Bucket": self.bucket,
-                "Key": key,
-                "ContentType": "text/plain",
-            },
-            ExpiresIn=expires_in,
-        )
+    # Multipart uploads
+    @timed("create_multipart")
+    def create_multipart_upload(
+        self, prefix: str = "uploads", extension: str = ".txt", content_type: str = "text/plain",
+    ) -> tuple[str, str]:
+        """
+        Start a multipart upload for a new chat file
+        Returns (file_key, upload_id)
+        """
+        key = f"{prefix}/{uuid.uuid4()}{extension}"
+        return key, self.backend.create_multipart(key, content_type)
 
-        return presigned_url, key, max_size_mb
+    def generate_presigned_part_urls(
+        self, key: str, upload_id: str, part_numbers: list[int], expires_in: int = 3600
+    ) -> list[dict]:
+        """Presigned PUT URLs for parts, as [{"part_number", "url"}]"""
+        return [
+            {"part_number": number, "url": self.backend.presigned_part_url(key, upload_id, number, expires_in)}
+            for number in part_numbers
+        ]
+
+    @timed("list_parts")
+    def list_uploaded_parts(self, key: str, upload_id: str) -> list[dict]:
+        """Parts already uploaded (for resuming), as [{"part_number", "etag", "size"}]"""
+        return self.backend.list_parts(key, upload_id)
+
+    @timed("complete_multipart")
+    def complete_multipart_upload(self, key: str, upload_id: str, parts: list[dict]):
+        """Assemble uploaded parts [{"part_number", "etag"}] into the file"""
+        self.backend.complete_multipart(key, upload_id, sorted(parts, key=lambda part: part["part_number"]))
+
+    @timed("abort_multipart")
+    def abort_multipart_upload(self, key: str, upload_id: str):
+        """Abort a multipart upload and drop its parts"""
+        self.backend.abort_multipart(key, upload_id)
 
 
 # Singleton instance
@@ -0,0 +1,82 @@
+"""
+Worker warm-up
+
+Runs once in each freshly started worker process so the first real job
+doesn't pay for imports, lookup tables, compiled regexes, client setup and
+pandas' first-call caches.
+"""
+
+import logging
+import time
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+WARMUP_YEAR = 2025
+WARMUP_MEMBERS = ["Alex", "Sam", "Priya"]
+WARMUP_MESSAGES = [
+    "good morning 😂😂",
+    "anyone up for lunch?",
+    "<Media omitted>",
+    "LMAO no way",
+    "https://example.com/article",
+    "ok",
+    "that was the best trip ever 🔥 we should do it again next year",
+    "why is nobody replying??",
+]
+
+
+def build_warmup_chat(year: int = WARMUP_YEAR, days: int = 20) -> str:
+    """Tiny synthetic export that exercises the parser and every stat group"""
+    lines = []
+    start = datetime(year, 1, 1, 9, 0)
+
+    for day in range(days):
+        for i, message in enumerate(WARMUP_MESSAGES):
+            when = start + timedelta(days=day, hours=i * 2, minutes=day)
+            sender = WARMUP_MEMBERS[(day + i) % len(WARMUP_MEMBERS)]
+            lines.append(f"{when:%d/%m/%y, %H:%M} - {sender}: {message}")
+
+    return "\n".join(lines)
+
+
+def warm_up_worker() -> float:
+    """
+    Preload heavy modules and shared clients, then run a tiny chat through
+    the pipeline (AI roasts disabled, no storage/Redis writes)
+
+    Returns:
+        Warm-up time in milliseconds
+    """
+    start = time.perf_counter()
+
+    # Heavy imports and lookup tables (no-ops if already imported pre-fork)
+    import emoji
+    import numpy  # noqa: F401
+    import pandas  # noqa: F401
+    from core import parser  # noqa: F401 - compiles the message patterns
+    from core.ai import get_async_openai_client
+    from .processor import process_chat
+    from .storage import storage
+
+    len(emoji.EMOJI_DATA)
+
+    # Shared clients (creating them doesn't touch the network)
+    try:
+        # The S3 backend builds its pooled client lazily
+        getattr(storage.backend, "client", None)
+    except Exception as e:
+        logger.warning(f"Warm-up: storage client unavailable: {e}")
+
+    try:
+        # Cached for the process - the first roast reuses it
+        get_async_openai_client()
+    except ValueError:
+        # No API key - roasts fall back to canned ones anyway
+        pass
+
+    process_chat(build_warmup_chat(), year=WARMUP_YEAR, ai_roasts_enabled=False)
+
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    logger.info(f"Worker warm-up took {elapsed_ms:.0f}ms")
+    return elapsed_ms
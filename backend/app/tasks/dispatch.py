@@ -0,0 +1,174 @@
+"""
+Queueing processing jobs from the API
+
+Tasks are sent by name, so the API never imports app.tasks.processing (and
+with it pandas, the stats and OpenAI); workers register the tasks and run
+them. Dedup lives here too since it only copies an existing result.
+"""
+
+import time
+from datetime import datetime, timezone
+from celery import chain, chord, group
+from flask import current_app
+from core.constants import STAT_GROUP_NAMES, ROAST_INPUT_GROUPS
+from ..extensions import celery
+from ..models import Job
+from ..services.storage import storage
+from ..services.cache import cache
+from ..services.job_state import job_state
+from ..services.metrics import metrics
+
+
+SMALL_QUEUE = "small"
+LARGE_QUEUE = "large"
+
+TASK_PREFIX = "app.tasks.processing."
+
+
+def choose_queue(job: Job) -> str:
+    """
+    Pick the lane for a job from its estimated cost
+
+    File size and participant count (captured at confirm time) are cheap
+    proxies for parse and stats cost, so small chats never queue behind
+    big community exports.
+    """
+    config = current_app.config
+    participants = len(job.selected_members or job.participants or [])
+
+    if (job.file_size or 0) >= config.get("LARGE_JOB_MIN_BYTES", 2 * 1024 * 1024):
+        return LARGE_QUEUE
+    if participants >= config.get("LARGE_JOB_MIN_PARTICIPANTS", 30):
+        return LARGE_QUEUE
+    return SMALL_QUEUE
+
+
+def queue_options(queue: str) -> dict:
+    """Routing and time limit options for a lane"""
+    soft_limit, hard_limit = current_app.config.get("QUEUE_TIME_LIMITS", {}).get(queue, (None, None))
+    options = {"queue": queue}
+    if hard_limit:
+        options["soft_time_limit"] = soft_limit
+        options["time_limit"] = hard_limit
+    return options
+
+
+def task_signature(name: str, *args, options: dict = None, **kwargs):
+    """Immutable signature of a processing task by name (see module docstring)"""
+    return celery.signature(f"{TASK_PREFIX}{name}", args=args, kwargs=kwargs, immutable=True, **(options or {}))
+
+
+def start_processing(job_id: str, fresh_roast: bool = False, queue: str = SMALL_QUEUE):
+    """Queue a job on a lane, with the pipeline configured for it ("canvas" or "single")"""
+    enqueued_at = time.time()
+    if current_app.config.get("QUEUE_PIPELINES", {}).get(queue) == "single":
+        return task_signature(
+            "process_chat_task", str(job_id),
+            fresh_roast=fresh_roast, enqueued_at=enqueued_at, lane=queue,
+            options=queue_options(queue),
+        ).apply_async()
+    return start_chat_pipeline(str(job_id), fresh_roast=fresh_roast, queue=queue, enqueued_at=enqueued_at)
+
+
+def start_chat_pipeline(job_id: str, fresh_roast: bool = False, queue: str = SMALL_QUEUE,
+                        enqueued_at: float = None):
+    """
+    Queue the canvas for a job
+
+    Stat groups run in parallel; the roast starts as soon as its input
+    groups are done and overlaps with the remaining groups.
+    """
+    options = queue_options(queue)
+    roast_groups = [name for name in STAT_GROUP_NAMES if name in ROAST_INPUT_GROUPS]
+    other_groups = [name for name in STAT_GROUP_NAMES if name not in ROAST_INPUT_GROUPS]
+
+    stats_and_roast = group(
+        chord(
+            [task_signature("compute_stat_group_task", job_id, name, options=options) for name in roast_groups],
+            task_signature("roast_chat_task", job_id, fresh_roast=fresh_roast, options=options),
+        ),
+        *[task_signature("compute_stat_group_task", job_id, name, options=options) for name in other_groups],
+    )
+
+    return chain(
+        task_signature("parse_chat_task", job_id, enqueued_at=enqueued_at, lane=queue, options=options),
+        stats_and_roast,
+        task_signature("compile_chat_task", job_id, options=options),
+    ).apply_async()
+
+
+def start_upload_scan(job_id: str):
+    """Queue the scan of a confirmed upload (cheap, so always the small lane)"""
+    return task_signature("scan_upload_task", str(job_id), options=queue_options(SMALL_QUEUE)).apply_async()
+
+
+def delete_upload(job: Job):
+    """Delete the uploaded chat file (best effort)"""
+    if not job.file_key:
+        return
+    try:
+        storage.delete_file(job.file_key)
+        job_state.update(job, file_key=None)
+    except Exception as delete_error:
+        print(f"Warning: Failed to delete uploaded file {job.file_key}: {delete_error}")
+
+
+def find_duplicate_job(job: Job) -> Job | None:
+    """Completed, unexpired job for the same chat, year and members, if any"""
+    source_id = cache.get_dedup_source(job.dedup_key())
+    if not source_id or source_id == str(job.id):
+        return None
+
+    source = job_state.load(source_id)
+    if not source or source.status != Job.STATUS_COMPLETED or source.ttl_seconds(1) <= 0:
+        return None
+    return source
+
+
+def clone_job_result(job: Job, source: Job) -> bool:
+    """
+    Complete a job with a copy of another job's result (no processing, no
+    OpenAI call). The copy gets its own result object and expiry, so deleting
+    either job never affects the other.
+
+    Returns:
+        False if the source result is no longer available
+    """
+    job_id = str(job.id)
+
+    result = cache.get_job_result(str(source.id))
+    if result is None and source.result_key:
+        try:
+            result = storage.download_json(source.result_key)
+        except Exception as e:
+            print(f"Warning: Result of job {source.id} unavailable for dedup: {e}")
+    if result is None:
+        return False
+
+    result_key = storage.upload_json(result, prefix="results", compress=True)
+    cache.set_job_result(job_id, result)
+
+    now = datetime.now(timezone.utc)
+    job_state.update(
+        job,
+        status=Job.STATUS_COMPLETED,
+        progress=100,
+        current_step="Completed",
+        result_key=result_key,
+        started_at=now,
+        completed_at=now,
+        message_count=source.message_count,
+        participant_count=source.participant_count,
+        group_name=source.group_name,
+    )
+
+    ttl = job.ttl_seconds(current_app.config.get("RESULT_TTL_SECONDS", 3600))
+    cache.set_job_status(job_id, job.to_cache_dict())
+    cache.set_job_response(job_id, job.to_stats_dict(result), ttl=ttl)
+    cache.set_dedup_source(job.dedup_key(), job_id, ttl)
+
+    delete_upload(job)
+
+    metrics.incr("jobs_deduplicated")
+    metrics.flush()
+    return True
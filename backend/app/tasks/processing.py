@@ -1,160 +1,771 @@
 """
 Celery tasks for chat processing
+
+Jobs run either as one task (process_chat_task, the small lane's default)
+or as a canvas that spreads the stages across workers (the large lane's):
+
+    parse -> [chord(roast-input stat groups -> roast), remaining stat groups] -> compile
+
+The API queues them by name through app.tasks.dispatch; only workers import
+this module.
 """
 
+import time
 from datetime import datetime, timezone
-from ..extensions import celery, db
+from flask import current_app
+from core.ai import start_roasts
+from core.scanner import detect_dialect, scan_participants
+from core.roast_cache import RedisRoastCache
+from ..extensions import celery, db, redis_client, redis_binary_client
 from ..models import Job
 from ..services.storage import storage
+from ..services.chat_file import ChatFile, ChatFileError, ARCHIVE_ERRORS
 from ..services.cache import cache
-from ..services.processor import process_chat, validate_whatsapp_format
+from ..services.checkpoints import JobCheckpoints
+from ..services.job_state import job_state, db_pool_status
+from ..services.metrics import metrics
+from ..services.result_codec import result_codec
+from ..utils.security import validate_file_content
+from ..services.processor import (
+    process_chat, validate_whatsapp_format, load_or_parse_chat, get_user_messages,
+    base_stats, compute_stat_group, compute_personality_tags, load_stat_groups,
+    build_ready_slides, build_roast_inputs, compile_result, JobCancelled,
+    STAT_GROUPS, ROAST_INPUT_GROUPS,
+)
+from .dispatch import SMALL_QUEUE, delete_upload
+
+
+# Shared job lifecycle helpers
+def _update_progress(job_id: str):
+    """
+    Progress callback - Redis only (fast), skip DB during processing
+
+    Every update first checks the job's cancel flag and raises JobCancelled
+    once it's set, so a deleted job stops at its next stage.
+    """
+    def update_progress(progress: int, step: str):
+        _check_cancelled(job_id)
+        cache.set_job_progress(str(job_id), progress, step)
+    return update_progress
+
+
+def _check_cancelled(job_id: str):
+    """Raise JobCancelled if the job was deleted while in flight"""
+    if cache.is_job_cancelled(str(job_id)):
+        raise JobCancelled(f"Job {job_id} was cancelled")
+
+
+def _cancel_job(job_id: str, checkpoints: JobCheckpoints, interrupted: bool = True):
+    """
+    Drop what a cancelled job left behind and let the task exit
+
+    The job's row, upload and cache were deleted with it; this removes what
+    its tasks wrote since (checkpoints, progress, queued state changes).
+
+    Args:
+        interrupted: The task was stopped mid-run (counted as tasks_cancelled),
+            rather than skipped before it started
+    """
+    job_id = str(job_id)
+    checkpoints.clear()
+    cache.delete_job_cache(job_id)
+    job_state.delete_pending([job_id])
+    if interrupted:
+        print(f"Job {job_id} cancelled")
+        metrics.incr("tasks_cancelled")
+        metrics.flush()
+
+
+def _record_queue_wait(job_id: str, enqueued_at: float | None, lane: str | None):
+    """Record how long the job waited for a worker in its lane"""
+    if not enqueued_at:
+        return
+    wait_ms = max(0.0, (time.time() - enqueued_at) * 1000)
+    lane = lane or SMALL_QUEUE
+    metrics.observe(f"queue_wait_ms_{lane}", wait_ms,
+                    buckets=(10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000, 300000))
+    cache.set_job_metrics(str(job_id), {"queue": lane, "queue_wait_ms": round(wait_ms, 1)})
+
+
+def _mark_processing(job: Job):
+    """Mark the job as processing (written behind, with the job's next transitions)"""
+    job_state.update(
+        job,
+        status=Job.STATUS_PROCESSING,
+        started_at=datetime.now(timezone.utc),
+        current_step="Starting...",
+    )
+
+
+def _open_chat(job: Job, size: int) -> ChatFile:
+    """Open the uploaded chat text (.txt, .zip or .gz) as a stream"""
+    max_text = current_app.config.get("MAX_CHAT_TEXT_MB", 100) * 1024 * 1024
+    return ChatFile(storage, job.file_key, size, max_text)
+
+
+def _download_and_validate(job: Job):
+    """
+    Open the uploaded chat and check it looks like a WhatsApp export
+
+    Returns:
+        Iterator over the chat's lines, streamed from storage as it's consumed
+    """
+    size = job.file_size
+    if not size:
+        file_info = storage.get_file_metadata(job.file_key)
+        if file_info is None:
+            raise ValueError("Uploaded file not found")
+        size = file_info["size"]
+
+    chat = _open_chat(job, size)
+    try:
+        sample = chat.read_text(SNIFF_BYTES)
+        # Validate format
+        is_valid, error_msg = validate_whatsapp_format(sample)
+        if not is_valid:
+            raise ValueError(error_msg)
+    except Exception:
+        chat.close()
+        raise
+
+    def lines():
+        with chat:
+            yield from chat.lines(sample)
+
+    return lines()
+
+
+def _reopen_upload(job: Job):
+    """
+    Deferred _download_and_validate for load_or_parse_chat
+
+    Only called when the parse checkpoint is missing or unreadable, so a
+    resumed stage doesn't download the upload, and a lost checkpoint is
+    rebuilt from it instead of failing the job.
+    """
+    return lambda: _download_and_validate(job)
+
+
+def _roast_cache(job_id: str) -> RedisRoastCache:
+    """Roast cache shared by all workers (entries the job uses are deleted with it)"""
+    return RedisRoastCache(
+        redis_client,
+        ttl=current_app.config.get("ROAST_CACHE_TTL_SECONDS"),
+        counter=metrics.incr,
+        index_key=cache.roast_index_key(str(job_id)),
+    )
+
+
+def _record_job_metrics(job_id: str, job_metrics: dict):
+    """Record roast prompt size/latency for this job and in aggregate"""
+    cache.set_job_metrics(str(job_id), job_metrics)
+    if "roast_prompt_tokens" in job_metrics:
+        metrics.observe("roast_prompt_tokens", job_metrics["roast_prompt_tokens"],
+                        buckets=(250, 500, 1000, 1500, 2000, 3000, 4000, 6000, 8000))
+    if "roast_ms" in job_metrics:
+        metrics.observe("roast_ms", job_metrics["roast_ms"])
+
+
+def _complete_job(job: Job, result: dict, checkpoints: JobCheckpoints, update_progress):
+    """Save the result and mark the job completed"""
+    job_id = str(job.id)
+
+    # Extract metadata
+    basic_stats = result.get("basic_stats", {})
+    metadata = result.get("metadata", {})
+
+    # Upload result to R2
+    update_progress(98, "Saving results...")
+    result_key = storage.upload_json(result, prefix="results", compress=True)
+
+    # Cache result in Redis (replaces the partial slides)
+    cache.set_job_result(job_id, result)
+    cache.delete_partial_slides(job_id)
+
+    # Mark completed
+    job_state.update(
+        job,
+        status=Job.STATUS_COMPLETED,
+        progress=100,
+        current_step="Completed",
+        result_key=result_key,
+        completed_at=datetime.now(timezone.utc),
+        message_count=basic_stats.get("total_messages"),
+        participant_count=basic_stats.get("total_participants"),
+        group_name=metadata.get("group_name"),
+    )
+
+    # Update status cache, precompute the stats response and let identical
+    # uploads reuse the result for as long as this job lives
+    ttl = job.ttl_seconds(current_app.config.get("RESULT_TTL_SECONDS", 3600))
+    cache.set_job_status(job_id, job.to_cache_dict())
+    cache.set_job_response(job_id, job.to_stats_dict(result), ttl=ttl)
+    cache.set_dedup_source(job.dedup_key(), job_id, ttl)
+
+    # Checkpoints hold chat content - drop them with the upload
+    checkpoints.clear()
+
+    # Delete the uploaded file immediately after job completes
+    delete_upload(job)
+
+    metrics.flush()
+
+
+def _fail_job(job: Job, error: Exception, checkpoints: JobCheckpoints, final: bool):
+    """Mark the job failed; on the final attempt drop its checkpoints and upload"""
+    job_state.update(
+        job,
+        status=Job.STATUS_FAILED,
+        error_message=str(error),
+        completed_at=datetime.now(timezone.utc),
+    )
+
+    # Update status cache
+    cache.set_job_status(str(job.id), job.to_status_dict())
+
+    # Delete checkpoints and the uploaded file on failure (no retries left)
+    if final:
+        checkpoints.clear()
+        delete_upload(job)
+
+
+def _acquire_stage_lock(task, job_id: str, name: str) -> str | None:
+    """
+    Lock a job stage for this execution; None if another execution has it
+
+    Covers a redelivered message or a retry overlapping a slow attempt. The
+    lock lives until the task's hard time limit, when it would be killed.
+    """
+    hard_limit = (task.request.timelimit or (None, None))[0]
+    ttl = int(hard_limit or task.app.conf.task_time_limit or 300) + 30
+
+    token = job_state.acquire_lock(str(job_id), name, ttl)
+    if token is None:
+        print(f"Job {job_id} {name} is already running, skipping duplicate")
+        metrics.incr("task_duplicates")
+        metrics.flush()
+    return token
+
+
+def _run_stage(task, job: Job, checkpoints: JobCheckpoints, name: str, stage):
+    """
+    Run one canvas stage with the job's lock and retry/failure handling
+
+    A stage that fails for good marks the job failed and re-raises, which
+    stops the rest of the canvas. A cancelled job's stages return without
+    running; one that's running stops at its next check. A duplicate of a
+    running stage returns right away.
+    """
+    if cache.is_job_cancelled(str(job.id)):
+        _cancel_job(job.id, checkpoints, interrupted=False)
+        return {"job_id": str(job.id), "stage": "cancelled", "skipped": True}
+
+    token = _acquire_stage_lock(task, job.id, name)
+    if token is None:
+        return {"job_id": str(job.id), "stage": name, "skipped": True}
+
+    try:
+        return stage()
+    except JobCancelled:
+        _cancel_job(job.id, checkpoints)
+        return {"job_id": str(job.id), "stage": "cancelled", "skipped": True}
+    except Exception as e:
+        if task.request.retries < task.max_retries:
+            raise task.retry(exc=e, countdown=30)
+        _fail_job(job, e, checkpoints, final=True)
+        raise
+    finally:
+        job_state.release_lock(str(job.id), name, token)
+
+
+# Uploads are sniffed from this many leading bytes before the full download
+SNIFF_BYTES = 64 * 1024
+SCAN_BYTES_BUCKETS = (1024, 16384, 65536, 262144, 1048576, 4194304, 10485760, 20971520)
+
+
+class UploadRejected(Exception):
+    """Upload isn't a usable chat export (the message is shown to the user)"""
+
+    def __init__(self, message: str, bytes_read: int = 0):
+        super().__init__(message)
+        self.bytes_read = bytes_read
+
+
+def _scan_upload(job: Job) -> tuple[int, dict]:
+    """
+    Check, validate and quick-parse an upload; raises UploadRejected
+
+    Validation and format detection run on the first SNIFF_BYTES of chat
+    text, so non-chat files are rejected without downloading the rest. Zip
+    and gzip uploads are decompressed as they stream in; the content hash
+    covers the chat text, so a .txt and a .zip of one export match.
+
+    Returns:
+        Tuple of (bytes downloaded, scanned job fields)
+    """
+    # One HEAD for existence and size
+    file_info = storage.get_file_metadata(job.file_key)
+    if file_info is None:
+        raise UploadRejected("File not found. Upload may have failed.")
+
+    size = file_info["size"]
+    max_size = current_app.config.get("MAX_FILE_SIZE_MB", 20) * 1024 * 1024
+    if size > max_size:
+        raise UploadRejected(f"File too large. Maximum size is {max_size // (1024*1024)}MB")
+    if size == 0:
+        raise UploadRejected("File is empty")
+
+    chat = None
+    try:
+        chat = _open_chat(job, size)
+        sample = chat.read_text(SNIFF_BYTES)
+
+        is_valid, error_msg = validate_file_content(sample)
+        if not is_valid:
+            raise UploadRejected(error_msg, chat.bytes_read)
+        dialect = detect_dialect(sample)
+
+        participants, group_name = scan_participants(chat.lines(sample), dialect)
+    except UnicodeDecodeError:
+        raise UploadRejected("Invalid file encoding. Please export chat as text file.", _bytes_read(chat))
+    except ChatFileError as e:
+        raise UploadRejected(str(e), _bytes_read(chat))
+    except ARCHIVE_ERRORS:
+        raise UploadRejected("Couldn't read the archive. Please upload the export again.", _bytes_read(chat))
+    finally:
+        if chat is not None:
+            chat.close()
+
+    if not participants:
+        raise UploadRejected(
+            "No participants found in chat. Please ensure this is a WhatsApp chat export.", chat.bytes_read
+        )
+
+    return chat.bytes_read, {
+        "file_size": size,
+        "content_hash": chat.sha256.hexdigest(),
+        "participants": participants,
+        "group_name": group_name,
+    }
+
+
+def _bytes_read(chat: ChatFile | None) -> int:
+    return chat.bytes_read if chat is not None else 0
+
+
+def _reject_upload(job: Job, error_msg: str):
+    """Mark a scanned upload failed and delete the file"""
+    job_state.update(
+        job,
+        status=Job.STATUS_FAILED,
+        error_message=error_msg,
+        completed_at=datetime.now(timezone.utc),
+    )
+
+    cache.set_job_status(str(job.id), job.to_status_dict())
+    delete_upload(job)
+
+
+def _scan_cancelled(job_id: str) -> bool:
+    """Whether the job was deleted while its upload was scanned (cleaning up after it if so)"""
+    if not cache.is_job_cancelled(str(job_id)):
+        return False
+    _cancel_job(job_id, JobCheckpoints(job_id))
+    return True
+
+
+@celery.task(bind=True, max_retries=2)
+def scan_upload_task(self, job_id: str):
+    """
+    Scan a confirmed upload: validate it and extract participants
+
+    Moves the job from validating to awaiting_selection, or to failed with a
+    user-facing error.
+    """
+    job = job_state.load(job_id)
+    if not job or job.status != Job.STATUS_VALIDATING:
+        return
+
+    start = time.perf_counter()
+    try:
+        bytes_read, scanned = _scan_upload(job)
+    except UploadRejected as e:
+        print(f"Upload {job_id} rejected: {e}")
+        metrics.incr("uploads_rejected")
+        metrics.observe("upload_rejected_bytes", e.bytes_read, buckets=SCAN_BYTES_BUCKETS)
+        metrics.flush()
+        if not _scan_cancelled(job_id):
+            _reject_upload(job, str(e))
+        return
+    except Exception as e:
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=e, countdown=2)
+        print(f"Upload {job_id} scan failed: {e}")
+        if not _scan_cancelled(job_id):
+            _reject_upload(job, "Failed to process upload")
+        return
+
+    # Don't bring back the status of a job deleted mid-scan
+    if _scan_cancelled(job_id):
+        return
+
+    job_state.update(job, status=Job.STATUS_AWAITING_SELECTION, current_step=None, **scanned)
+    cache.set_job_status(job_id, job.to_status_dict())
+
+    metrics.incr("uploads_scanned")
+    metrics.observe("upload_scan_ms", (time.perf_counter() - start) * 1000)
+    metrics.observe("upload_scanned_bytes", bytes_read, buckets=SCAN_BYTES_BUCKETS)
+    metrics.flush()
 
 
 @celery.task(bind=True, max_retries=2)
-def process_chat_task(self, job_id: str):
+def process_chat_task(self, job_id: str, fresh_roast: bool = False,
+                      enqueued_at: float = None, lane: str = None):
     """
-    Process WhatsApp chat file
+    Process WhatsApp chat file in a single task
 
     Args:
         job_id: UUID of the job to process
+        fresh_roast: Bypass the roast cache and always call OpenAI
+        enqueued_at: Unix time the job was queued (for queue wait metrics)
+        lane: Queue the job was routed to
     """
-    job = Job.query.get(job_id)
+    job = job_state.load(job_id)
     if not job:
         return {"error": "Job not found"}
+    if job.status == Job.STATUS_COMPLETED:
+        return {"status": "completed", "job_id": str(job_id)}
 
-    try:
-        # Mark as processing (single DB update at start)
-        job.status = Job.STATUS_PROCESSING
-        job.started_at = datetime.now(timezone.utc)
-        job.current_step = "Starting..."
-        db.session.commit()
-
-        # Progress callback - Redis only (fast), skip DB during processing
-        def update_progress(progress: int, step: str):
-            # Only update Redis for real-time progress (skip DB round-trips)
-            cache.set_job_progress(str(job_id), progress, step)
+    # A duplicate delivery leaves the run to the execution holding the lock
+    token = _acquire_stage_lock(self, job_id, "process")
+    if token is None:
+        return {"status": "duplicate", "job_id": str(job_id)}
 
-        update_progress(5, "Validating file...")
+    # Stage outputs from a previous attempt (retries resume from here)
+    checkpoints = JobCheckpoints(job_id)
+    update_progress = _update_progress(job_id)
 
-        # Download file from R2
-        file_content = storage.download_file(job.file_key)
-        file_content = file_content.decode("utf-8")
+    if not self.request.retries:
+        _record_queue_wait(job_id, enqueued_at, lane)
 
-        # Validate format
-        is_valid, error_msg = validate_whatsapp_format(file_content)
-        if not is_valid:
-            raise ValueError(error_msg)
+    try:
+        _mark_processing(job)
+        update_progress(5, "Validating file...")
 
-        # Process the chat with selected members filter
+        # Process the chat with selected members filter (the upload is only
+        # downloaded and validated if no usable parse checkpoint exists)
+        job_metrics = {}
         result = process_chat(
-            file_content=file_content,
+            file_content=_reopen_upload(job),
             year=job.year_filter or 2025,
             selected_members=job.selected_members,
             progress_callback=update_progress,
+            roast_timeout=current_app.config.get("ROAST_TIMEOUT_SECONDS"),
+            roast_cache=_roast_cache(job_id),
+            fresh_roast=fresh_roast,
+            roast_token_budget=current_app.config.get("ROAST_PROMPT_TOKEN_BUDGET"),
+            job_metrics=job_metrics,
+            slide_callback=lambda slide: cache.add_partial_slide(str(job_id), slide),
+            checkpoints=checkpoints,
+            cancelled=lambda: cache.is_job_cancelled(str(job_id)),
         )
+        _record_job_metrics(job_id, job_metrics)
 
-        # Extract metadata
-        basic_stats = result.get("basic_stats", {})
-        metadata = result.get("metadata", {})
-
-        # Upload result to R2
-        update_progress(98, "Saving results...")
-        result_key = storage.upload_json(result, prefix="results", compress=True)
-
-        # Cache result in Redis
-        cache.set_job_result(str(job_id), result)
-
-        # Mark completed
-        job.status = Job.STATUS_COMPLETED
-        job.progress = 100
-        job.current_step = "Completed"
-        job.result_key = result_key
-        job.completed_at = datetime.now(timezone.utc)
-        job.message_count = basic_stats.get("total_messages")
-        job.participant_count = basic_stats.get("total_participants")
-        job.group_name = metadata.get("group_name")
-        db.session.commit()
-
-        # Update status cache
-        cache.set_job_status(str(job_id), job.to_status_dict())
-
-        # Delete the uploaded file immediately after job completes
-        if job.file_key:
-            try:
-                storage.delete_file(job.file_key)
-                job.file_key = None
-                db.session.commit()
-            except Exception as delete_error:
-                print(f"Warning: Failed to delete uploaded file {job.file_key}: {delete_error}")
+        _complete_job(job, result, checkpoints, update_progress)
 
         return {"status": "completed", "job_id": str(job_id)}
 
+    except JobCancelled:
+        _cancel_job(job_id, checkpoints)
+        return {"status": "cancelled", "job_id": str(job_id)}
+
     except Exception as e:
-        # Mark failed
-        job.status = Job.STATUS_FAILED
-        job.error_message = str(e)
-        job.completed_at = datetime.now(timezone.utc)
-        db.session.commit()
-
-        # Update status cache
-        cache.set_job_status(str(job_id), job.to_status_dict())
-
-        # Delete the uploaded file on failure (no retries left)
-        if self.request.retries >= self.max_retries and job.file_key:
-            try:
-                storage.delete_file(job.file_key)
-                job.file_key = None
-                db.session.commit()
-            except Exception as delete_error:
-                print(f"Warning: Failed to delete uploaded file {job.file_key}: {delete_error}")
+        final = self.request.retries >= self.max_retries
+        _fail_job(job, e, checkpoints, final=final)
 
         # Optionally retry
-        if self.request.retries < self.max_retries:
+        if not final:
             raise self.retry(exc=e, countdown=30)
 
         return {"status": "failed", "error": str(e)}
 
+    finally:
+        job_state.release_lock(str(job_id), "process", token)
+
+
+@celery.task(bind=True, max_retries=2)
+def parse_chat_task(self, job_id: str, enqueued_at: float = None, lane: str = None):
+    """
+    Canvas stage 1: download, validate and parse the chat
+
+    The parsed DataFrame is checkpointed for the stat group tasks.
+    """
+    job = job_state.load(job_id)
+    if not job:
+        raise ValueError(f"Job {job_id} not found")
+
+    if not self.request.retries:
+        _record_queue_wait(job_id, enqueued_at, lane)
+
+    checkpoints = JobCheckpoints(job_id)
+    update_progress = _update_progress(job_id)
+
+    def stage():
+        _mark_processing(job)
+        update_progress(5, "Validating file...")
+
+        load_or_parse_chat(
+            _reopen_upload(job), job.year_filter or 2025, job.selected_members, update_progress, checkpoints
+        )
+        return {"job_id": str(job_id), "stage": "parse"}
+
+    return _run_stage(self, job, checkpoints, "parse", stage)
+
+
+@celery.task(bind=True, max_retries=2)
+def compute_stat_group_task(self, job_id: str, group_name: str):
+    """Canvas stage 2: compute one stat group (groups run in parallel)"""
+    job = job_state.load(job_id)
+    if not job or job.status == Job.STATUS_FAILED:
+        return {"job_id": str(job_id), "stage": group_name, "skipped": True}
+
+    checkpoints = JobCheckpoints(job_id)
+    stage_name = f"stats:{group_name}"
+
+    def stage():
+        if not checkpoints.has(stage_name):
+            df, _, _ = load_or_parse_chat(_reopen_upload(job), job.year_filter or 2025, job.selected_members,
+                                          lambda *a: None, checkpoints)
+            user_df = get_user_messages(df)
+            group_stats = compute_stat_group(group_name, df, user_df)
+            checkpoints.save(stage_name, group_stats)
+
+            # Publish the slides this group completes on its own
+            stats = base_stats(df, user_df, job.year_filter or 2025)
+            stats.update(group_stats)
+            build_ready_slides(
+                stats, {}, lambda slide: cache.add_partial_slide(str(job_id), slide)
+            )
+
+        done = sum(1 for name in checkpoints.state() if name.startswith("stats:"))
+        _update_progress(job_id)(
+            25 + int(55 * done / len(STAT_GROUPS)),
+            f"Analyzed {done}/{len(STAT_GROUPS)} stat groups...",
+        )
+        return {"job_id": str(job_id), "stage": stage_name}
+
+    return _run_stage(self, job, checkpoints, stage_name, stage)
+
+
+@celery.task(bind=True, max_retries=2)
+def roast_chat_task(self, job_id: str, fresh_roast: bool = False):
+    """Canvas stage 3: generate AI roasts once their input groups are done"""
+    job = job_state.load(job_id)
+    if not job or job.status == Job.STATUS_FAILED:
+        return {"job_id": str(job_id), "stage": "roast", "skipped": True}
+
+    checkpoints = JobCheckpoints(job_id)
+    year = job.year_filter or 2025
+
+    def stage():
+        if checkpoints.has("roast"):
+            return {"job_id": str(job_id), "stage": "roast"}
+
+        _update_progress(job_id)(80, "Judging your year...")
+        df, group_name, _ = load_or_parse_chat(
+            _reopen_upload(job), year, job.selected_members, lambda *a: None, checkpoints
+        )
+        user_df = get_user_messages(df)
+        stats = load_stat_groups(base_stats(df, user_df, year), checkpoints, ROAST_INPUT_GROUPS)
+        stats["personality_tags"] = compute_personality_tags(df, stats)
+
+        job_metrics = {}
+        ai_roasts = start_roasts(
+            timeout=current_app.config.get("ROAST_TIMEOUT_SECONDS"),
+            cache=_roast_cache(job_id),
+            fresh=fresh_roast,
+            token_budget=current_app.config.get("ROAST_PROMPT_TOKEN_BUDGET"),
+            metrics=job_metrics,
+            cancelled=lambda: cache.is_job_cancelled(str(job_id)),
+            **build_roast_inputs(stats, user_df, group_name, year),
+        ).result()
+        _check_cancelled(job_id)
+        _record_job_metrics(job_id, job_metrics)
+
+        # Fallback roasts aren't worth keeping - a retry should try again
+        if not ai_roasts.pop("fallback", False):
+            checkpoints.save("roast", ai_roasts)
+        else:
+            # Hand the fallback to the compile stage without keeping it around
+            checkpoints.save("roast:fallback", ai_roasts)
+
+        build_ready_slides(
+            {"ai_roasts": ai_roasts}, {}, lambda slide: cache.add_partial_slide(str(job_id), slide)
+        )
+        metrics.flush()
+        return {"job_id": str(job_id), "stage": "roast"}
+
+    return _run_stage(self, job, checkpoints, "roast", stage)
+
+
+@celery.task(bind=True, max_retries=2)
+def compile_chat_task(self, job_id: str):
+    """Canvas stage 4: build every slide and save the result"""
+    job = job_state.load(job_id)
+    if not job or job.status in (Job.STATUS_FAILED, Job.STATUS_COMPLETED):
+        return {"job_id": str(job_id), "stage": "compile", "skipped": True}
+
+    checkpoints = JobCheckpoints(job_id)
+    update_progress = _update_progress(job_id)
+    year = job.year_filter or 2025
+
+    def stage():
+        update_progress(95, "Compiling your wrapped...")
+        df, group_name, total_before = load_or_parse_chat(
+            _reopen_upload(job), year, job.selected_members, update_progress, checkpoints
+        )
+        user_df = get_user_messages(df)
+        stats = load_stat_groups(
+            base_stats(df, user_df, year), checkpoints, [name for name, *_ in STAT_GROUPS]
+        )
+        stats["personality_tags"] = compute_personality_tags(df, stats)
+        stats["ai_roasts"] = checkpoints.load("roast") or checkpoints.load("roast:fallback")
+        if stats["ai_roasts"] is None:
+            raise RuntimeError("AI roasts have not been generated")
+
+        slides = {}
+        build_ready_slides(stats, slides)
+        result = compile_result(stats, slides, group_name, total_before, len(df))
+
+        _complete_job(job, result, checkpoints, update_progress)
+        return {"status": "completed", "job_id": str(job_id)}
+
+    return _run_stage(self, job, checkpoints, "compile", stage)
+
+
+CLEANUP_RATE_BUCKETS = (10, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
 
 @celery.task
 def cleanup_expired_jobs():
     """
     Periodic task to cleanup expired jobs
 
+    Pages through expired jobs by (expires_at, id) on the (status, expires_at)
+    index, and deletes each page in bulk: R2 objects 1000 keys per request,
+    Redis keys in one pipeline, rows with one DELETE.
     Schedule this with celery beat or external cron
     """
-    now = datetime.now(timezone.utc)
+    # Rows are only as current as the last flush - write queued transitions
+    # first so the status/expires_at filter sees them
+    flush_job_states()
 
-    # Find expired jobs
-    expired_jobs = Job.query.filter(
-        Job.expires_at < now,
-        Job.status.in_([Job.STATUS_COMPLETED, Job.STATUS_FAILED])
-    ).all()
+    now = datetime.now(timezone.utc)
+    batch_size = current_app.config.get("CLEANUP_BATCH_SIZE", 500)
+    start = time.perf_counter()
 
     deleted_count = 0
-
-    for job in expired_jobs:
+    failed_count = 0
+    batches = 0
+    cursor = None
+
+    while True:
+        query = db.session.query(Job.id, Job.file_key, Job.result_key, Job.expires_at).filter(
+            Job.status.in_([Job.STATUS_COMPLETED, Job.STATUS_FAILED]),
+            Job.expires_at < now,
+        )
+        if cursor is not None:
+            query = query.filter(db.tuple_(Job.expires_at, Job.id) > cursor)
+        rows = query.order_by(Job.expires_at, Job.id).limit(batch_size).all()
+        if not rows:
+            break
+
+        batches += 1
+        cursor = (rows[-1].expires_at, rows[-1].id)
+        ids = [row.id for row in rows]
+        job_ids = [str(job_id) for job_id in ids]
+
+        batch_start = time.perf_counter()
         try:
-            # Delete files from R2
-            keys_to_delete = []
-            if job.file_key:
-                keys_to_delete.append(job.file_key)
-            if job.result_key:
-                keys_to_delete.append(job.result_key)
+            # Uploads, results and checkpoints hold chat content - delete them first
+            storage.delete_files([key for row in rows for key in (row.file_key, row.result_key) if key])
+            JobCheckpoints.clear_many(job_ids)
+            cache.delete_jobs_cache(job_ids)
+            job_state.delete_pending(job_ids)
+
+            Job.query.filter(Job.id.in_(ids)).delete(synchronize_session=False)
+            db.session.commit()
+            deleted_count += len(ids)
+        except Exception as e:
+            db.session.rollback()
+            failed_count += len(ids)
+            print(f"Error cleaning up {len(ids)} expired jobs: {e}")
+            continue
+        finally:
+            metrics.observe("cleanup_batch_ms", (time.perf_counter() - batch_start) * 1000)
 
-            if keys_to_delete:
-                storage.delete_files(keys_to_delete)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    jobs_per_second = deleted_count / (elapsed_ms / 1000) if elapsed_ms else 0.0
 
-            # Delete from cache
-            cache.delete_job_cache(str(job.id))
+    metrics.incr("cleanup_jobs_deleted", deleted_count)
+    metrics.incr("cleanup_jobs_failed", failed_count)
+    metrics.observe("cleanup_run_ms", elapsed_ms)
+    metrics.observe("cleanup_jobs_per_second", jobs_per_second, buckets=CLEANUP_RATE_BUCKETS)
+    metrics.flush()
 
-            # Delete from database
-            db.session.delete(job)
-            deleted_count += 1
+    return {
+        "deleted": deleted_count,
+        "failed": failed_count,
+        "batches": batches,
+        "elapsed_ms": round(elapsed_ms, 1),
+        "jobs_per_second": round(jobs_per_second, 1),
+    }
 
-        except Exception as e:
-            print(f"Error cleaning up job {job.id}: {e}")
-            continue
 
-    db.session.commit()
+POOL_BUCKETS = (0, 1, 2, 3, 5, 10, 15, 20)
+FLUSH_ROWS_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+@celery.task
+def flush_job_states():
+    """
+    Periodic task to persist queued job state transitions to Postgres
+
+    Writes up to JOB_STATE_FLUSH_BATCH_SIZE jobs per round until a round
+    comes up short. Scheduled by celery beat every JOB_STATE_FLUSH_SECONDS.
+    """
+    batch_size = current_app.config.get("JOB_STATE_FLUSH_BATCH_SIZE", 500)
+    start = time.perf_counter()
+
+    flushed = 0
+    while True:
+        with metrics.timer("job_state_flush_batch_ms"):
+            count = job_state.flush(batch_size)
+        if count:
+            flushed += count
+            metrics.observe("job_state_flush_rows", count, buckets=FLUSH_ROWS_BUCKETS)
+        if count < batch_size:
+            break
+
+    pool = db_pool_status()
+    if "checkedout" in pool:
+        metrics.observe("db_pool_checked_out", pool["checkedout"], buckets=POOL_BUCKETS)
+    metrics.incr("job_state_rows_flushed", flushed)
+    metrics.observe("job_state_flush_ms", (time.perf_counter() - start) * 1000)
+    metrics.flush()
+
+    return {"flushed": flushed, "elapsed_ms": round((time.perf_counter() - start) * 1000, 1), "pool": pool}
+
 
-    return {"deleted": deleted_count}
+@celery.task
+def train_result_dictionary():
+    """
+    Periodic task to retrain the zstd dictionary for cached results
+
+    Samples fields of currently cached results, so the dictionary tracks
+    the real result shape. Scheduled by celery beat every
+    RESULT_DICT_TRAIN_SECONDS.
+    """
+    samples = cache.sample_result_fields()
+    dict_id = result_codec.train(redis_binary_client, samples)
+    return {"samples": len(samples), "dict_id": dict_id}
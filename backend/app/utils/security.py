@@ -2,9 +2,11 @@
 Security utilities for file validation
 """
 
+import hmac
 import re
 from flask import current_app
 from werkzeug.datastructures import FileStorage
+from ..services.chat_file import ZIP_MAGIC, GZIP_MAGIC
 
 # Optional: python-magic for MIME type detection
 try:
@@ -14,11 +16,43 @@ except ImportError:
     HAS_MAGIC = False
 
 
+# Upload extensions and the content type they're PUT with (.zip is WhatsApp's
+# "Export chat" with media, .gz a compressed .txt)
+ALLOWED_UPLOAD_TYPES = {
+    ".txt": "text/plain",
+    ".zip": "application/zip",
+    ".gz": "application/gzip",
+}
+
+# Leading bytes of the allowed archive types
+ARCHIVE_MAGIC = {
+    ".zip": ZIP_MAGIC,
+    ".gz": GZIP_MAGIC,
+}
+
+
 class ValidationError(Exception):
     """Custom validation error"""
     pass
 
 
+def validate_upload_filename(filename: str | None) -> tuple[bool, str, str]:
+    """
+    Validate an upload's filename by its extension
+
+    Returns:
+        Tuple of (is_valid, extension, error_message)
+    """
+    if not filename:
+        return True, ".txt", ""  # Default: plain text export
+
+    ext = '.' + filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if ext not in ALLOWED_UPLOAD_TYPES:
+        return False, "", f"Invalid file type. Allowed: {', '.join(ALLOWED_UPLOAD_TYPES)}"
+
+    return True, ext, ""
+
+
 def validate_file_upload(file: FileStorage) -> tuple[bool, str]:
     """
     Validate uploaded file
@@ -36,10 +70,9 @@ def validate_file_upload(file: FileStorage) -> tuple[bool, str]:
         return False, "No filename provided"
 
     # Check file extension
-    allowed_extensions = {'.txt'}
-    ext = '.' + file.filename.rsplit('.', 1)[-1].lower() if '.' in file.filename else ''
-    if ext not in allowed_extensions:
-        return False, f"Invalid file type. Allowed: {', '.join(allowed_extensions)}"
+    is_valid, ext, error_msg = validate_upload_filename(file.filename)
+    if not is_valid:
+        return False, error_msg
 
     # Check file size (read to check, then seek back)
     file.seek(0, 2)  # Seek to end
@@ -53,6 +86,14 @@ def validate_file_upload(file: FileStorage) -> tuple[bool, str]:
     if size == 0:
         return False, "File is empty"
 
+    # Archives are checked by their magic bytes here, their chat text when scanned
+    if ext in ARCHIVE_MAGIC:
+        header = file.read(len(ARCHIVE_MAGIC[ext]))
+        file.seek(0)
+        if header != ARCHIVE_MAGIC[ext]:
+            return False, f"File isn't a valid {ext} archive"
+        return True, ""
+
     # Check MIME type using python-magic (if available)
     if HAS_MAGIC:
         try:
@@ -177,6 +218,20 @@ def validate_file_content(content: str) -> tuple[bool, str]:
     return True, ""
 
 
+def validate_upload_key(file_key: str | None) -> tuple[bool, str]:
+    """
+    Validate a storage key handed back by the client for an upload
+
+    Returns:
+        Tuple of (is_valid, error_message)
+    """
+    if not file_key or not isinstance(file_key, str):
+        return False, "file_key is required"
+    if not file_key.startswith("uploads/") or ".." in file_key:
+        return False, "Invalid file_key"
+    return True, ""
+
+
 def validate_uuid(uuid_str: str) -> tuple[bool, str]:
     """
     Validate UUID format
@@ -191,3 +246,28 @@ def validate_uuid(uuid_str: str) -> tuple[bool, str]:
         return True, ""
     except (ValueError, AttributeError):
         return False, "Invalid job ID format"
+
+
+def validate_admin_token(auth_header: str | None) -> tuple[bool, str]:
+    """
+    Validate the bearer token for admin/metrics endpoints
+
+    Without ADMIN_TOKEN the endpoints are only open in debug and testing;
+    otherwise they refuse every request.
+
+    Returns:
+        Tuple of (is_valid, error_message)
+    """
+    token = current_app.config.get("ADMIN_TOKEN")
+    if not token:
+        if current_app.debug or current_app.testing:
+            return True, ""
+        return False, "Admin endpoints are disabled (ADMIN_TOKEN is not set)"
+
+    if not auth_header or not auth_header.startswith("Bearer "):
+        return False, "Authorization required"
+
+    if not hmac.compare_digest(auth_header[len("Bearer "):], token):
+        return False, "Invalid token"
+
+    return True, ""
@@ -3,6 +3,7 @@ Celery worker entry point
 Run with: celery -A celery_worker.celery worker --loglevel=info
 """
 
+from celery.signals import worker_process_init
 from app import create_app
 from app.extensions import celery
 
@@ -14,3 +15,20 @@ app.app_context().push()
 
 # Import tasks to register them
 from app.tasks import processing  # noqa: F401, E402
+
+
+@worker_process_init.connect
+def warm_up_worker_process(**kwargs):
+    """Warm up each worker process so its first job is as fast as the rest"""
+    if not app.config.get("WORKER_WARMUP", True):
+        return
+
+    from app.services.metrics import metrics
+    from app.services.warmup import warm_up_worker
+
+    try:
+        metrics.observe("worker_warmup_ms", warm_up_worker())
+        metrics.flush()
+    except Exception as e:
+        # Never keep a worker from starting
+        app.logger.warning(f"Worker warm-up failed: {e}")
@@ -1,13 +1,38 @@
 # Core processing modules
-from .constants import SYSTEM_PATTERNS, IGNORED_SENDERS, MEDIA_PATTERNS, CHAT_STOP_WORDS, TOPIC_ONLY_STOP_WORDS
-from .parser import parse_whatsapp, parse_whatsapp_content, detect_group_names, merge_similar_contacts, extract_emojis
-from .stats import (
-    get_basic_stats, get_top_chatters, get_hourly_activity, get_daily_activity,
-    get_emoji_stats, get_emoji_stats_by_user, get_media_stats, get_word_stats,
-    get_conversation_starters, get_night_owls, get_early_birds, get_longest_messages,
-    get_busiest_dates, get_response_pairs, get_double_texters, get_conversation_killers,
-    get_response_times, get_streak_stats, get_caps_users, get_question_askers,
-    get_link_sharers, get_one_worders, get_monologuers, get_laugh_stats,
-    get_unique_words_per_person, get_catchphrases, get_interesting_topics, get_group_vibe
-)
-from .roasts import assign_personality_tags
+#
+# names load lazily from their submodule on first access, so importing
+# core.constants or core.scanner (the api does) doesn't pull in pandas
+
+import importlib
+
+_EXPORTS = {
+    "constants": ["SYSTEM_PATTERNS", "IGNORED_SENDERS", "MEDIA_PATTERNS", "CHAT_STOP_WORDS", "TOPIC_ONLY_STOP_WORDS"],
+    "scanner": ["detect_dialect", "scan_participants"],
+    "parser": [
+        "parse_whatsapp", "parse_whatsapp_content", "parse_whatsapp_stream", "detect_group_names",
+        "merge_similar_contacts", "extract_emojis",
+    ],
+    "stats": [
+        "get_basic_stats", "get_top_chatters", "get_hourly_activity", "get_daily_activity",
+        "get_emoji_stats", "get_emoji_stats_by_user", "get_media_stats", "get_word_stats",
+        "get_conversation_starters", "get_night_owls", "get_early_birds", "get_longest_messages",
+        "get_busiest_dates", "get_response_pairs", "get_double_texters", "get_conversation_killers",
+        "get_response_times", "get_streak_stats", "get_caps_users", "get_question_askers",
+        "get_link_sharers", "get_one_worders", "get_monologuers", "get_laugh_stats",
+        "get_unique_words_per_person", "get_catchphrases", "get_interesting_topics", "get_group_vibe",
+    ],
+    "roasts": ["assign_personality_tags"],
+}
+
+_MODULE_FOR = {name: module for module, names in _EXPORTS.items() for name in names}
+
+__all__ = list(_MODULE_FOR)
+
+
+def __getattr__(name):
+    module = _MODULE_FOR.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
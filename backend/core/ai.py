@@ -2,15 +2,40 @@
 OpenAI service for AI-powered roasts
 """
 
+import asyncio
 import json
 import logging
 import os
-from openai import OpenAI
+import threading
+import time
+from concurrent.futures import Future
+from openai import AsyncOpenAI, OpenAI
 
-from .prompts import ROAST_SYSTEM_PROMPT, build_member_stats_context, build_roast_prompt
+from .prompts import ROAST_SYSTEM_PROMPT, build_budgeted_roast_prompt, estimate_tokens
+from .roast_cache import RoastCache, roast_cache_key
 
 logger = logging.getLogger(__name__)
 
+# Model parameters (part of the roast cache key)
+ROAST_MODEL_PARAMS = {
+    "model": "gpt-4o-mini",
+    "temperature": 0.9,
+    "max_tokens": 2000,
+}
+
+# Default deadline for the roast request (seconds)
+ROAST_TIMEOUT_SECONDS = float(os.getenv("ROAST_TIMEOUT_SECONDS", "20"))
+
+# How often a pending roast request checks whether its job was cancelled
+CANCEL_POLL_SECONDS = 0.5
+
+# Background event loop for overlapping roasts with stats computation, and
+# the async client its requests share (both per process, see _roast_runtime)
+_roast_loop: asyncio.AbstractEventLoop | None = None
+_async_client: AsyncOpenAI | None = None
+_roast_pid: int | None = None
+_roast_lock = threading.Lock()
+
 
 def get_openai_client():
     """Get OpenAI client"""
@@ -20,6 +45,43 @@ def get_openai_client():
     return OpenAI(api_key=api_key)
 
 
+def _roast_runtime():
+    """Drop the loop and client inherited from a parent process (its thread didn't survive the fork)"""
+    global _roast_loop, _async_client, _roast_pid
+    if _roast_pid != os.getpid():
+        _roast_loop, _async_client, _roast_pid = None, None, os.getpid()
+
+
+def get_async_openai_client():
+    """
+    Async OpenAI client shared by the process's roast requests
+
+    Built once, so later roasts reuse its connection pool instead of paying
+    for a new TLS handshake. Only use it on the roast loop (start_roasts);
+    it has no retries and no default timeout - callers pass their deadline.
+    """
+    global _async_client
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise ValueError("OPENAI_API_KEY not set")
+    with _roast_lock:
+        _roast_runtime()
+        if _async_client is None:
+            _async_client = AsyncOpenAI(api_key=api_key, max_retries=0)
+        return _async_client
+
+
+def _get_roast_loop() -> asyncio.AbstractEventLoop:
+    """Lazily start the roast event loop thread (after fork, in Celery workers)"""
+    global _roast_loop
+    with _roast_lock:
+        _roast_runtime()
+        if _roast_loop is None:
+            _roast_loop = asyncio.new_event_loop()
+            threading.Thread(target=_roast_loop.run_forever, name="roasts", daemon=True).start()
+        return _roast_loop
+
+
 def generate_roasts(
     group_name: str,
     year: int,
@@ -40,10 +102,19 @@ def generate_roasts(
     question_askers: dict,
     one_worders: dict,
     sample_messages: dict = None,
+    cache: RoastCache = None,
+    fresh: bool = False,
+    token_budget: int = None,
+    metrics: dict = None,
 ) -> dict:
     """
     Generate AI-powered roasts using OpenAI GPT-4o-mini
 
+    If a cache is given, an identical prompt is served from it instead of
+    calling OpenAI. fresh=True skips the lookup (the new roast is still stored).
+    The user prompt is built within `token_budget` tokens; its size and the
+    roast latency are written into `metrics` when given.
+
     Returns:
         {
             "brainrot_score": int,
@@ -51,11 +122,18 @@ def generate_roasts(
             "individual_roasts": dict[str, str]
         }
     """
+    start_time = time.perf_counter()
     try:
         client = get_openai_client()
 
-        # Build member stats context
-        member_stats_context = build_member_stats_context(
+        user_prompt = _build_user_prompt(
+            group_name=group_name,
+            year=year,
+            total_messages=total_messages,
+            total_participants=total_participants,
+            peak_hour=peak_hour,
+            topics=topics,
+            top_words=top_words,
             top_chatters=top_chatters,
             signature_words=signature_words,
             personality_tags=personality_tags,
@@ -68,78 +146,269 @@ def generate_roasts(
             question_askers=question_askers,
             one_worders=one_worders,
             sample_messages=sample_messages,
+            token_budget=token_budget,
+            metrics=metrics,
         )
 
-        # Build prompt
-        member_names = list(top_chatters.keys())
-        user_prompt = build_roast_prompt(
-            group_name=group_name,
-            year=year,
-            total_messages=total_messages,
-            total_participants=total_participants,
-            peak_hour=peak_hour,
-            topics=topics,
-            top_words=top_words,
-            member_stats_context=member_stats_context,
-            member_names=member_names,
-        )
+        cache_key = roast_cache_key(ROAST_SYSTEM_PROMPT, user_prompt, ROAST_MODEL_PARAMS)
+        cached = _get_cached_roasts(cache, cache_key, fresh)
+        if cached is not None:
+            return cached
 
         logger.info(f"Calling OpenAI for roasts (group: {group_name}, {total_participants} members)")
 
         # Call OpenAI
         response = client.chat.completions.create(
-            model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": ROAST_SYSTEM_PROMPT},
                 {"role": "user", "content": user_prompt},
             ],
-            temperature=0.9,
-            max_tokens=2000,
             response_format={"type": "json_object"},
+            **ROAST_MODEL_PARAMS,
         )
 
-        # Parse response
-        content = response.choices[0].message.content
-        result = json.loads(content)
+        result = _parse_roast_response(response.choices[0].message.content)
+        if cache:
+            cache.set(cache_key, result)
+        return result
+
+    except json.JSONDecodeError as e:
+        logger.error(f"Failed to parse OpenAI response as JSON: {e}")
+        return fallback_roasts(top_chatters)
 
-        # Validate structure
-        if "brainrot_score" not in result:
-            result["brainrot_score"] = 69  # default meme number
+    except Exception as e:
+        logger.error(f"OpenAI API error: {e}")
+        return fallback_roasts(top_chatters)
 
-        if "group_roast" not in result:
-            result["group_roast"] = "this group is too mid to roast fr"
+    finally:
+        _record_latency(metrics, start_time)
 
-        if "individual_roasts" not in result:
-            result["individual_roasts"] = {}
 
-        # Ensure brainrot_score is int
-        result["brainrot_score"] = int(result["brainrot_score"])
+async def _await_deadline(request, timeout: float, cancelled=None):
+    """
+    Await a request until its deadline (raises asyncio.TimeoutError)
+
+    cancelled() is polled every CANCEL_POLL_SECONDS; once it returns True the
+    deadline is now, so a cancelled job never waits out the full timeout.
+    """
+    task = asyncio.ensure_future(request)
+    deadline = time.monotonic() + timeout
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or (cancelled and cancelled()):
+                raise asyncio.TimeoutError
+            done, _ = await asyncio.wait({task}, timeout=min(remaining, CANCEL_POLL_SECONDS))
+            if done:
+                return task.result()
+    finally:
+        task.cancel()
+
+
+async def generate_roasts_async(
+    timeout: float = None, cache: RoastCache = None, fresh: bool = False,
+    token_budget: int = None, metrics: dict = None, cancelled=None, **roast_inputs
+) -> dict:
+    """
+    Generate AI-powered roasts with the async OpenAI client
+
+    Takes the same keyword arguments as generate_roasts. The request is
+    bounded by `timeout` seconds (default ROAST_TIMEOUT_SECONDS), cut short
+    once the optional `cancelled()` returns True; on timeout, cancellation
+    or any error the fallback roasts are returned.
+    """
+    timeout = timeout or ROAST_TIMEOUT_SECONDS
+    top_chatters = roast_inputs.get("top_chatters") or {}
+    start_time = time.perf_counter()
+
+    try:
+        user_prompt = _build_user_prompt(token_budget=token_budget, metrics=metrics, **roast_inputs)
 
-        # Ensure group_roast is a string (in case AI returns array)
-        if isinstance(result["group_roast"], list):
-            result["group_roast"] = " ".join(result["group_roast"])
+        cache_key = roast_cache_key(ROAST_SYSTEM_PROMPT, user_prompt, ROAST_MODEL_PARAMS)
+        cached = _get_cached_roasts(cache, cache_key, fresh)
+        if cached is not None:
+            return cached
 
-        # Ensure individual roasts are strings (in case AI returns arrays)
-        for person, roast in result["individual_roasts"].items():
-            if isinstance(roast, list):
-                result["individual_roasts"][person] = " ".join(roast)
+        logger.info(
+            f"Calling OpenAI for roasts (group: {roast_inputs.get('group_name')}, "
+            f"{roast_inputs.get('total_participants')} members, deadline {timeout:.0f}s)"
+        )
 
-        logger.info(f"Generated roasts successfully (brainrot_score: {result['brainrot_score']})")
+        response = await _await_deadline(
+            get_async_openai_client().chat.completions.create(
+                messages=[
+                    {"role": "system", "content": ROAST_SYSTEM_PROMPT},
+                    {"role": "user", "content": user_prompt},
+                ],
+                response_format={"type": "json_object"},
+                timeout=timeout,
+                **ROAST_MODEL_PARAMS,
+            ),
+            timeout,
+            cancelled,
+        )
 
+        result = _parse_roast_response(response.choices[0].message.content)
+        if cache:
+            cache.set(cache_key, result)
         return result
 
+    except asyncio.TimeoutError:
+        if cancelled and cancelled():
+            logger.info("OpenAI roast request aborted, job was cancelled")
+        else:
+            logger.warning(f"OpenAI roast request exceeded {timeout:.0f}s deadline, using fallback")
+        return fallback_roasts(top_chatters)
+
     except json.JSONDecodeError as e:
         logger.error(f"Failed to parse OpenAI response as JSON: {e}")
-        return _fallback_roasts(top_chatters)
+        return fallback_roasts(top_chatters)
 
     except Exception as e:
         logger.error(f"OpenAI API error: {e}")
-        return _fallback_roasts(top_chatters)
+        return fallback_roasts(top_chatters)
+
+    finally:
+        _record_latency(metrics, start_time)
+
+
+def start_roasts(
+    timeout: float = None, cache: RoastCache = None, fresh: bool = False,
+    token_budget: int = None, metrics: dict = None, cancelled=None, **roast_inputs
+) -> Future:
+    """
+    Fire the roast request in the background and return immediately
+
+    The request runs on the process's roast event loop (a background
+    thread) so the caller can keep computing stats. Call `.result()` on the
+    returned future to collect the roasts (always a roast dict, never an
+    exception).
+    """
+    return asyncio.run_coroutine_threadsafe(
+        generate_roasts_async(
+            timeout=timeout, cache=cache, fresh=fresh,
+            token_budget=token_budget, metrics=metrics, cancelled=cancelled, **roast_inputs,
+        ),
+        _get_roast_loop(),
+    )
+
+
+def _get_cached_roasts(cache: RoastCache | None, cache_key: str, fresh: bool) -> dict | None:
+    """Look up a cached roast unless caching is off or a fresh roast was requested"""
+    if cache is None or fresh:
+        return None
+
+    cached = cache.get(cache_key)
+    if cached is not None:
+        logger.info(f"Roast cache hit ({cache_key[:12]})")
+    return cached
+
+
+def _build_user_prompt(
+    group_name: str,
+    year: int,
+    total_messages: int,
+    total_participants: int,
+    peak_hour: int,
+    topics: list,
+    top_words: list,
+    top_chatters: dict,
+    signature_words: dict,
+    personality_tags: dict,
+    user_emojis: dict,
+    night_owls: dict,
+    early_birds: dict,
+    double_texters: dict,
+    response_times: dict,
+    caps_users: dict,
+    question_askers: dict,
+    one_worders: dict,
+    sample_messages: dict = None,
+    token_budget: int = None,
+    metrics: dict = None,
+) -> str:
+    """Build the token-budgeted roast user prompt from chat stats"""
+    user_prompt, size = build_budgeted_roast_prompt(
+        group_name=group_name,
+        year=year,
+        total_messages=total_messages,
+        total_participants=total_participants,
+        peak_hour=peak_hour,
+        topics=topics,
+        top_words=top_words,
+        member_names=list(top_chatters.keys()),
+        token_budget=token_budget,
+        top_chatters=top_chatters,
+        signature_words=signature_words,
+        personality_tags=personality_tags,
+        user_emojis=user_emojis,
+        night_owls=night_owls,
+        early_birds=early_birds,
+        double_texters=double_texters,
+        response_times=response_times,
+        caps_users=caps_users,
+        question_askers=question_askers,
+        one_worders=one_worders,
+        sample_messages=sample_messages,
+    )
+
+    size["system_prompt_tokens"] = estimate_tokens(ROAST_SYSTEM_PROMPT)
+    logger.info(
+        f"Roast prompt: ~{size['prompt_tokens']} tokens ({size['prompt_chars']} chars, "
+        f"budget {size['token_budget']})"
+    )
+    if metrics is not None:
+        metrics.update({f"roast_{k}": v for k, v in size.items()})
+
+    return user_prompt
+
+
+def _record_latency(metrics: dict | None, start_time: float):
+    """Record roast latency (including cache hits and fallbacks)"""
+    if metrics is not None:
+        metrics["roast_ms"] = int((time.perf_counter() - start_time) * 1000)
+
 
+def _parse_roast_response(content: str) -> dict:
+    """Parse and validate the JSON roast response"""
+    result = json.loads(content)
 
-def _fallback_roasts(top_chatters: dict) -> dict:
-    """Fallback roasts if OpenAI fails"""
+    # Validate structure
+    if "brainrot_score" not in result:
+        result["brainrot_score"] = 69  # default meme number
+
+    if "group_roast" not in result:
+        result["group_roast"] = "this group is too mid to roast fr"
+
+    if "individual_roasts" not in result:
+        result["individual_roasts"] = {}
+
+    # Ensure brainrot_score is int
+    result["brainrot_score"] = int(result["brainrot_score"])
+
+    # Ensure group_roast is a string (in case AI returns array)
+    if isinstance(result["group_roast"], list):
+        result["group_roast"] = " ".join(result["group_roast"])
+
+    # Ensure individual roasts are strings (in case AI returns arrays)
+    for person, roast in result["individual_roasts"].items():
+        if isinstance(roast, list):
+            result["individual_roasts"][person] = " ".join(roast)
+
+    logger.info(f"Generated roasts successfully (brainrot_score: {result['brainrot_score']})")
+
+    return result
+
+
+def fallback_roasts(top_chatters: dict) -> dict:
+    """
+    Fallback roasts if OpenAI fails
+
+    Marked with "fallback": True so callers can skip caching them; pop it
+    before the roasts go into a result.
+    """
     return {
+        "fallback": True,
         "brainrot_score": 50,
         "group_roast": "this group exists and thats already concerning fr fr. collective screen time here could power a city no cap. touch grass challenge impossible edition. the wifi password saw this chat and changed itself",
         "individual_roasts": {
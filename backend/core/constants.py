@@ -445,3 +445,25 @@ TOPIC_ONLY_STOP_WORDS = CHAT_STOP_WORDS | {
     'bro', 'bruh', 'dude', 'man', 'guys',
     'sad', 'happy', 'nice', 'cool', 'lol', 'haha',
 }
+
+
+# Stat groups the processing canvas computes in parallel (app.services.processor
+# STAT_GROUPS has their functions), and the ones whose stats feed the roast
+# prompt - the roast fires once these are done
+STAT_GROUP_NAMES = ("overview", "conversation", "emoji_words", "behavior", "signature", "activity")
+ROAST_INPUT_GROUPS = {"overview", "conversation", "emoji_words", "behavior", "signature"}
+
+
+# Wrapped slides in presentation order: (id, title, type)
+SLIDE_MANIFEST = [
+    (1, "your year in messages", "overview"),
+    (2, "top chatters", "ranking"),
+    (3, "emoji game", "emojis"),
+    (4, "peak activity", "activity"),
+    (5, "word cloud", "words"),
+    (6, "signature words", "signature_words"),
+    (7, "conversation dynamics", "convo_dynamics"),
+    (8, "chat patterns", "chat_graph"),
+    (9, "fun stats", "fun_stats"),
+    (10, "ai roasts", "ai_roasts"),
+]
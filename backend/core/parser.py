@@ -1,62 +1,26 @@
 # parser - wa chat parsing and preprocessing
 
-import re
 import pandas as pd
-from datetime import datetime
 import emoji
 
-from .constants import SYSTEM_PATTERNS, IGNORED_SENDERS, MEDIA_PATTERNS
+from .constants import MEDIA_PATTERNS
+# Line matching lives in the pandas-free scanner (MESSAGE_PATTERNS and
+# detect_dialect stay importable from here)
+from .scanner import (  # noqa: F401
+    MESSAGE_PATTERNS, GROUP_RENAME_PATTERN, GROUP_CREATE_PATTERN, GENERIC_SYSTEM_SENDERS,
+    _parse_datetime, detect_dialect, ordered_patterns, is_system_message, is_group_system_message,
+    similar_contact_mapping, current_group_name,
+)
 
 
-def _parse_datetime(date_str, time_str):
-    """Parse date and time strings in various WhatsApp formats"""
-    # Date formats to try
-    date_formats = ['%d/%m/%y', '%m/%d/%y', '%d/%m/%Y', '%m/%d/%Y']
-    # Time formats to try
-    time_formats = ['%I:%M:%S %p', '%I:%M %p', '%H:%M:%S', '%H:%M']
-
-    msg_date = None
-    for fmt in date_formats:
-        try:
-            msg_date = datetime.strptime(date_str, fmt)
-            break
-        except ValueError:
-            continue
-
-    if msg_date is None:
-        return None, None
-
-    msg_time = None
-    for fmt in time_formats:
-        try:
-            msg_time = datetime.strptime(time_str.strip(), fmt)
-            break
-        except ValueError:
-            continue
-
-    if msg_time is None:
-        return None, None
-
-    return msg_date, msg_time
-
-
-def _parse_lines(lines):
+def _parse_lines(lines, dialect=None):
     """Internal parser that works on an iterable of lines"""
-    # Multiple patterns to handle different WhatsApp export formats
-    patterns = [
-        # [DD/MM/YY, H:MM:SS AM/PM] Sender: Message (iOS format)
-        r'^\[(\d{1,2}/\d{1,2}/\d{2,4}),\s(\d{1,2}:\d{2}(?::\d{2})?\s?[APap][Mm])\]\s([^:]+):\s(.*)$',
-        # [DD/MM/YY, HH:MM:SS] Sender: Message (24-hour format)
-        r'^\[(\d{1,2}/\d{1,2}/\d{2,4}),\s(\d{1,2}:\d{2}(?::\d{2})?)\]\s([^:]+):\s(.*)$',
-        # DD/MM/YY, H:MM AM/PM - Sender: Message (Android format without brackets)
-        r'^(\d{1,2}/\d{1,2}/\d{2,4}),\s(\d{1,2}:\d{2}(?::\d{2})?\s?[APap][Mm])\s[-–]\s([^:]+):\s(.*)$',
-        # DD/MM/YY, HH:MM - Sender: Message (Android 24-hour without brackets)
-        r'^(\d{1,2}/\d{1,2}/\d{2,4}),\s(\d{1,2}:\d{2}(?::\d{2})?)\s[-–]\s([^:]+):\s(.*)$',
-    ]
-
     data = []
     current_message = None
 
+    # Try the detected format first, the others only for odd lines
+    patterns = ordered_patterns(dialect)
+
     for line in lines:
         # strip ltr mark
         line = line.replace('\u200e', '').strip()
@@ -66,7 +30,7 @@ def _parse_lines(lines):
 
         match = None
         for pattern in patterns:
-            match = re.match(pattern, line)
+            match = pattern.match(line)
             if match:
                 break
 
@@ -91,7 +55,7 @@ def _parse_lines(lines):
                 second=msg_time.second
             )
 
-            is_system = any(p in content for p in SYSTEM_PATTERNS) or sender.strip() in IGNORED_SENDERS
+            is_system = is_system_message(sender, content)
 
             media_type = None
             for media, pattern_text in MEDIA_PATTERNS.items():
@@ -131,9 +95,14 @@ def parse_whatsapp(file_path):
         return _parse_lines(f)
 
 
-def parse_whatsapp_content(content: str):
+def parse_whatsapp_content(content: str, dialect=None):
     """Parse WhatsApp export from string content (for API)"""
-    return _parse_lines(content.split('\n'))
+    return _parse_lines(content.split('\n'), dialect)
+
+
+def parse_whatsapp_stream(lines, dialect=None):
+    """Parse WhatsApp export from an iterable of lines (streamed uploads)"""
+    return _parse_lines(lines, dialect)
 
 
 def detect_group_names(df):
@@ -141,27 +110,8 @@ def detect_group_names(df):
     if df.empty:
         return df, set(), None
 
-    # patterns where group name is the sender
-    group_system_patterns = [
-        "You created group",
-        "You changed the group name",
-        "You changed this group",
-        "You changed the subject",
-        "You changed the settings",
-        "Messages and calls are end-to-end encrypted",
-        "Only messages that mention",
-        "added you",
-        "removed you",
-        "left",
-        "joined using this group",
-        "changed the group",
-        "You're now an admin",
-        "can be read by Meta",
-        "allow only admins",
-    ]
-
     group_names = set()
-    current_group_name = None
+    group_name = None
     group_name_history = []
 
     for sender in df['sender'].unique():
@@ -171,7 +121,7 @@ def detect_group_names(df):
         all_system = True
         for _, row in sender_df.iterrows():
             msg = str(row['message'])
-            is_system_msg = any(pattern.lower() in msg.lower() for pattern in group_system_patterns)
+            is_system_msg = is_group_system_message(msg)
             if not is_system_msg and not row['is_system']:
                 all_system = False
                 break
@@ -184,7 +134,7 @@ def detect_group_names(df):
                 msg = str(row['message'])
 
                 # wa uses curly quotes U+201C/U+201D
-                name_match = re.search(r'changed the group name to [""\u201C](.+?)[""\u201D]', msg)
+                name_match = GROUP_RENAME_PATTERN.search(msg)
                 if name_match:
                     new_name = name_match.group(1)
                     group_name_history.append({
@@ -192,7 +142,7 @@ def detect_group_names(df):
                         'date': row['datetime']
                     })
 
-                create_match = re.search(r'created group [""\u201C](.+?)[""\u201D]', msg)
+                create_match = GROUP_CREATE_PATTERN.search(msg)
                 if create_match:
                     new_name = create_match.group(1)
                     group_name_history.insert(0, {
@@ -202,20 +152,19 @@ def detect_group_names(df):
 
     # get most recent name
     if group_name_history:
-        group_name_history.sort(key=lambda x: x['date'])
-        current_group_name = group_name_history[-1]['name']
-        print(f"  Group name: '{current_group_name}'")
+        group_name = current_group_name(group_name_history)
+        print(f"  Group name: '{group_name}'")
         if len(group_name_history) > 1:
             print(f"  (renamed {len(group_name_history)} times)")
 
     # also catch generic system senders
     for sender in df['sender'].unique():
-        if sender.lower() in ['you', 'group', 'admin']:
+        if sender.lower() in GENERIC_SYSTEM_SENDERS:
             group_names.add(sender)
 
     if group_names:
         for name in group_names:
-            if name != current_group_name:
+            if name != group_name:
                 count = len(df[df['sender'] == name])
                 print(f"  Filtered sender: '{name}' ({count} msgs)")
 
@@ -224,7 +173,7 @@ def detect_group_names(df):
         df = df.copy()
         df.loc[df['sender'].isin(group_names), 'is_system'] = True
 
-    return df, group_names, current_group_name
+    return df, group_names, group_name
 
 
 def merge_similar_contacts(df):
@@ -232,54 +181,7 @@ def merge_similar_contacts(df):
     if df.empty:
         return df
 
-    senders = df['sender'].unique().tolist()
-    name_mapping = {}
-
-    for i, name1 in enumerate(senders):
-        if name1 in name_mapping:
-            continue
-
-        for name2 in senders[i+1:]:
-            if name2 in name_mapping:
-                continue
-
-            n1_lower = name1.lower().strip()
-            n2_lower = name2.lower().strip()
-
-            # prefix match - common for contact renames
-            if n1_lower.startswith(n2_lower) or n2_lower.startswith(n1_lower):
-                # shorter = canonical
-                if len(name1) <= len(name2):
-                    canonical, old = name1, name2
-                else:
-                    canonical, old = name2, name1
-
-                name_mapping[old] = canonical
-
-            # first name match
-            elif n1_lower.split()[0] == n2_lower.split()[0] and len(n1_lower.split()[0]) > 3:
-                words1 = set(n1_lower.split())
-                words2 = set(n2_lower.split())
-
-                # college/institution indicators
-                inst_indicators = {'ssn', 'cse', 'ece', 'eee', 'mech', 'bme', 'chem', 'civil',
-                                   'g1', 'g2', 'g3', 's1', 's2', 's3', 'a1', 'a2', 'b1', 'b2'}
-
-                has_inst1 = bool(words1 & inst_indicators)
-                has_inst2 = bool(words2 & inst_indicators)
-
-                if has_inst1 != has_inst2:
-                    # one without inst suffix = canonical
-                    if has_inst1:
-                        canonical, old = name2, name1
-                    else:
-                        canonical, old = name1, name2
-
-                    canonical_words = set(canonical.lower().split())
-                    old_words = set(old.lower().split())
-
-                    if canonical_words.issubset(old_words):
-                        name_mapping[old] = canonical
+    name_mapping = similar_contact_mapping(df['sender'].unique().tolist())
 
     if name_mapping:
         df = df.copy()
@@ -2,6 +2,16 @@
 Prompt templates for AI-powered roasts
 """
 
+import math
+import os
+import re
+
+# Default token budget for the roast user prompt (keeps latency/cost bounded)
+ROAST_PROMPT_TOKEN_BUDGET = int(os.getenv("ROAST_PROMPT_TOKEN_BUDGET", "2500"))
+
+# Every member keeps at least this many tokens, however quiet they are
+MIN_MEMBER_TOKENS = 40
+
 ROAST_SYSTEM_PROMPT = """you are a brutal unhinged genz roast master. your job is to absolutely destroy friend groups and individuals based on their whatsapp chat data.
 
 rules:
@@ -76,7 +86,137 @@ IMPORTANT:
 - make each roast unique and specific to that person/group"""
 
 
-def build_member_stats_context(
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate token count locally (no tokenizer dependency)
+
+    ~4 ASCII characters per token; emoji and other non-ASCII characters
+    are counted as a token each.
+    """
+    if not text:
+        return 0
+    non_ascii = sum(1 for c in text if ord(c) > 127)
+    return math.ceil((len(text) - non_ascii) / 4) + non_ascii
+
+
+def _member_stat_lines(
+    i: int,
+    person: str,
+    msg_count: int,
+    signature_words: dict,
+    personality_tags: dict,
+    user_emojis: dict,
+    night_owls: dict,
+    early_birds: dict,
+    double_texters: dict,
+    response_times: dict,
+    caps_users: dict,
+    question_askers: dict,
+    one_worders: dict,
+) -> list[str]:
+    """Build the stat lines for one member (without sample messages)"""
+    person_lines = [f"\n{i}. {person}:"]
+    person_lines.append(f"   - Messages: {msg_count} (#{i} in group)")
+
+    # Signature words
+    if person in signature_words and signature_words[person]:
+        words = signature_words[person]
+        if isinstance(words, list):
+            person_lines.append(f"   - Signature words: {', '.join(words[:5])}")
+        elif isinstance(words, str):
+            person_lines.append(f"   - Signature words: {words}")
+
+    # Personality tags
+    if person in personality_tags and personality_tags[person]:
+        tags = [t['tag'] for t in personality_tags[person][:4]]
+        person_lines.append(f"   - Personality: {', '.join(tags)}")
+
+    # Top emojis
+    if person in user_emojis:
+        emoji_data = user_emojis[person]
+        if isinstance(emoji_data, dict) and 'top' in emoji_data:
+            emojis = list(emoji_data['top'].keys())[:3]
+            if emojis:
+                person_lines.append(f"   - Fav emojis: {' '.join(emojis)}")
+
+    # Night owl / Early bird
+    if person in night_owls and night_owls[person] > 10:
+        person_lines.append(f"   - Night owl: {night_owls[person]} late night msgs")
+    elif person in early_birds and early_birds[person] > 5:
+        person_lines.append(f"   - Early bird: {early_birds[person]} morning msgs")
+
+    # Double texter
+    if person in double_texters and double_texters[person] > 10:
+        person_lines.append(f"   - Double texter: {double_texters[person]} times")
+
+    # Response time
+    if person in response_times:
+        rt = response_times[person]
+        if isinstance(rt, dict) and 'avg_seconds' in rt:
+            avg = rt['avg_seconds']
+            if avg < 60:
+                person_lines.append(f"   - Replies in: ~{int(avg)}s (instant)")
+            elif avg < 300:
+                person_lines.append(f"   - Replies in: ~{int(avg/60)}min")
+            else:
+                person_lines.append(f"   - Replies in: ~{int(avg/60)}min (slow)")
+
+    # Caps user
+    if person in caps_users:
+        caps = caps_users[person]
+        if isinstance(caps, dict) and caps.get('caps_messages', 0) > 5:
+            person_lines.append(f"   - CAPS LOCK USER: {caps['caps_messages']} shouty msgs")
+
+    # Question asker
+    if person in question_askers:
+        qa = question_askers[person]
+        if isinstance(qa, dict) and qa.get('questions', 0) > 10:
+            person_lines.append(f"   - Question asker: {qa['questions']} questions")
+
+    # One worder
+    if person in one_worders:
+        ow = one_worders[person]
+        if isinstance(ow, dict) and ow.get('rate', 0) > 20:
+            person_lines.append(f"   - One-word replies: {ow['rate']}% of msgs")
+
+    return person_lines
+
+
+def _information_density(msg: str) -> float:
+    """Score a message by distinct words per token - favours varied, specific text"""
+    words = re.findall(r"[a-z']+", msg.lower())
+    if not words:
+        return 0.0
+    distinct = len(set(w for w in words if len(w) > 2))
+    return distinct / max(estimate_tokens(msg), 1)
+
+
+def _select_sample_messages(msgs: list[str], token_budget: int) -> list[str]:
+    """
+    Pick the densest sample messages that fit in the token budget
+
+    The last pick is truncated to fill the remaining budget if it is too long.
+    """
+    selected = []
+    remaining = token_budget
+
+    for msg in sorted(msgs, key=_information_density, reverse=True)[:8]:
+        line = f"     \"{msg}\""
+        cost = estimate_tokens(line)
+        if cost <= remaining:
+            selected.append(msg)
+            remaining -= cost
+        elif remaining >= 8:
+            # ~4 chars per token, keep room for quotes/indent
+            selected.append(msg[:(remaining - 3) * 4].rstrip() + "...")
+            break
+        else:
+            break
+
+    return selected
+
+
+def build_budgeted_member_stats_context(
     top_chatters: dict,
     signature_words: dict,
     personality_tags: dict,
@@ -89,81 +229,36 @@ def build_member_stats_context(
     question_askers: dict,
     one_worders: dict,
     sample_messages: dict = None,
+    token_budget: int = None,
 ) -> str:
-    """Build context string for each member"""
+    """
+    Build member context within a token budget
+
+    Each member gets a share of the budget proportional to their message
+    count (at least MIN_MEMBER_TOKENS). Stat lines always go in; sample
+    messages fill what is left of the member's share, densest first.
+    """
+    token_budget = token_budget or ROAST_PROMPT_TOKEN_BUDGET
+    total_messages = sum(top_chatters.values()) or 1
     lines = []
 
     for i, (person, msg_count) in enumerate(top_chatters.items(), 1):
-        person_lines = [f"\n{i}. {person}:"]
-        person_lines.append(f"   - Messages: {msg_count} (#{i} in group)")
-
-        # Signature words
-        if person in signature_words and signature_words[person]:
-            words = signature_words[person]
-            if isinstance(words, list):
-                person_lines.append(f"   - Signature words: {', '.join(words[:5])}")
-            elif isinstance(words, str):
-                person_lines.append(f"   - Signature words: {words}")
-
-        # Personality tags
-        if person in personality_tags and personality_tags[person]:
-            tags = [t['tag'] for t in personality_tags[person][:4]]
-            person_lines.append(f"   - Personality: {', '.join(tags)}")
-
-        # Top emojis
-        if person in user_emojis:
-            emoji_data = user_emojis[person]
-            if isinstance(emoji_data, dict) and 'top' in emoji_data:
-                emojis = list(emoji_data['top'].keys())[:3]
-                if emojis:
-                    person_lines.append(f"   - Fav emojis: {' '.join(emojis)}")
-
-        # Night owl / Early bird
-        if person in night_owls and night_owls[person] > 10:
-            person_lines.append(f"   - Night owl: {night_owls[person]} late night msgs")
-        elif person in early_birds and early_birds[person] > 5:
-            person_lines.append(f"   - Early bird: {early_birds[person]} morning msgs")
-
-        # Double texter
-        if person in double_texters and double_texters[person] > 10:
-            person_lines.append(f"   - Double texter: {double_texters[person]} times")
-
-        # Response time
-        if person in response_times:
-            rt = response_times[person]
-            if isinstance(rt, dict) and 'avg_seconds' in rt:
-                avg = rt['avg_seconds']
-                if avg < 60:
-                    person_lines.append(f"   - Replies in: ~{int(avg)}s (instant)")
-                elif avg < 300:
-                    person_lines.append(f"   - Replies in: ~{int(avg/60)}min")
-                else:
-                    person_lines.append(f"   - Replies in: ~{int(avg/60)}min (slow)")
-
-        # Caps user
-        if person in caps_users:
-            caps = caps_users[person]
-            if isinstance(caps, dict) and caps.get('caps_messages', 0) > 5:
-                person_lines.append(f"   - CAPS LOCK USER: {caps['caps_messages']} shouty msgs")
-
-        # Question asker
-        if person in question_askers:
-            qa = question_askers[person]
-            if isinstance(qa, dict) and qa.get('questions', 0) > 10:
-                person_lines.append(f"   - Question asker: {qa['questions']} questions")
-
-        # One worder
-        if person in one_worders:
-            ow = one_worders[person]
-            if isinstance(ow, dict) and ow.get('rate', 0) > 20:
-                person_lines.append(f"   - One-word replies: {ow['rate']}% of msgs")
-
-        # Sample messages (actual things they said)
-        if sample_messages and person in sample_messages:
-            msgs = sample_messages[person]
-            if msgs:
-                person_lines.append(f"   - Sample messages they sent:")
-                for msg in msgs[:8]:
+        member_budget = max(int(token_budget * msg_count / total_messages), MIN_MEMBER_TOKENS)
+
+        person_lines = _member_stat_lines(
+            i, person, msg_count, signature_words, personality_tags, user_emojis,
+            night_owls, early_birds, double_texters, response_times, caps_users,
+            question_askers, one_worders,
+        )
+        remaining = member_budget - estimate_tokens('\n'.join(person_lines))
+
+        header = "   - Sample messages they sent:"
+        msgs = (sample_messages or {}).get(person) or []
+        if msgs and remaining > estimate_tokens(header):
+            selected = _select_sample_messages(msgs, remaining - estimate_tokens(header))
+            if selected:
+                person_lines.append(header)
+                for msg in selected:
                     person_lines.append(f"     \"{msg}\"")
 
         lines.extend(person_lines)
@@ -210,3 +305,51 @@ def build_roast_prompt(
         top_words=top_words_str,
         member_stats=member_stats_context,
     )
+
+
+def build_budgeted_roast_prompt(
+    group_name: str,
+    year: int,
+    total_messages: int,
+    total_participants: int,
+    peak_hour: int,
+    topics: list,
+    top_words: list,
+    member_names: list = None,
+    token_budget: int = None,
+    **member_stats,
+) -> tuple[str, dict]:
+    """
+    Build the full user prompt within a token budget
+
+    The fixed template is measured first and the member context gets
+    whatever is left. `member_stats` takes the
+    build_budgeted_member_stats_context arguments (except token_budget).
+
+    Returns:
+        Tuple of (prompt, size) where size has prompt_tokens, prompt_chars
+        and token_budget
+    """
+    token_budget = token_budget or ROAST_PROMPT_TOKEN_BUDGET
+    prompt_args = dict(
+        group_name=group_name,
+        year=year,
+        total_messages=total_messages,
+        total_participants=total_participants,
+        peak_hour=peak_hour,
+        topics=topics,
+        top_words=top_words,
+        member_names=member_names,
+    )
+
+    frame_tokens = estimate_tokens(build_roast_prompt(member_stats_context="", **prompt_args))
+    member_budget = max(token_budget - frame_tokens, MIN_MEMBER_TOKENS * len(member_stats["top_chatters"]))
+
+    member_stats_context = build_budgeted_member_stats_context(token_budget=member_budget, **member_stats)
+    prompt = build_roast_prompt(member_stats_context=member_stats_context, **prompt_args)
+
+    return prompt, {
+        "prompt_tokens": estimate_tokens(prompt),
+        "prompt_chars": len(prompt),
+        "token_budget": token_budget,
+    }
@@ -0,0 +1,158 @@
+"""
+Content-addressed cache for AI roasts
+
+Roasts are keyed by a hash of the system prompt, the built user prompt and
+the model parameters, so an identical prompt (Celery retry, re-analysis of
+the same export) never pays for a second LLM call.
+"""
+
+import abc
+import hashlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Roasts mention member names - keep them no longer than the job's result
+DEFAULT_TTL_SECONDS = int(os.getenv("ROAST_CACHE_TTL_SECONDS", os.getenv("RESULT_TTL_SECONDS", "3600")))
+
+
+def roast_cache_key(system_prompt: str, user_prompt: str, params: dict) -> str:
+    """Hash everything that determines the LLM output"""
+    payload = json.dumps(
+        {"system": system_prompt, "user": user_prompt, "params": params},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class RoastCache(abc.ABC):
+    """Base class for roast caches - subclasses implement _load/_store"""
+
+    def __init__(self, ttl: int = None, counter=None):
+        """
+        Args:
+            ttl: Seconds a cached roast stays valid
+            counter: Optional callback(name) for exporting hit/miss counts
+        """
+        self.ttl = ttl or DEFAULT_TTL_SECONDS
+        self.hits = 0
+        self.misses = 0
+        self._counter = counter
+
+    def get(self, key: str) -> dict | None:
+        """Get a cached roast (cache errors count as misses)"""
+        try:
+            value = self._load(key)
+        except Exception as e:
+            logger.warning(f"Roast cache read failed: {e}")
+            value = None
+
+        if value is None:
+            self.misses += 1
+            self._count("roast_cache_misses")
+        else:
+            self.hits += 1
+            self._count("roast_cache_hits")
+        return value
+
+    def set(self, key: str, value: dict):
+        """Store a roast (cache errors are logged, never raised)"""
+        try:
+            self._store(key, value)
+        except Exception as e:
+            logger.warning(f"Roast cache write failed: {e}")
+
+    def stats(self) -> dict:
+        """Hit/miss counts for this cache instance"""
+        return {"hits": self.hits, "misses": self.misses}
+
+    def _count(self, name: str):
+        if self._counter:
+            self._counter(name)
+
+    @abc.abstractmethod
+    def _load(self, key: str) -> dict | None:
+        ...
+
+    @abc.abstractmethod
+    def _store(self, key: str, value: dict):
+        ...
+
+
+class RedisRoastCache(RoastCache):
+    """Roast cache stored in Redis with a TTL (used by the backend)"""
+
+    PREFIX = "roast:cache:"
+
+    def __init__(self, client, ttl: int = None, counter=None, index_key: str = None):
+        """
+        Args:
+            index_key: Optional Redis set recording every entry this cache
+                reads or writes, so the job that used them can delete them
+        """
+        super().__init__(ttl=ttl, counter=counter)
+        self.client = client
+        self.index_key = index_key
+
+    def _index(self, key: str):
+        if not self.index_key:
+            return
+        pipe = self.client.pipeline()
+        pipe.sadd(self.index_key, key)
+        pipe.expire(self.index_key, self.ttl)
+        pipe.execute()
+
+    def _load(self, key: str) -> dict | None:
+        if not self.client:
+            return None
+        data = self.client.get(f"{self.PREFIX}{key}")
+        if not data:
+            return None
+        self._index(key)
+        return json.loads(data)
+
+    def _store(self, key: str, value: dict):
+        if not self.client:
+            return
+        self._index(key)
+        self.client.setex(f"{self.PREFIX}{key}", self.ttl, json.dumps(value))
+
+
+class DiskRoastCache(RoastCache):
+    """Roast cache stored as JSON files (used by the CLI --ai-roast path)"""
+
+    def __init__(self, directory: str | Path = None, ttl: int = None, counter=None):
+        super().__init__(ttl=ttl, counter=counter)
+        directory = directory or os.getenv("ROAST_CACHE_DIR")
+        if not directory:
+            directory = Path.home() / ".cache" / "whatsapp-wrapped" / "roasts"
+        self.directory = Path(directory)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def _load(self, key: str) -> dict | None:
+        path = self._path(key)
+        try:
+            age = time.time() - path.stat().st_mtime
+        except FileNotFoundError:
+            return None
+
+        if age > self.ttl:
+            path.unlink(missing_ok=True)
+            return None
+
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def _store(self, key: str, value: dict):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        # Write then rename so concurrent readers never see a partial file
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(value), encoding="utf-8")
+        os.replace(tmp_path, path)
@@ -0,0 +1,282 @@
+# scanner - message headers and participants without pandas
+#
+# line-level matching shared with the parser. the api tier and the upload
+# scan use scan_participants, which reads message headers only and never
+# builds a dataframe, so they don't need the analytics stack.
+
+import re
+from datetime import datetime
+
+from .constants import SYSTEM_PATTERNS, IGNORED_SENDERS
+
+
+# Message line formats for the different WhatsApp exports, compiled once
+# at import (worker warm-up imports this module before the first job)
+MESSAGE_PATTERNS = [
+    # [DD/MM/YY, H:MM:SS AM/PM] Sender: Message (iOS format)
+    re.compile(r'^\[(\d{1,2}/\d{1,2}/\d{2,4}),\s(\d{1,2}:\d{2}(?::\d{2})?\s?[APap][Mm])\]\s([^:]+):\s(.*)$'),
+    # [DD/MM/YY, HH:MM:SS] Sender: Message (24-hour format)
+    re.compile(r'^\[(\d{1,2}/\d{1,2}/\d{2,4}),\s(\d{1,2}:\d{2}(?::\d{2})?)\]\s([^:]+):\s(.*)$'),
+    # DD/MM/YY, H:MM AM/PM - Sender: Message (Android format without brackets)
+    re.compile(r'^(\d{1,2}/\d{1,2}/\d{2,4}),\s(\d{1,2}:\d{2}(?::\d{2})?\s?[APap][Mm])\s[-–]\s([^:]+):\s(.*)$'),
+    # DD/MM/YY, HH:MM - Sender: Message (Android 24-hour without brackets)
+    re.compile(r'^(\d{1,2}/\d{1,2}/\d{2,4}),\s(\d{1,2}:\d{2}(?::\d{2})?)\s[-–]\s([^:]+):\s(.*)$'),
+]
+
+GROUP_RENAME_PATTERN = re.compile(r'changed the group name to [""\u201C](.+?)[""\u201D]')
+GROUP_CREATE_PATTERN = re.compile(r'created group [""\u201C](.+?)[""\u201D]')
+
+# msgs that show up with the group name as "sender"
+GROUP_SYSTEM_PATTERNS = [
+    "You created group",
+    "You changed the group name",
+    "You changed this group",
+    "You changed the subject",
+    "You changed the settings",
+    "Messages and calls are end-to-end encrypted",
+    "Only messages that mention",
+    "added you",
+    "removed you",
+    "left",
+    "joined using this group",
+    "changed the group",
+    "You're now an admin",
+    "can be read by Meta",
+    "allow only admins",
+]
+
+# senders that are never people
+GENERIC_SYSTEM_SENDERS = {'you', 'group', 'admin'}
+
+# college/institution indicators in renamed contacts
+INSTITUTION_INDICATORS = {'ssn', 'cse', 'ece', 'eee', 'mech', 'bme', 'chem', 'civil',
+                          'g1', 'g2', 'g3', 's1', 's2', 's3', 'a1', 'a2', 'b1', 'b2'}
+
+
+def _parse_datetime(date_str, time_str):
+    """Parse date and time strings in various WhatsApp formats"""
+    # Date formats to try
+    date_formats = ['%d/%m/%y', '%m/%d/%y', '%d/%m/%Y', '%m/%d/%Y']
+    # Time formats to try
+    time_formats = ['%I:%M:%S %p', '%I:%M %p', '%H:%M:%S', '%H:%M']
+
+    msg_date = None
+    for fmt in date_formats:
+        try:
+            msg_date = datetime.strptime(date_str, fmt)
+            break
+        except ValueError:
+            continue
+
+    if msg_date is None:
+        return None, None
+
+    msg_time = None
+    for fmt in time_formats:
+        try:
+            msg_time = datetime.strptime(time_str.strip(), fmt)
+            break
+        except ValueError:
+            continue
+
+    if msg_time is None:
+        return None, None
+
+    return msg_date, msg_time
+
+
+def detect_dialect(sample: str, max_lines: int = 200):
+    """
+    Detect which export format a chat uses from a sample of its start
+
+    Returns the index into MESSAGE_PATTERNS matching the most lines, or None
+    """
+    counts = [0] * len(MESSAGE_PATTERNS)
+    for line in sample.split('\n')[:max_lines]:
+        line = line.replace('\u200e', '').strip()
+        for i, pattern in enumerate(MESSAGE_PATTERNS):
+            if pattern.match(line):
+                counts[i] += 1
+                break
+
+    best = max(range(len(counts)), key=counts.__getitem__)
+    return best if counts[best] else None
+
+
+def ordered_patterns(dialect=None):
+    """Message patterns with the detected format first, the others only for odd lines"""
+    if dialect is None:
+        return MESSAGE_PATTERNS
+    return [MESSAGE_PATTERNS[dialect]] + [p for i, p in enumerate(MESSAGE_PATTERNS) if i != dialect]
+
+
+def is_system_message(sender: str, content: str) -> bool:
+    return any(p in content for p in SYSTEM_PATTERNS) or sender.strip() in IGNORED_SENDERS
+
+
+def is_group_system_message(message: str) -> bool:
+    message = message.lower()
+    return any(pattern.lower() in message for pattern in GROUP_SYSTEM_PATTERNS)
+
+
+def similar_contact_mapping(senders):
+    # renamed contacts like "sanjjit s cse g2 ssn" -> "sanjjit s"
+    # returns {old name: canonical name}, senders in order of first message
+    name_mapping = {}
+
+    for i, name1 in enumerate(senders):
+        if name1 in name_mapping:
+            continue
+
+        for name2 in senders[i+1:]:
+            if name2 in name_mapping:
+                continue
+
+            n1_lower = name1.lower().strip()
+            n2_lower = name2.lower().strip()
+
+            # prefix match - common for contact renames
+            if n1_lower.startswith(n2_lower) or n2_lower.startswith(n1_lower):
+                # shorter = canonical
+                if len(name1) <= len(name2):
+                    canonical, old = name1, name2
+                else:
+                    canonical, old = name2, name1
+
+                name_mapping[old] = canonical
+
+            # first name match
+            elif n1_lower.split()[0] == n2_lower.split()[0] and len(n1_lower.split()[0]) > 3:
+                words1 = set(n1_lower.split())
+                words2 = set(n2_lower.split())
+
+                has_inst1 = bool(words1 & INSTITUTION_INDICATORS)
+                has_inst2 = bool(words2 & INSTITUTION_INDICATORS)
+
+                if has_inst1 != has_inst2:
+                    # one without inst suffix = canonical
+                    if has_inst1:
+                        canonical, old = name2, name1
+                    else:
+                        canonical, old = name1, name2
+
+                    canonical_words = set(canonical.lower().split())
+                    old_words = set(old.lower().split())
+
+                    if canonical_words.issubset(old_words):
+                        name_mapping[old] = canonical
+
+    return name_mapping
+
+
+def current_group_name(history):
+    # most recent name from [{'name', 'date'}] (creates first, then renames)
+    if not history:
+        return None
+    return sorted(history, key=lambda x: x['date'])[-1]['name']
+
+
+class _Sender:
+    """What the scan keeps per sender: no message text, just flags and names"""
+
+    __slots__ = ("all_group_system", "has_user_messages", "renames", "creates")
+
+    def __init__(self):
+        self.all_group_system = True
+        self.has_user_messages = False
+        self.renames = []
+        self.creates = []
+
+    def add(self, message: str, is_system: bool, when: datetime):
+        if not is_system:
+            self.has_user_messages = True
+        if not (is_system or is_group_system_message(message)):
+            self.all_group_system = False
+
+        name_match = GROUP_RENAME_PATTERN.search(message)
+        if name_match:
+            self.renames.append({'name': name_match.group(1), 'date': when})
+        create_match = GROUP_CREATE_PATTERN.search(message)
+        if create_match:
+            self.creates.append({'name': create_match.group(1), 'date': when})
+
+    def merge(self, other: "_Sender"):
+        self.all_group_system = self.all_group_system and other.all_group_system
+        self.has_user_messages = self.has_user_messages or other.has_user_messages
+        self.renames += other.renames
+        self.creates += other.creates
+
+
+def scan_participants(lines, dialect=None):
+    """
+    Participants and group name from message headers
+
+    Same answer as parsing the chat and running merge_similar_contacts and
+    detect_group_names, without building a dataframe.
+
+    Returns:
+        Tuple of (sorted participants, group name or None)
+    """
+    patterns = ordered_patterns(dialect)
+    senders = {}  # raw sender -> _Sender, in order of first message
+    current = None  # [sender, message, is_system, datetime] until the next header
+
+    def finish():
+        if current:
+            senders.setdefault(current[0], _Sender()).add(current[1], current[2], current[3])
+
+    for line in lines:
+        line = line.replace('\u200e', '').strip()
+        if not line:
+            continue
+
+        match = None
+        for pattern in patterns:
+            match = pattern.match(line)
+            if match:
+                break
+
+        if match:
+            date_str, time_str, sender, content = match.groups()
+            msg_date, msg_time = _parse_datetime(date_str, time_str)
+            if msg_date is not None and msg_time is not None:
+                finish()
+                sender = sender.strip()
+                when = msg_date.replace(hour=msg_time.hour, minute=msg_time.minute, second=msg_time.second)
+                current = [sender, content, is_system_message(sender, content), when]
+                continue
+
+        # multiline continuation
+        if current:
+            current[1] += "\n" + line
+
+    finish()
+    if not senders:
+        return [], None
+
+    # merge renamed contacts into their canonical name
+    mapping = similar_contact_mapping(list(senders))
+    merged = {}
+    for sender, info in senders.items():
+        name = mapping.get(sender, sender)
+        if name in merged:
+            merged[name].merge(info)
+        else:
+            merged[name] = info
+
+    # senders with only system msgs are the group itself
+    group_names = set()
+    history = []
+    for name, info in merged.items():
+        if info.all_group_system:
+            group_names.add(name)
+            for entry in info.creates:
+                history.insert(0, entry)
+            history += info.renames
+        if name.lower() in GENERIC_SYSTEM_SENDERS:
+            group_names.add(name)
+
+    participants = sorted(
+        name for name, info in merged.items() if name not in group_names and info.has_user_messages
+    )
+    return participants, current_group_name(history)
@@ -4,13 +4,22 @@ Gunicorn configuration
 
 import os
 
+# Workers - gevent holds many idle SSE streams (/api/jobs/<id>/events)
+# cheaply; set GUNICORN_WORKER_CLASS=sync to opt out
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gevent")
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "1000"))
+
+if worker_class == "gevent":
+    # Patch before preload_app imports the app (ssl, redis, boto3), not
+    # after, or the already-imported modules stay blocking
+    from gevent import monkey
+    monkey.patch_all()
+
 # Bind
 bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
 
-# Workers
 workers = int(os.getenv("GUNICORN_WORKERS", "4"))
-worker_class = "sync"
-threads = 2
+threads = 2  # ignored by gevent workers
 
 # Timeout (longer for file uploads)
 timeout = 120
@@ -10,7 +10,7 @@ CREATE TABLE IF NOT EXISTS jobs (
 
     -- Status tracking
     status VARCHAR(20) NOT NULL DEFAULT 'pending'
-        CHECK (status IN ('pending', 'awaiting_selection', 'processing', 'completed', 'failed')),
+        CHECK (status IN ('validating', 'pending', 'awaiting_selection', 'processing', 'completed', 'failed')),
     progress INTEGER DEFAULT 0 CHECK (progress >= 0 AND progress <= 100),
     current_step VARCHAR(100),
 
@@ -22,6 +22,7 @@ CREATE TABLE IF NOT EXISTS jobs (
     original_filename VARCHAR(255),
     file_key VARCHAR(255),
     file_size INTEGER,
+    content_hash VARCHAR(64),  -- sha256 of the upload, for deduplication
 
     -- Processing params
     year_filter INTEGER CHECK (year_filter >= 2009 AND year_filter <= 2030),
@@ -46,11 +47,21 @@ CREATE TABLE IF NOT EXISTS jobs (
     user_agent TEXT
 );
 
+-- Upgrading an existing database to the 'validating' status:
+--   ALTER TABLE jobs DROP CONSTRAINT jobs_status_check;
+--   ALTER TABLE jobs ADD CONSTRAINT jobs_status_check CHECK (status IN
+--       ('validating', 'pending', 'awaiting_selection', 'processing', 'completed', 'failed'));
+-- and to upload deduplication:
+--   ALTER TABLE jobs ADD COLUMN content_hash VARCHAR(64);
+-- and to paged expiry cleanup (the index below; CONCURRENTLY avoids locking a live table):
+--   CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_jobs_status_expires_at ON jobs(status, expires_at);
+
 -- Indexes for common queries
 CREATE INDEX idx_jobs_status ON jobs(status);
 CREATE INDEX idx_jobs_created_at ON jobs(created_at DESC);
 CREATE INDEX idx_jobs_expires_at ON jobs(expires_at)
     WHERE expires_at IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_jobs_status_expires_at ON jobs(status, expires_at);
 
 -- Function to auto-set expires_at on insert
 CREATE OR REPLACE FUNCTION set_job_expiry()
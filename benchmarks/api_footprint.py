@@ -0,0 +1,100 @@
+"""
+API process footprint benchmark
+
+Starts a fresh interpreter the way a gunicorn worker does (create_app and
+every blueprint) and reports cold start time, peak RSS and whether any of
+the analytics stack got imported:
+
+    python benchmarks/api_footprint.py            # check budgets
+    python benchmarks/api_footprint.py --verbose  # also list slowest imports
+
+Celery workers still load the analytics stack (celery_worker imports
+app.tasks.processing); this only covers the API tier. Exits non-zero when
+a budget is exceeded.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+BACKEND = ROOT / "backend"
+
+# Budgets for one API worker
+MAX_COLD_START_MS = 1200
+MAX_RSS_MB = 100
+
+# Modules the API must never import (they belong to the workers)
+API_FORBIDDEN = ("pandas", "numpy", "emoji", "openai", "core.stats", "core.roasts", "app.services.processor")
+
+PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+from app import create_app
+app = create_app()
+elapsed_ms = (time.perf_counter() - start) * 1000
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({"cold_start_ms": elapsed_ms, "rss_kb": rss_kb, "modules": sorted(sys.modules)}))
+"""
+
+
+def probe() -> tuple[dict, dict[str, int]]:
+    """Create the app in a fresh interpreter; returns (stats, {top-level import: cumulative us})"""
+    env = dict(os.environ, PYTHONPATH=str(BACKEND), PYTHONDONTWRITEBYTECODE="1")
+    env.setdefault("FLASK_ENV", "testing")
+
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE],
+        cwd=BACKEND, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"create_app failed:\n{proc.stderr[-2000:]}")
+
+    imports = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not name.startswith("  "):
+            imports[name.strip()] = int(cumulative)
+
+    return json.loads(proc.stdout.strip().splitlines()[-1]), imports
+
+
+def main(argv: list[str]) -> int:
+    verbose = "--verbose" in argv
+
+    start = time.perf_counter()
+    stats, imports = probe()
+    wall_ms = (time.perf_counter() - start) * 1000
+
+    # ru_maxrss is KB on Linux, bytes on macOS
+    rss_mb = stats["rss_kb"] / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    cold_start_ms = stats["cold_start_ms"]
+    ok = cold_start_ms <= MAX_COLD_START_MS and rss_mb <= MAX_RSS_MB
+
+    print(f"create_app {cold_start_ms:7.1f}ms (budget {MAX_COLD_START_MS}ms)  "
+          f"rss {rss_mb:6.1f}MB (budget {MAX_RSS_MB}MB)  "
+          f"process {wall_ms:7.1f}ms  {'ok' if ok else 'OVER BUDGET'}")
+
+    leaked = [
+        name for name in stats["modules"]
+        if any(name == forbidden or name.startswith(f"{forbidden}.") for forbidden in API_FORBIDDEN)
+    ]
+    if leaked:
+        top = sorted({name.split(".")[0] if not name.startswith(("core.", "app.")) else name for name in leaked})
+        print(f"    API imported analytics modules: {', '.join(top)}")
+        ok = False
+
+    if verbose:
+        for name, us in sorted(imports.items(), key=lambda item: -item[1])[:10]:
+            print(f"    {us / 1000:8.1f}ms  {name}")
+
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
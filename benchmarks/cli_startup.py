@@ -0,0 +1,110 @@
+"""
+CLI startup benchmark
+
+Runs the CLI under `python -X importtime` and checks import cost and wall
+time against budgets:
+
+    python benchmarks/cli_startup.py            # check budgets
+    python benchmarks/cli_startup.py --verbose  # also list slowest imports
+
+Exits non-zero when a budget is exceeded.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Budgets: (max cumulative import ms, max wall ms)
+BUDGETS = {
+    "--help": (50, 300),
+    "1k messages": (2500, 6000),
+}
+
+# Modules --help must never import
+HELP_FORBIDDEN = ("pandas", "numpy", "rich", "emoji", "openai", "core")
+
+
+def build_chat(messages: int = 1000, year: int = 2025) -> str:
+    """Synthetic Android-format export"""
+    members = ["Alex", "Sam", "Priya", "Jordan", "Mei"]
+    texts = ["good morning 😂", "anyone up for lunch?", "<Media omitted>", "LMAO no way",
+             "https://example.com", "ok", "that movie was insane 🔥", "why is nobody replying??"]
+    start = datetime(year, 1, 1, 8, 0)
+
+    lines = []
+    for i in range(messages):
+        when = start + timedelta(minutes=i * 97)
+        lines.append(f"{when:%d/%m/%y, %H:%M} - {members[i % 7 % 5]}: {texts[i % len(texts)]}")
+    return "\n".join(lines) + "\n"
+
+
+def run_cli(args: list[str], cwd: str) -> tuple[float, dict[str, int]]:
+    """Run the CLI once; returns (wall ms, {top-level module: cumulative us})"""
+    env = dict(os.environ, PYTHONPATH=str(ROOT), PYTHONDONTWRITEBYTECODE="1")
+
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "cli", *args],
+        cwd=cwd, env=env, capture_output=True, text=True,
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+
+    if proc.returncode != 0:
+        raise RuntimeError(f"cli {' '.join(args)} failed:\n{proc.stderr[-2000:]}")
+
+    # "import time: self [us] | cumulative | imported package" - top level
+    # imports have no leading spaces before the package name
+    imports = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not name.startswith("  "):
+            imports[name.strip()] = int(cumulative)
+    return wall_ms, imports
+
+
+def report(label: str, wall_ms: float, imports: dict[str, int], verbose: bool) -> bool:
+    import_ms = sum(imports.values()) / 1000
+    max_import_ms, max_wall_ms = BUDGETS[label]
+    ok = import_ms <= max_import_ms and wall_ms <= max_wall_ms
+
+    status = "ok" if ok else "OVER BUDGET"
+    print(f"{label:12s} imports {import_ms:7.1f}ms (budget {max_import_ms}ms)  "
+          f"wall {wall_ms:7.1f}ms (budget {max_wall_ms}ms)  {status}")
+
+    if verbose:
+        for name, us in sorted(imports.items(), key=lambda item: -item[1])[:10]:
+            print(f"    {us / 1000:8.1f}ms  {name}")
+    return ok
+
+
+def main(argv: list[str]) -> int:
+    verbose = "--verbose" in argv
+    ok = True
+
+    with tempfile.TemporaryDirectory() as tmp:
+        wall_ms, imports = run_cli(["--help"], tmp)
+        ok &= report("--help", wall_ms, imports, verbose)
+
+        leaked = [name for name in imports if name.split(".")[0] in HELP_FORBIDDEN]
+        if leaked:
+            print(f"    --help imported heavy modules: {', '.join(sorted(leaked))}")
+            ok = False
+
+        chat_path = Path(tmp) / "chat.txt"
+        chat_path.write_text(build_chat(), encoding="utf-8")
+        wall_ms, imports = run_cli([str(chat_path)], tmp)
+        ok &= report("1k messages", wall_ms, imports, verbose)
+
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,109 @@
+"""
+Multipart upload benchmark
+
+Uploads a synthetic export through the multipart API at several part sizes
+and reports time to completion (initiate -> parallel part PUTs -> complete):
+
+    python benchmarks/multipart_upload.py                          # local API
+    python benchmarks/multipart_upload.py --api https://host/api --size-mb 20 --part-sizes 5,8,16
+
+Point it at an API using STORAGE_BACKEND=local for a baseline without
+network to R2. The API also records multipart_upload_ms_part_<n>mb.
+"""
+
+import argparse
+import json
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+
+def build_chat(size_bytes: int, year: int = 2025) -> bytes:
+    """Synthetic Android-format export of about size_bytes"""
+    members = ["Alex", "Sam", "Priya", "Jordan", "Mei"]
+    texts = ["good morning 😂", "anyone up for lunch?", "LMAO no way", "that movie was insane 🔥"]
+    start = datetime(year, 1, 1, 8, 0)
+
+    lines, total, i = [], 0, 0
+    while total < size_bytes:
+        when = start + timedelta(minutes=(i * 7) % (360 * 24 * 60))
+        line = f"{when:%d/%m/%y, %H:%M} - {members[i % 5]}: {texts[i % len(texts)]}\n".encode("utf-8")
+        lines.append(line)
+        total += len(line)
+        i += 1
+    return b"".join(lines)
+
+
+def request_json(method: str, url: str, body: dict | None = None) -> dict:
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    req = urllib.request.Request(url, data=data, method=method, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req) as response:
+        return json.loads(response.read() or b"{}")
+
+
+def put_part(url: str, data: bytes, retries: int = 3) -> str:
+    """PUT one part, retrying on failure; returns its ETag"""
+    for attempt in range(retries):
+        try:
+            req = urllib.request.Request(url, data=data, method="PUT")
+            with urllib.request.urlopen(req) as response:
+                return response.headers["ETag"]
+        except OSError:
+            if attempt == retries - 1:
+                raise
+            time.sleep(0.5 * (attempt + 1))
+
+
+def upload(api: str, data: bytes, part_size_mb: int, parallel: int) -> tuple[float, dict]:
+    """One multipart upload; returns (ms to completion, complete response)"""
+    start = time.perf_counter()
+
+    upload = request_json("POST", f"{api}/upload/multipart", {"size": len(data), "part_size_mb": part_size_mb})
+    part_size = upload["part_size"]
+
+    def send(part):
+        offset = (part["part_number"] - 1) * part_size
+        etag = put_part(part["url"], data[offset:offset + part_size])
+        return {"part_number": part["part_number"], "etag": etag}
+
+    with ThreadPoolExecutor(max_workers=parallel) as pool:
+        parts = list(pool.map(send, upload["parts"]))
+
+    response = request_json("POST", f"{api}/upload/multipart/complete", {
+        "file_key": upload["file_key"],
+        "upload_id": upload["upload_id"],
+        "parts": parts,
+        "filename": "benchmark.txt",
+        "year": "2025",
+    })
+    return (time.perf_counter() - start) * 1000, response
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--api", default="http://127.0.0.1:8000/api")
+    parser.add_argument("--size-mb", type=float, default=9.5)
+    parser.add_argument("--part-sizes", default="5,8,16", help="comma-separated part sizes in MB (min 5)")
+    parser.add_argument("--parallel", type=int, default=4, help="concurrent part uploads")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    data = build_chat(int(args.size_mb * 1024 * 1024))
+    print(f"{len(data) / (1024 * 1024):.1f}MB export, {args.parallel} parallel parts, {args.runs} runs")
+
+    for part_size_mb in (int(size) for size in args.part_sizes.split(",")):
+        times = []
+        for _ in range(args.runs):
+            elapsed_ms, _ = upload(args.api, data, part_size_mb, args.parallel)
+            times.append(elapsed_ms)
+        parts = -(-len(data) // (part_size_mb * 1024 * 1024))
+        print(f"part {part_size_mb:3d}MB ({parts:2d} parts)  "
+              f"min {min(times):8.1f}ms  median {sorted(times)[len(times) // 2]:8.1f}ms")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
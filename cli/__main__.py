@@ -0,0 +1,7 @@
+# python -m cli entry point
+
+import sys
+
+from .main import main
+
+sys.exit(main())
@@ -1,41 +1,51 @@
 # whatsapp wrapped - entry point
+#
+# heavy modules (pandas, rich, core.*, openai) are imported inside the stage
+# that needs them, so --help and bad arguments return instantly
 
 import sys
-import json
 from pathlib import Path
-from rich.console import Console
-from rich.panel import Panel
-from rich.progress import Progress, SpinnerColumn, TextColumn
 
 # Add backend to path for core module
 sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
 
-from core.parser import parse_whatsapp, detect_group_names, merge_similar_contacts
-from core.stats import (
-    get_basic_stats, get_top_chatters, get_hourly_activity, get_daily_activity,
-    get_emoji_stats, get_emoji_stats_by_user, get_media_stats, get_word_stats,
-    get_conversation_starters, get_night_owls, get_early_birds, get_longest_messages,
-    get_busiest_dates, get_response_pairs, get_double_texters, get_conversation_killers,
-    get_response_times, get_streak_stats, get_caps_users, get_question_askers,
-    get_link_sharers, get_one_worders, get_monologuers, get_laugh_stats,
-    get_unique_words_per_person, get_catchphrases, get_interesting_topics, get_group_vibe
-)
-from core.roasts import assign_personality_tags
-from .display import (
-    display_header, display_basic_stats, display_group_vibe, display_top_chatters,
-    display_streak_stats, display_hourly_activity, display_daily_activity,
-    display_response_times, display_emoji_stats, display_media_stats, display_word_stats,
-    display_unique_words, display_catchphrases, display_special_stats,
-    display_double_texters, display_conversation_killers, display_busiest_dates,
-    display_response_pairs, display_personality_tags, display_roasts, display_llm_context,
-    display_ai_roasts
-)
-
-console = Console()
+USAGE = """usage: python -m cli [chat.txt] [options]
+
+generate your whatsapp wrapped from an exported chat
+
+options:
+  --year YEAR     year to wrap (default: 2025)
+  --full          show more detailed output
+  --ai-roast      generate ai-powered roasts (requires OPENAI_API_KEY)
+  --fresh-roast   like --ai-roast but skips the roast cache
+  --llm-context   export context to llm_context.json
+  -h, --help      show this message and exit
+"""
+
+_console = None
+
+
+def get_console():
+    """Shared rich console (rich is only imported on first use)"""
+    global _console
+    if _console is None:
+        from rich.console import Console
+        _console = Console()
+    return _console
 
 
 def prepare_llm_context(df, user_df=None, max_sample_messages=50):
     # condense everything for llm consumption
+    from core.stats import (
+        get_basic_stats, get_top_chatters, get_hourly_activity, get_emoji_stats,
+        get_emoji_stats_by_user, get_media_stats, get_conversation_starters, get_night_owls,
+        get_early_birds, get_longest_messages, get_double_texters, get_conversation_killers,
+        get_response_times, get_caps_users, get_question_askers, get_link_sharers,
+        get_one_worders, get_monologuers, get_laugh_stats, get_unique_words_per_person,
+        get_catchphrases, get_interesting_topics, get_group_vibe
+    )
+    from core.roasts import assign_personality_tags
+
     if user_df is None:
         user_df = df[~df['is_system']]
 
@@ -126,9 +136,13 @@ def prepare_llm_context(df, user_df=None, max_sample_messages=50):
     return context, personality_tags, unique_words, catchphrases, group_vibe
 
 
-def run_wrapped(file_path, show_llm_context=False, year=2025, full=False, ai_roast=False):
+def run_wrapped(file_path, show_llm_context=False, year=2025, full=False, ai_roast=False, fresh_roast=False):
+    console = get_console()
     console.print(f"\n[dim]Loading chat from {file_path}...[/dim]\n")
 
+    # parse stage
+    from core.parser import parse_whatsapp, detect_group_names, merge_similar_contacts
+
     try:
         df = parse_whatsapp(file_path)
     except FileNotFoundError:
@@ -168,6 +182,19 @@ def run_wrapped(file_path, show_llm_context=False, year=2025, full=False, ai_roa
     # pre-filter user messages once - pass to all stats functions
     user_df = df[~df['is_system']].copy()
 
+    # stats stage
+    from rich.progress import Progress, SpinnerColumn, TextColumn
+    from core.stats import (
+        get_basic_stats, get_top_chatters, get_hourly_activity, get_daily_activity,
+        get_emoji_stats, get_emoji_stats_by_user, get_media_stats, get_word_stats,
+        get_conversation_starters, get_night_owls, get_early_birds, get_longest_messages,
+        get_busiest_dates, get_response_pairs, get_double_texters, get_conversation_killers,
+        get_response_times, get_streak_stats, get_caps_users, get_question_askers,
+        get_link_sharers, get_one_worders, get_monologuers, get_laugh_stats,
+        get_unique_words_per_person, get_catchphrases, get_interesting_topics, get_group_vibe
+    )
+    from core.roasts import assign_personality_tags
+
     with Progress(
         SpinnerColumn(),
         TextColumn("[progress.description]{task.description}"),
@@ -231,6 +258,18 @@ def run_wrapped(file_path, show_llm_context=False, year=2025, full=False, ai_roa
 
     console.print()
 
+    # display stage
+    from rich.panel import Panel
+    from .display import (
+        display_header, display_basic_stats, display_group_vibe, display_top_chatters,
+        display_streak_stats, display_hourly_activity, display_daily_activity,
+        display_response_times, display_emoji_stats, display_media_stats, display_word_stats,
+        display_unique_words, display_catchphrases, display_special_stats,
+        display_double_texters, display_conversation_killers, display_busiest_dates,
+        display_response_pairs, display_personality_tags, display_roasts, display_llm_context,
+        display_ai_roasts
+    )
+
     # display everything
     display_header(basic_stats, current_group_name, year)
     display_basic_stats(basic_stats)
@@ -265,6 +304,7 @@ def run_wrapped(file_path, show_llm_context=False, year=2025, full=False, ai_roa
 
             try:
                 from core.ai import generate_roasts
+                from core.roast_cache import DiskRoastCache
 
                 # get topics and sample messages for AI context
                 topics = get_interesting_topics(df, user_df)[:15]
@@ -275,12 +315,15 @@ def run_wrapped(file_path, show_llm_context=False, year=2025, full=False, ai_roa
                 for sender in list(top_chatters.keys())[:10]:
                     sender_msgs = text_df[text_df['sender'] == sender]
                     if not sender_msgs.empty:
-                        sampled = sender_msgs.sample(n=min(5, len(sender_msgs)))
+                        # fixed seed so reruns build the same prompt (roast cache hit)
+                        sampled = sender_msgs.sample(n=min(5, len(sender_msgs)), random_state=0)
                         sample_messages[sender] = sampled['message'].tolist()
 
                 # peak hour
                 peak_hour = max(hourly, key=hourly.get) if hourly else 12
 
+                roast_cache = DiskRoastCache()
+
                 ai_roast_result = generate_roasts(
                     group_name=current_group_name or "Group Chat",
                     year=year,
@@ -301,9 +344,13 @@ def run_wrapped(file_path, show_llm_context=False, year=2025, full=False, ai_roa
                     question_askers=stats_cache['question_askers'],
                     one_worders=stats_cache['one_worders'],
                     sample_messages=sample_messages,
+                    cache=roast_cache,
+                    fresh=fresh_roast,
                 )
 
                 display_ai_roasts(ai_roast_result)
+                if roast_cache.hits:
+                    console.print("[dim]Roasts served from cache (use --fresh-roast for new ones)[/dim]\n")
 
             except ImportError:
                 console.print("[red]Error: AI roasts require the backend app module[/red]")
@@ -318,6 +365,7 @@ def run_wrapped(file_path, show_llm_context=False, year=2025, full=False, ai_roa
         llm_context, _, _, _, _ = prepare_llm_context(df, user_df)
         display_llm_context(llm_context)
 
+        import json
         with open("llm_context.json", "w") as f:
             json.dump(llm_context, f, indent=2, default=str)
         console.print("[dim]LLM context saved to llm_context.json[/dim]\n")
@@ -330,25 +378,48 @@ def run_wrapped(file_path, show_llm_context=False, year=2025, full=False, ai_roa
     ))
 
 
-if __name__ == "__main__":
-    file_path = "chat.txt"
-    show_llm = False
-    full_output = False
-    use_ai_roast = False
-    target_year = 2025  # default to current wrapped year
-
-    for i, arg in enumerate(sys.argv[1:]):
-        if arg == "--llm-context":
-            show_llm = True
+def parse_args(argv):
+    """Parse cli arguments into run_wrapped kwargs (None means --help)"""
+    options = {
+        "file_path": "chat.txt",
+        "show_llm_context": False,
+        "year": 2025,  # default to current wrapped year
+        "full": False,
+        "ai_roast": False,
+        "fresh_roast": False,
+    }
+
+    for i, arg in enumerate(argv):
+        if arg in ("-h", "--help"):
+            return None
+        elif arg == "--llm-context":
+            options["show_llm_context"] = True
         elif arg == "--full":
-            full_output = True
+            options["full"] = True
         elif arg == "--ai-roast":
-            use_ai_roast = True
-        elif arg == "--year" and i + 2 < len(sys.argv):
-            target_year = int(sys.argv[i + 2])
-        elif arg.isdigit() and sys.argv[i] == "--year":
+            options["ai_roast"] = True
+        elif arg == "--fresh-roast":
+            options["ai_roast"] = True
+            options["fresh_roast"] = True
+        elif arg == "--year" and i + 1 < len(argv):
+            options["year"] = int(argv[i + 1])
+        elif arg.isdigit() and i > 0 and argv[i - 1] == "--year":
             pass  # already handled
         elif not arg.startswith("-"):
-            file_path = arg
+            options["file_path"] = arg
+
+    return options
+
 
-    run_wrapped(file_path, show_llm_context=show_llm, year=target_year, full=full_output, ai_roast=use_ai_roast)
+def main(argv=None):
+    options = parse_args(sys.argv[1:] if argv is None else argv)
+    if options is None:
+        print(USAGE, end="")
+        return 0
+
+    run_wrapped(**options)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
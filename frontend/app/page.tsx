@@ -8,22 +8,116 @@ import { hasValidCache } from "./lib/cache";
 
 const API_BASE = process.env.NEXT_PUBLIC_API_BASE_URL || "http://127.0.0.1:8000/api";
 
+const SCAN_POLL_MS = 500;
+const SCAN_TIMEOUT_MS = 60_000;
+
+// Bigger files go up in parts: parallel, and a dropped part is retried alone
+const MULTIPART_THRESHOLD = 8 * 1024 * 1024;
+const PART_CONCURRENCY = 3;
+const PART_RETRIES = 3;
+
+// Plain exports, WhatsApp's zip (with or without media) and gzipped text
+const UPLOAD_EXTENSIONS = [".txt", ".zip", ".gz"];
+
+interface MultipartResponse {
+  file_key: string;
+  upload_id: string;
+  part_size: number;
+  parts: { part_number: number; url: string }[];
+}
+
 interface PresignResponse {
   upload_url: string;
   file_key: string;
+  content_type: string;
   max_size_mb: number;
   expires_in: number;
 }
 
+async function putPart(url: string, body: Blob): Promise<string> {
+  for (let attempt = 1; ; attempt++) {
+    try {
+      const res = await fetch(url, { method: "PUT", body });
+      const etag = res.headers.get("ETag");
+      if (res.ok && etag) return etag;
+      throw new Error(`Part upload failed: ${res.statusText}`);
+    } catch (e) {
+      if (attempt >= PART_RETRIES) throw e;
+      await new Promise((resolve) => setTimeout(resolve, 1000 * attempt));
+    }
+  }
+}
+
+async function uploadMultipart(
+  file: File,
+  year: string,
+  onProgress?: (stage: string) => void
+): Promise<ActionResult<UploadResponse>> {
+  const startRes = await fetch(`${API_BASE}/upload/multipart`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ size: file.size, filename: file.name }),
+  });
+  if (!startRes.ok) {
+    const errorData = await startRes.json().catch(() => ({}));
+    return { success: false, error: errorData.error || "Failed to start upload" };
+  }
+
+  const upload: MultipartResponse = await startRes.json();
+  const uploadRef = { file_key: upload.file_key, upload_id: upload.upload_id };
+  const etags: { part_number: number; etag: string }[] = [];
+  const queue = [...upload.parts];
+
+  try {
+    const worker = async () => {
+      for (let part = queue.shift(); part; part = queue.shift()) {
+        const offset = (part.part_number - 1) * upload.part_size;
+        const etag = await putPart(part.url, file.slice(offset, offset + upload.part_size));
+        etags.push({ part_number: part.part_number, etag });
+        onProgress?.(`Uploading file... ${etags.length}/${upload.parts.length}`);
+      }
+    };
+    await Promise.all(Array.from({ length: PART_CONCURRENCY }, worker));
+  } catch (e) {
+    await fetch(`${API_BASE}/upload/multipart/abort`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify(uploadRef),
+    }).catch(() => {});
+    throw e;
+  }
+
+  onProgress?.("Processing...");
+  const completeRes = await fetch(`${API_BASE}/upload/multipart/complete`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ ...uploadRef, parts: etags, filename: file.name, year }),
+  });
+  if (!completeRes.ok) {
+    const errorData = await completeRes.json().catch(() => ({}));
+    return { success: false, error: errorData.error || "Failed to process upload" };
+  }
+
+  const { job_id } = await completeRes.json();
+  return await waitForScan(job_id);
+}
+
 async function uploadChat(
   file: File,
   year: string,
   onProgress?: (stage: string) => void
 ): Promise<ActionResult<UploadResponse>> {
   try {
+    if (file.size > MULTIPART_THRESHOLD) {
+      onProgress?.("Uploading file...");
+      return await uploadMultipart(file, year, onProgress);
+    }
+
     // Step 1: Get presigned URL
     onProgress?.("Getting upload URL...");
-    const presignRes = await fetch(`${API_BASE}/upload/presign`);
+    const presignRes = await fetch(
+      `${API_BASE}/upload/presign?filename=${encodeURIComponent(file.name)}`
+    );
 
     if (!presignRes.ok) {
       const errorData = await presignRes.json().catch(() => ({}));
@@ -38,7 +132,7 @@ async function uploadChat(
       method: "PUT",
       body: file,
       headers: {
-        "Content-Type": "text/plain",
+        "Content-Type": presignData.content_type,
       },
     });
 
@@ -65,13 +159,37 @@ async function uploadChat(
       return { success: false, error: errorData.error || "Failed to process upload" };
     }
 
-    const data = await confirmRes.json();
-    return { success: true, data };
+    // Step 4: Wait for the backend to scan the file
+    const { job_id } = await confirmRes.json();
+    return await waitForScan(job_id);
   } catch (e) {
     return { success: false, error: e instanceof Error ? e.message : "Upload failed" };
   }
 }
 
+async function waitForScan(jobId: string): Promise<ActionResult<UploadResponse>> {
+  const deadline = Date.now() + SCAN_TIMEOUT_MS;
+
+  while (Date.now() < deadline) {
+    const statusRes = await fetch(`${API_BASE}/jobs/${jobId}`);
+    if (!statusRes.ok) {
+      return { success: false, error: "Failed to process upload" };
+    }
+
+    const status = await statusRes.json();
+    if (status.status === "awaiting_selection") {
+      return { success: true, data: status };
+    }
+    if (status.status === "failed") {
+      return { success: false, error: status.error || "Failed to process upload" };
+    }
+
+    await new Promise((resolve) => setTimeout(resolve, SCAN_POLL_MS));
+  }
+
+  return { success: false, error: "Processing the file took too long. Please try again." };
+}
+
 export default function Home() {
   const router = useRouter();
   const [fileName, setFileName] = useState<string | null>(null);
@@ -108,8 +226,9 @@ export default function Home() {
         setError("File size exceeds 20MB limit");
         return;
       }
-      if (!selectedFile.name.endsWith(".txt")) {
-        setError("Only .txt files are allowed");
+      const name = selectedFile.name.toLowerCase();
+      if (!UPLOAD_EXTENSIONS.some((ext) => name.endsWith(ext))) {
+        setError("Only .txt, .zip or .gz files are allowed");
         return;
       }
       setFileName(selectedFile.name);
@@ -196,7 +315,7 @@ export default function Home() {
             >
               <input
                 type="file"
-                accept=".txt"
+                accept={UPLOAD_EXTENSIONS.join(",")}
                 onChange={handleFileUpload}
                 className="hidden"
                 disabled={isUploading}
@@ -244,7 +363,7 @@ export default function Home() {
                     <p className="text-zinc-200 font-medium text-sm">
                       Upload chat export
                     </p>
-                    <p className="text-zinc-500 text-xs">.txt file only (max 20MB)</p>
+                    <p className="text-zinc-500 text-xs">.txt or .zip export (max 20MB)</p>
                   </div>
                 </div>
               )}
@@ -326,7 +445,7 @@ export default function Home() {
                   <span className="flex-shrink-0 w-5 h-5 rounded-full bg-[#25D366]/20 text-[#25D366] flex items-center justify-center text-[10px] font-bold">
                     5
                   </span>
-                  <span>Save the .txt file and upload above</span>
+                  <span>Upload the .zip (or the .txt inside it) above</span>
                 </li>
               </ol>
             </div>
@@ -91,7 +91,8 @@ export default function SelectPage() {
       try {
         const response = await startAnalysis(jobId, selectedMembers);
 
-        if (response.status === "pending") {
+        // "completed" when an identical upload was already analyzed
+        if (response.status === "pending" || response.status === "completed") {
           setIsAnalyzing(true);
           setProgress(0);
           setCurrentStep("Starting analysis...");
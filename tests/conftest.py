@@ -0,0 +1,62 @@
+"""
+Shared fixtures
+
+Tests run against the testing config (SQLite in memory) with Redis replaced
+by fakeredis and storage by a temporary directory, so they need no services.
+"""
+
+import os
+
+os.environ["FLASK_ENV"] = "testing"
+os.environ["OPENAI_API_KEY"] = ""
+
+import fakeredis
+import pytest
+from app import create_app
+from app.extensions import db
+from app.services.storage import LocalBackend, storage as storage_service
+
+# Modules that bind the Redis clients at import time
+REDIS_MODULES = (
+    "app.extensions",
+    "app.services.cache",
+    "app.services.checkpoints",
+    "app.services.job_state",
+    "app.services.metrics",
+    "app.tasks.processing",
+)
+
+
+@pytest.fixture
+def app():
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    """Fresh fakeredis clients (text and binary, one server) patched in everywhere"""
+    import importlib
+
+    server = fakeredis.FakeServer()
+    client = fakeredis.FakeRedis(server=server, decode_responses=True)
+    binary_client = fakeredis.FakeRedis(server=server)
+
+    for name in REDIS_MODULES:
+        module = importlib.import_module(name)
+        if hasattr(module, "redis_client"):
+            monkeypatch.setattr(module, "redis_client", client)
+        if hasattr(module, "redis_binary_client"):
+            monkeypatch.setattr(module, "redis_binary_client", binary_client)
+    return client
+
+
+@pytest.fixture
+def storage(app, tmp_path, monkeypatch):
+    """Local storage backend in a temporary directory"""
+    monkeypatch.setattr(storage_service, "_backend", LocalBackend(str(tmp_path), app.config["SECRET_KEY"]))
+    return storage_service
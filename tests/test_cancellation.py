@@ -0,0 +1,107 @@
+"""
+Deleting a job while it's scanned or processed: its tasks stop and clean up
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+import app.tasks.processing as processing
+import core.ai as ai
+from app.extensions import db
+from app.models import Job
+from app.services.cache import cache
+from app.services.checkpoints import JobCheckpoints
+from app.services.job_state import job_state
+
+CHAT = "\n".join(
+    f"{day:02d}/01/25, 10:{minute:02d} - {sender}: message {day}-{minute}"
+    for day in range(1, 29)
+    for minute, sender in enumerate(["Alex", "Sam", "Priya"])
+).encode("utf-8")
+
+
+def make_job(storage, status: str) -> Job:
+    storage.upload_bytes(CHAT, "uploads/chat.txt")
+    job = Job(status=status, file_key="uploads/chat.txt", file_size=len(CHAT), year_filter=2025)
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def test_job_deleted_mid_scan_stays_deleted(client, redis, storage, monkeypatch):
+    job = make_job(storage, Job.STATUS_VALIDATING)
+    job_id = str(job.id)
+    scan = processing.scan_participants
+
+    def delete_then_scan(*args):
+        assert client.delete(f"/api/jobs/{job_id}").status_code == 200
+        return scan(*args)
+
+    monkeypatch.setattr(processing, "scan_participants", delete_then_scan)
+    processing.scan_upload_task.apply(args=(job_id,))
+
+    db.session.expire_all()
+    assert job_state.load(job_id) is None
+    assert job_state.pending_count() == 0
+    assert cache.get_job_status(job_id) is None
+
+
+def test_cancelled_stage_clears_what_the_job_left(redis, storage, monkeypatch):
+    job = make_job(storage, Job.STATUS_PENDING)
+    job_id = str(job.id)
+    JobCheckpoints(job_id).save("stats:overview", {"total_messages": 84})
+    download = processing._download_and_validate
+
+    def cancel_then_download(job):
+        cache.set_job_cancelled(job_id)
+        return download(job)
+
+    monkeypatch.setattr(processing, "_download_and_validate", cancel_then_download)
+    result = processing.parse_chat_task.apply(args=(job_id,)).get()
+
+    assert result["stage"] == "cancelled"
+    assert JobCheckpoints(job_id).state() == {}
+    assert job_state.pending_count() == 0
+    assert cache.get_job_status(job_id) is None
+
+
+def test_stages_of_a_cancelled_job_do_not_run(redis, storage):
+    job = make_job(storage, Job.STATUS_PROCESSING)
+    cache.set_job_cancelled(str(job.id))
+
+    result = processing.compute_stat_group_task.apply(args=(str(job.id), "overview")).get()
+
+    assert result["skipped"] and result["stage"] == "cancelled"
+    assert JobCheckpoints(str(job.id)).state() == {}
+
+
+async def never_answers(*args, **kwargs):
+    await asyncio.sleep(60)
+
+
+def test_await_deadline_stops_once_cancelled():
+    start = time.monotonic()
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(ai._await_deadline(never_answers(), timeout=30, cancelled=lambda: True))
+    assert time.monotonic() - start < ai.CANCEL_POLL_SECONDS
+
+
+def test_cancelled_roast_request_returns_the_fallback(monkeypatch):
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=never_answers)))
+    monkeypatch.setattr(ai, "get_async_openai_client", lambda: client)
+    monkeypatch.setattr(ai, "_build_user_prompt", lambda **kwargs: "prompt")
+    polls = []
+
+    def cancelled():
+        # the job is deleted while the request is in flight
+        polls.append(1)
+        return len(polls) > 1
+
+    start = time.monotonic()
+    roasts = asyncio.run(ai.generate_roasts_async(timeout=30, cancelled=cancelled, top_chatters={"Alex": 2}))
+
+    assert roasts == ai.fallback_roasts({"Alex": 2})
+    assert time.monotonic() - start < 3 * ai.CANCEL_POLL_SECONDS
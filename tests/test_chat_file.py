@@ -0,0 +1,120 @@
+"""
+Reading chat exports out of .txt, .zip and .gz uploads
+"""
+
+import gzip
+import hashlib
+import io
+import os
+import zipfile
+
+import pytest
+from app.services.chat_file import (
+    ARCHIVE_ERRORS, FORMAT_GZIP, FORMAT_TEXT, FORMAT_ZIP, READ_SIZE, ChatFile, ChatFileError,
+)
+
+CHAT = "\n".join(
+    f"{day:02d}/01/25, 10:{minute:02d} - {sender}: message {day}-{minute} 😂"
+    for day in range(1, 29)
+    for minute, sender in enumerate(["Alex", "Sam", "Priya"])
+).encode("utf-8")
+
+MAX_TEXT_BYTES = 1024 * 1024
+
+
+class MemoryStorage:
+    """The slice of StorageService that ChatFile reads through"""
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+    def open_stream(self, key: str, start: int = 0):
+        return io.BytesIO(self.data[start:])
+
+
+def open_chat(data: bytes, max_text_bytes: int = MAX_TEXT_BYTES) -> ChatFile:
+    return ChatFile(MemoryStorage(data), "uploads/chat", len(data), max_text_bytes)
+
+
+def read_all(chat: ChatFile) -> list[str]:
+    return list(chat.lines(chat.read_text()))
+
+
+def make_zip(members: dict[str, bytes]) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, data in members.items():
+            # media is already compressed, so WhatsApp stores it as is
+            compression = zipfile.ZIP_DEFLATED if name.endswith(".txt") else zipfile.ZIP_STORED
+            archive.writestr(name, data, compress_type=compression)
+    return buffer.getvalue()
+
+
+def test_plain_text():
+    with open_chat(CHAT) as chat:
+        assert chat.format == FORMAT_TEXT
+        assert read_all(chat) == CHAT.decode("utf-8").split("\n")
+        assert chat.sha256.hexdigest() == hashlib.sha256(CHAT).hexdigest()
+
+
+def test_ios_zip_reads_chat_without_downloading_media():
+    data = make_zip({"_chat.txt": CHAT, "VID-0001.mp4": os.urandom(4 * 1024 * 1024)})
+
+    with open_chat(data) as chat:
+        assert chat.format == FORMAT_ZIP
+        assert read_all(chat) == CHAT.decode("utf-8").split("\n")
+        assert chat.sha256.hexdigest() == hashlib.sha256(CHAT).hexdigest()
+        # the chat's few kb plus the central directory, in READ_SIZE chunks
+        assert chat.bytes_read <= 4 * READ_SIZE
+
+
+def test_android_zip_uses_its_only_text_file():
+    data = make_zip({"WhatsApp Chat with Friends/WhatsApp Chat with Friends.txt": CHAT})
+
+    with open_chat(data) as chat:
+        assert read_all(chat) == CHAT.decode("utf-8").split("\n")
+
+
+def test_zip_without_chat_is_rejected():
+    with pytest.raises(ChatFileError, match="No chat found"):
+        open_chat(make_zip({"IMG-0001.jpg": b"\xff\xd8"}))
+
+
+def test_gzip():
+    with open_chat(gzip.compress(CHAT)) as chat:
+        assert chat.format == FORMAT_GZIP
+        assert read_all(chat) == CHAT.decode("utf-8").split("\n")
+
+
+def test_characters_split_across_reads_decode_intact():
+    with open_chat(gzip.compress(CHAT)) as chat:
+        text = "".join(iter(lambda: chat.read_text(7), ""))
+
+    assert text == CHAT.decode("utf-8")
+
+
+def test_oversized_zip_member_is_rejected_before_reading():
+    data = make_zip({"_chat.txt": CHAT})
+
+    with pytest.raises(ChatFileError, match="too large"):
+        open_chat(data, max_text_bytes=len(CHAT) - 1)
+
+
+def test_gzip_bomb_stops_at_the_cap():
+    bomb = gzip.compress(b"a" * (4 * MAX_TEXT_BYTES))
+
+    with open_chat(bomb) as chat, pytest.raises(ChatFileError, match="too large"):
+        read_all(chat)
+    assert chat.text_bytes <= MAX_TEXT_BYTES + READ_SIZE
+
+
+def test_oversized_text_is_rejected():
+    with open_chat(CHAT, max_text_bytes=1024) as chat, pytest.raises(ChatFileError, match="too large"):
+        read_all(chat)
+
+
+def test_truncated_gzip_raises_an_archive_error():
+    data = gzip.compress(CHAT)
+
+    with open_chat(data[:len(data) // 2]) as chat, pytest.raises(ARCHIVE_ERRORS):
+        read_all(chat)
@@ -0,0 +1,71 @@
+"""
+Stage checkpoints: signed blobs, and resuming when one can't be read
+"""
+
+import pytest
+import app.tasks.processing as processing
+from app.extensions import db
+from app.models import Job
+from app.services.cache import cache
+from app.services.checkpoints import JobCheckpoints
+from app.services.job_state import job_state
+
+CHAT = "\n".join(
+    f"{day:02d}/{month:02d}/25, {hour:02d}:{minute:02d} - {sender}: message {day}-{minute} 😂"
+    for month in (1, 2, 3)
+    for day in range(1, 29)
+    for hour, minute, sender in [(9, 5, "Alex"), (9, 7, "Sam"), (21, 30, "Priya"), (23, 45, "Alex")]
+).encode("utf-8")
+
+
+@pytest.fixture
+def job(app, redis, storage):
+    storage.upload_bytes(CHAT, "uploads/chat.txt")
+    job = Job(status=Job.STATUS_PENDING, file_key="uploads/chat.txt", file_size=len(CHAT), year_filter=2025)
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def test_round_trip(job):
+    checkpoints = JobCheckpoints(job.id)
+    checkpoints.save("stats:overview", {("Alex", "Sam"): 3})
+
+    assert checkpoints.load("stats:overview") == {("Alex", "Sam"): 3}
+
+
+def test_tampered_blob_is_dropped(job, storage):
+    checkpoints = JobCheckpoints(job.id)
+    checkpoints.save("stats:overview", {"total": 3})
+    key = checkpoints._storage_key("stats:overview")
+    blob = storage.download_file(key)
+    storage.upload_bytes(blob[:-1] + bytes([blob[-1] ^ 1]), key)
+
+    assert checkpoints.load("stats:overview") is None
+    assert not checkpoints.has("stats:overview")
+
+
+def test_blob_signed_for_another_stage_is_rejected(job, storage):
+    checkpoints = JobCheckpoints(job.id)
+    checkpoints.save("stats:overview", {"total": 3})
+    checkpoints.save("stats:activity", {"total": 4})
+    storage.upload_bytes(
+        storage.download_file(checkpoints._storage_key("stats:overview")),
+        checkpoints._storage_key("stats:activity"),
+    )
+
+    assert checkpoints.load("stats:activity") is None
+
+
+def test_job_completes_when_parse_checkpoint_was_signed_with_another_key(app, job):
+    # a previous attempt parsed the chat on a worker with a different SECRET_KEY
+    secret = app.config["SECRET_KEY"]
+    app.config["SECRET_KEY"] = "another worker's key"
+    JobCheckpoints(job.id).save("parse", {"df": None, "group_name": None, "total_before": 0})
+    app.config["SECRET_KEY"] = secret
+
+    job_state.claim_run(job)
+    result = processing.process_chat_task.apply(args=(str(job.id),), retries=2).get()
+
+    assert result == {"status": "completed", "job_id": str(job.id)}
+    assert cache.get_job_result(str(job.id))["basic_stats"]["total_messages"] == CHAT.count(b"\n") + 1
@@ -0,0 +1,103 @@
+"""
+Reusing a finished job's result for an identical upload (POST /api/analyze)
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import app.routes.upload as upload_routes
+from app.extensions import db
+from app.models import Job
+from app.services.cache import cache
+from app.tasks.dispatch import find_duplicate_job
+
+RESULT = {"basic_stats": {"total_messages": 3}, "top_chatters": {"Alex": 2, "Sam": 1}}
+PARTICIPANTS = ["Alex", "Priya", "Sam"]
+
+
+def make_job(**fields) -> Job:
+    job = Job(content_hash="a" * 64, year_filter=2025, participants=PARTICIPANTS, **fields)
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+@pytest.fixture
+def source(app, redis, storage):
+    """A completed analysis of the chat for Alex and Sam"""
+    job = make_job(
+        status=Job.STATUS_COMPLETED,
+        selected_members=["Alex", "Sam"],
+        result_key=storage.upload_json(RESULT),
+        message_count=3,
+        expires_at=datetime.now(timezone.utc) + timedelta(hours=1),
+    )
+    cache.set_job_result(str(job.id), RESULT)
+    cache.set_dedup_source(job.dedup_key(), str(job.id), 3600)
+    return job
+
+
+@pytest.fixture
+def queued(monkeypatch):
+    """Jobs handed to the workers (instead of queueing them)"""
+    started = []
+    monkeypatch.setattr(upload_routes, "start_processing", lambda job_id, **kwargs: started.append(job_id))
+    return started
+
+
+def analyze(client, job: Job, members: list[str], **options):
+    return client.post("/api/analyze", json={"job_id": str(job.id), "selected_members": members, **options})
+
+
+def test_dedup_key_ignores_member_order_and_whitespace(app):
+    key = Job(content_hash="a" * 64, year_filter=2025, selected_members=["Alex", "Sam"]).dedup_key()
+
+    assert Job(content_hash="a" * 64, year_filter=2025, selected_members=[" Sam", "Alex "]).dedup_key() == key
+    assert Job(content_hash="a" * 64, year_filter=2024, selected_members=["Alex", "Sam"]).dedup_key() != key
+    assert Job(content_hash="a" * 64, year_filter=2025, selected_members=["Alex"]).dedup_key() != key
+    assert Job(year_filter=2025, selected_members=["Alex", "Sam"]).dedup_key() is None
+
+
+def test_identical_upload_reuses_the_result(client, source, queued):
+    job = make_job(status=Job.STATUS_AWAITING_SELECTION)
+
+    response = analyze(client, job, ["Sam", "Alex"])
+
+    assert response.status_code == 200
+    assert response.get_json()["status"] == Job.STATUS_COMPLETED
+    assert queued == []
+    assert cache.get_job_result(str(job.id)) == RESULT
+    # the copy is the job's own, so deleting the source can't take it away
+    assert job.result_key and job.result_key != source.result_key
+
+
+def test_other_members_are_analyzed(client, source, queued):
+    job = make_job(status=Job.STATUS_AWAITING_SELECTION)
+
+    assert analyze(client, job, ["Alex", "Priya"]).status_code == 202
+    assert queued == [str(job.id)]
+
+
+def test_fresh_roast_skips_dedup(client, source, queued):
+    job = make_job(status=Job.STATUS_AWAITING_SELECTION)
+
+    assert analyze(client, job, ["Alex", "Sam"], fresh_roast=True).status_code == 202
+    assert queued == [str(job.id)]
+
+
+def test_deleted_source_is_not_reused(client, source, queued):
+    dedup_key = source.dedup_key()
+    assert client.delete(f"/api/jobs/{source.id}").status_code == 200
+    assert cache.get_dedup_source(dedup_key) is None
+
+    job = make_job(status=Job.STATUS_AWAITING_SELECTION)
+    assert analyze(client, job, ["Alex", "Sam"]).status_code == 202
+    assert queued == [str(job.id)]
+
+
+def test_expired_source_is_not_reused(source):
+    source.expires_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+    db.session.commit()
+
+    job = make_job(status=Job.STATUS_PENDING, selected_members=["Alex", "Sam"])
+    assert find_duplicate_job(job) is None
@@ -0,0 +1,47 @@
+"""
+Queueing jobs: pipeline per lane
+"""
+
+import pytest
+import app.tasks.dispatch as dispatch
+from app.tasks.dispatch import LARGE_QUEUE, SMALL_QUEUE
+
+
+@pytest.fixture
+def queued(monkeypatch):
+    """What start_processing sent, instead of sending it"""
+    sent = []
+
+    class Signature:
+        def __init__(self, name, options):
+            self.name, self.options = name, options
+
+        def apply_async(self):
+            sent.append((self.name, self.options["queue"]))
+
+    monkeypatch.setattr(dispatch, "task_signature", lambda name, *a, options=None, **k: Signature(name, options))
+    monkeypatch.setattr(dispatch, "start_chat_pipeline",
+                        lambda job_id, queue, **k: sent.append(("canvas", queue)))
+    return sent
+
+
+def test_small_jobs_run_as_one_task(app, queued):
+    dispatch.start_processing("job-1", queue=SMALL_QUEUE)
+
+    assert queued == [("process_chat_task", SMALL_QUEUE)]
+
+
+def test_large_jobs_run_as_a_canvas(app, queued):
+    dispatch.start_processing("job-1", queue=LARGE_QUEUE)
+
+    assert queued == [("canvas", LARGE_QUEUE)]
+
+
+def test_pipeline_is_configured_per_lane(app, queued, monkeypatch):
+    monkeypatch.setitem(app.config["QUEUE_PIPELINES"], SMALL_QUEUE, "canvas")
+    monkeypatch.setitem(app.config["QUEUE_PIPELINES"], LARGE_QUEUE, "single")
+
+    dispatch.start_processing("job-1", queue=SMALL_QUEUE)
+    dispatch.start_processing("job-2", queue=LARGE_QUEUE)
+
+    assert queued == [("canvas", SMALL_QUEUE), ("process_chat_task", LARGE_QUEUE)]
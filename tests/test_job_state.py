@@ -0,0 +1,172 @@
+"""
+Write-behind job state: queued transitions, flushing and requeueing, run
+claims and stage locks
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import select
+import app.services.job_state as job_state_module
+from app.extensions import db
+from app.models import Job
+from app.services.job_state import job_state
+
+
+@pytest.fixture
+def job(app, redis):
+    job = Job(status=Job.STATUS_PROCESSING, progress=10)
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def stored(job: Job, column: str):
+    """A column as Postgres has it (bypasses the session's copy of the job)"""
+    return db.session.execute(select(getattr(Job, column)).where(Job.id == job.id)).scalar_one()
+
+
+def test_update_queues_changes_without_writing_them(job, redis):
+    job_state.update(job, status=Job.STATUS_COMPLETED, progress=100)
+
+    assert job.status == Job.STATUS_COMPLETED
+    assert stored(job, "status") == Job.STATUS_PROCESSING
+    assert job_state.pending_count() == 1
+
+    db.session.expire_all()
+    loaded = job_state.load(str(job.id))
+    assert (loaded.status, loaded.progress) == (Job.STATUS_COMPLETED, 100)
+
+
+def test_queued_changes_do_not_expire(job, redis):
+    job_state.update(job, status=Job.STATUS_COMPLETED)
+
+    # only flush or delete_pending may drop them, however long the flusher is down
+    assert redis.ttl(f"{job_state.PREFIX_PENDING}{job.id}") == -1
+
+
+def test_flush_writes_all_transitions_at_once(job, redis):
+    job_state.update(job, progress=50, current_step="Analyzing...")
+    job_state.update(job, status=Job.STATUS_COMPLETED, progress=100)
+
+    assert job_state.flush() == 1
+
+    assert stored(job, "status") == Job.STATUS_COMPLETED
+    assert stored(job, "progress") == 100
+    assert stored(job, "current_step") == "Analyzing..."
+    assert job_state.pending_count() == 0
+    assert not redis.exists(f"{job_state.PREFIX_PENDING}{job.id}")
+
+
+def test_failed_flush_requeues_changes(job, redis, monkeypatch):
+    job_state.update(job, status=Job.STATUS_COMPLETED, progress=90)
+
+    def fail(*args, **kwargs):
+        # a transition queued while the flush is in flight must win
+        job_state.update(job, progress=100)
+        raise RuntimeError("database unavailable")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(db.session, "execute", fail)
+        with pytest.raises(RuntimeError):
+            job_state.flush()
+
+    assert job_state.pending_count() == 1
+    assert stored(job, "status") == Job.STATUS_PROCESSING
+
+    assert job_state.flush() == 1
+    assert stored(job, "status") == Job.STATUS_COMPLETED
+    assert stored(job, "progress") == 100
+
+
+def test_delete_pending_drops_queued_changes(job, redis):
+    job_state.update(job, status=Job.STATUS_FAILED)
+    job_state.delete_pending([str(job.id)])
+
+    assert job_state.pending_count() == 0
+    assert job_state.flush() == 0
+    assert stored(job, "status") == Job.STATUS_PROCESSING
+
+
+def test_load_many_applies_queued_changes(job, redis):
+    other = Job(status=Job.STATUS_PENDING)
+    db.session.add(other)
+    db.session.commit()
+    job_state.update(job, status=Job.STATUS_COMPLETED)
+
+    db.session.expire_all()
+    statuses = {str(j.id): j.status for j in job_state.load_many([str(job.id), str(other.id)])}
+
+    assert statuses == {str(job.id): Job.STATUS_COMPLETED, str(other.id): Job.STATUS_PENDING}
+
+
+@pytest.fixture
+def awaiting_job(app, redis):
+    job = Job(status=Job.STATUS_AWAITING_SELECTION)
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def test_concurrent_claims_start_one_run(app, awaiting_job):
+    contenders = 8
+    barrier = threading.Barrier(contenders, timeout=5)
+    # read once here - the threads would race to refresh the expired instance
+    job_id = awaiting_job.id
+
+    def claim(_):
+        # each request holds its own copy of the job, as separate API workers would
+        with app.app_context():
+            job = Job(id=job_id, status=Job.STATUS_AWAITING_SELECTION)
+            barrier.wait()
+            return job_state.claim_run(job, selected_members=["Alex"])
+
+    with ThreadPoolExecutor(contenders) as pool:
+        claimed = list(pool.map(claim, range(contenders)))
+
+    assert claimed.count(True) == 1
+    assert job_state.pending_count() == 1
+
+
+def test_released_run_can_be_claimed_again(awaiting_job):
+    assert job_state.claim_run(awaiting_job)
+    job_state.release_run(awaiting_job)
+
+    assert awaiting_job.status == Job.STATUS_AWAITING_SELECTION
+    assert job_state.claim_run(awaiting_job)
+
+
+def test_claim_without_redis_is_a_conditional_update(awaiting_job, monkeypatch):
+    monkeypatch.setattr(job_state_module, "redis_client", None)
+    stale = Job(id=awaiting_job.id, status=Job.STATUS_AWAITING_SELECTION)
+
+    assert job_state.claim_run(awaiting_job, selected_members=["Alex"])
+    assert not job_state.claim_run(stale, selected_members=["Sam"])
+
+    assert stored(awaiting_job, "status") == Job.STATUS_PENDING
+    assert stored(awaiting_job, "selected_members") == ["Alex"]
+
+
+def test_deleting_a_job_drops_its_run_claim(client, awaiting_job, redis):
+    assert job_state.claim_run(awaiting_job)
+
+    assert client.delete(f"/api/jobs/{awaiting_job.id}").status_code == 200
+
+    assert not redis.exists(f"{job_state.PREFIX_RUN}{awaiting_job.id}")
+
+
+def test_stage_lock_is_exclusive_and_owned(job, redis):
+    job_id = str(job.id)
+    token = job_state.acquire_lock(job_id, "parse", ttl=60)
+
+    assert token
+    assert job_state.acquire_lock(job_id, "parse", ttl=60) is None
+    assert job_state.acquire_lock(job_id, "roast", ttl=60)
+
+    # a stale holder (its lock expired and was taken over) can't release the new one
+    job_state.release_lock(job_id, "parse", "not-the-owner")
+    assert job_state.acquire_lock(job_id, "parse", ttl=60) is None
+
+    job_state.release_lock(job_id, "parse", token)
+    assert job_state.acquire_lock(job_id, "parse", ttl=60)
@@ -0,0 +1,78 @@
+"""
+Cached results: per-field compression with a trained zstd dictionary
+"""
+
+import json
+import pytest
+import app.tasks.processing as processing
+from app.services.cache import cache
+from app.services.result_codec import result_codec
+
+pytest.importorskip("zstandard")
+
+NAMES = ["Alex", "Sam", "Priya", "Jordan", "Mei", "Tomás", "Zoe", "Ravi"]
+
+
+def make_result(n: int) -> dict:
+    members = NAMES[n % 4:n % 4 + 4]
+    return {
+        "basic_stats": {"total_messages": 1000 + n * 37, "total_participants": len(members)},
+        "top_chatters": {name: 500 - i * 40 + n for i, name in enumerate(members)},
+        "slides": [
+            {"id": "overview", "title": "Your year in chat", "messages": 1000 + n * 37},
+            {"id": "ranking", "title": "Who never shuts up", "ranking": members},
+            {"id": "ai_roasts", "title": "The verdict", "roasts": {name: f"{name} types {n} essays a day" for name in members}},
+        ],
+    }
+
+
+@pytest.fixture
+def codec(redis, monkeypatch):
+    """The shared codec with no dictionary yet"""
+    monkeypatch.setattr(result_codec, "_dicts", {})
+    monkeypatch.setattr(result_codec, "_current_id", None)
+    monkeypatch.setattr(result_codec, "_checked_at", 0.0)
+    return result_codec
+
+
+def layout(job_id: str) -> dict:
+    return json.loads(cache.binary_client.hget(f"{cache.PREFIX_RESULT}{job_id}", cache.FIELD_LAYOUT))
+
+
+def test_untrained_results_use_plain_zstd(app, codec):
+    cache.set_job_result("job-1", make_result(1))
+
+    assert layout("job-1")["codec"] == "zstd"
+    assert cache.get_job_result("job-1") == make_result(1)
+
+
+def test_trained_dictionary_round_trips(app, codec):
+    for n in range(60):
+        cache.set_job_result(f"sample-{n}", make_result(n))
+
+    trained = processing.train_result_dictionary.apply().get()
+    assert trained["samples"] > 0 and trained["dict_id"]
+
+    cache.set_job_result("job-1", make_result(99))
+
+    assert layout("job-1")["codec"] == f"zstd:{trained['dict_id']}"
+    assert cache.get_job_result("job-1") == make_result(99)
+    assert cache.get_job_result_section("job-1", "top_chatters") == make_result(99)["top_chatters"]
+
+
+def test_other_processes_load_the_dictionary_from_redis(app, codec):
+    for n in range(60):
+        cache.set_job_result(f"sample-{n}", make_result(n))
+    processing.train_result_dictionary.apply()
+    cache.set_job_result("job-1", make_result(99))
+
+    # a worker that didn't train it only has Redis to go on
+    codec._dicts.clear()
+    assert cache.get_job_result("job-1") == make_result(99)
+
+
+def test_beat_retrains_the_dictionary(app):
+    schedule = processing.celery.conf.beat_schedule["train-result-dictionary"]
+
+    assert schedule["task"] == "app.tasks.processing.train_result_dictionary"
+    assert schedule["schedule"] == app.config["RESULT_DICT_TRAIN_SECONDS"]
@@ -0,0 +1,62 @@
+"""
+Roast cache entries live no longer than the jobs that used them
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import app.tasks.processing as processing
+from app.extensions import db
+from app.models import Job
+from app.services.cache import cache
+from core.roast_cache import RedisRoastCache
+
+ROASTS = {"roasts": {"Alex": "types in paragraphs"}}
+
+
+@pytest.fixture
+def job(app, redis):
+    job = Job(status=Job.STATUS_COMPLETED, expires_at=datetime.now(timezone.utc) + timedelta(hours=1))
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def roast_cache(job_id) -> RedisRoastCache:
+    return processing._roast_cache(str(job_id))
+
+
+def test_ttl_defaults_to_the_result_ttl(app, redis, job):
+    assert roast_cache(job.id).ttl == app.config["RESULT_TTL_SECONDS"]
+
+
+def test_entries_are_indexed_by_the_jobs_that_used_them(app, redis, job):
+    other = Job(status=Job.STATUS_COMPLETED)
+    db.session.add(other)
+    db.session.commit()
+
+    roast_cache(job.id).set("prompt-hash", ROASTS)
+    # an identical prompt from another job hits the same entry
+    assert roast_cache(other.id).get("prompt-hash") == ROASTS
+
+    assert redis.smembers(cache.roast_index_key(str(job.id))) == {"prompt-hash"}
+    assert redis.smembers(cache.roast_index_key(str(other.id))) == {"prompt-hash"}
+
+
+def test_deleting_the_job_deletes_its_roasts(app, client, redis, storage, job):
+    roast_cache(job.id).set("prompt-hash", ROASTS)
+
+    assert client.delete(f"/api/jobs/{job.id}").status_code == 200
+
+    assert not redis.exists(f"{RedisRoastCache.PREFIX}prompt-hash")
+    assert not redis.exists(cache.roast_index_key(str(job.id)))
+
+
+def test_cleanup_deletes_expired_jobs_roasts(app, redis, storage, job):
+    job.expires_at = datetime.now(timezone.utc) - timedelta(minutes=1)
+    db.session.commit()
+    roast_cache(job.id).set("prompt-hash", ROASTS)
+
+    assert processing.cleanup_expired_jobs.apply().get()["deleted"] == 1
+
+    assert not redis.exists(f"{RedisRoastCache.PREFIX}prompt-hash")
@@ -0,0 +1,77 @@
+"""
+scan_participants gives the same answer as the pandas path it replaced
+"""
+
+import pytest
+from core.parser import detect_group_names, merge_similar_contacts, parse_whatsapp_content
+from core.scanner import detect_dialect, scan_participants
+
+
+def pandas_participants(text: str):
+    """Participants and group name by parsing the chat into a dataframe"""
+    df = parse_whatsapp_content(text)
+    if df.empty:
+        return [], None
+    df = merge_similar_contacts(df)
+    df, _, group_name = detect_group_names(df)
+    return sorted(df[~df["is_system"]]["sender"].unique().tolist()), group_name
+
+
+IOS_GROUP = """\
+[01/01/25, 9:00:00 AM] Goa Trip: ‎Messages and calls are end-to-end encrypted. No one outside of this chat can read them.
+[01/01/25, 9:00:01 AM] Goa Trip: ‎You created group “Goa Trip”
+[01/01/25, 9:05:12 AM] Sanjjit S: who's booking the villa
+[01/01/25, 9:06:40 AM] Priya: not me
+last time I paid for
+everything
+[02/01/25, 11:15:03 PM] Sanjjit S CSE G2 SSN: fine I'll do it
+[03/01/25, 8:00:00 AM] Goa Trip: Priya changed the group name to “Goa 2025 \U0001F334”
+[03/01/25, 8:01:00 AM] You: nice name
+[03/01/25, 8:02:00 AM] Meta AI: Here are some beaches in Goa:
+1. Palolem
+2. Anjuna
+[04/01/25, 10:00:00 PM] Rahul Kumar: ‎image omitted
+[04/01/25, 10:01:00 PM] Rahul: Rahul Kumar left
+"""
+
+ANDROID_RENAMES = """\
+15/02/25, 18:30 - Messages and calls are end-to-end encrypted. No one outside of this chat can read them.
+15/02/25, 18:31 - Alexandra: anyone up for dinner
+15/02/25, 18:32 - Alexandra Chen ECE B1: sorry wrong account
+15/02/25, 18:40 - Sam: sure
+where though
+16/02/25, 07:05 - Sam: 16/02/25 is a date, not a message
+16/02/25, 07:06 - Jordan Lee: morning
+16/02/25, 07:07 - Jordan: different person, same first name
+"""
+
+ANDROID_12H = """\
+3/4/25, 9:15 PM - Mei: did you see this
+3/4/25, 9:16 PM - Tomás: ‎GIF omitted
+3/4/25, 9:17 PM - Mei: \U0001F602\U0001F602
+3/4/25, 9:20 PM - Tomás: This message was deleted
+3/5/25, 12:01 AM - Mei: ok goodnight
+"""
+
+CHATS = {"ios_group": IOS_GROUP, "android_renames": ANDROID_RENAMES, "android_12h": ANDROID_12H}
+
+
+@pytest.mark.parametrize("text", CHATS.values(), ids=CHATS.keys())
+def test_matches_the_pandas_path(text):
+    expected = pandas_participants(text)
+
+    assert scan_participants(text.split("\n"), detect_dialect(text)) == expected
+    assert scan_participants(text.split("\n")) == expected
+
+
+def test_group_chat():
+    participants, group_name = scan_participants(IOS_GROUP.split("\n"))
+
+    assert group_name == "Goa 2025 \U0001F334"
+    assert "Goa Trip" not in participants
+    assert "You" not in participants and "Meta AI" not in participants
+    assert "Sanjjit S" in participants and "Sanjjit S CSE G2 SSN" not in participants
+
+
+def test_not_a_chat():
+    assert scan_participants(["hello", "", "world"]) == ([], None)
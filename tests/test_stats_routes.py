@@ -0,0 +1,72 @@
+"""
+GET /jobs/<id>/stats for completed jobs: gzipped body, ETag and 304s
+"""
+
+import gzip
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from app.extensions import db
+from app.models import Job
+from app.services.cache import cache
+
+RESULT = {"basic_stats": {"total_messages": 3}, "top_chatters": {"Alex": 2, "Sam": 1}}
+
+
+@pytest.fixture
+def job_id(app, redis):
+    job = Job(
+        status=Job.STATUS_COMPLETED,
+        progress=100,
+        message_count=3,
+        participant_count=2,
+        expires_at=datetime.now(timezone.utc) + timedelta(hours=1),
+    )
+    db.session.add(job)
+    db.session.commit()
+    cache.set_job_result(str(job.id), RESULT)
+    return str(job.id)
+
+
+def test_completed_stats_are_gzipped_with_a_strong_etag(client, job_id):
+    response = client.get(f"/api/jobs/{job_id}/stats", headers={"Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    etag, weak = response.get_etag()
+    assert etag and not weak
+    assert "immutable" in response.headers["Cache-Control"]
+    assert json.loads(gzip.decompress(response.data))["stats"] == RESULT
+
+
+def test_matching_etag_gets_304_without_touching_the_database(client, job_id):
+    first = client.get(f"/api/jobs/{job_id}/stats", headers={"Accept-Encoding": "gzip"})
+    etag = first.headers["ETag"]
+
+    response = client.get(f"/api/jobs/{job_id}/stats", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.data == b""
+    assert response.headers["ETag"] == etag
+    assert response.headers["X-DB-Queries"] == "0"
+
+
+def test_stale_etag_gets_the_full_response(client, job_id):
+    client.get(f"/api/jobs/{job_id}/stats")
+
+    response = client.get(
+        f"/api/jobs/{job_id}/stats", headers={"If-None-Match": '"stale"', "Accept-Encoding": "gzip"}
+    )
+
+    assert response.status_code == 200
+    assert json.loads(gzip.decompress(response.data))["stats"] == RESULT
+
+
+def test_clients_without_gzip_get_plain_json(client, job_id):
+    response = client.get(f"/api/jobs/{job_id}/stats", headers={"Accept-Encoding": "identity"})
+
+    assert response.status_code == 200
+    assert "Content-Encoding" not in response.headers
+    assert response.get_json()["stats"] == RESULT
+    assert response.headers["Vary"] == "Accept-Encoding"